@@ -978,7 +978,7 @@ def _command_options() -> None:
             domain, _ = get_domain_from_actor(url)
             url = http_prefix + '://' + domain + '/users/' + nickname
         timeout: int = 15
-        sites_unavailable: list[str] = []
+        sites_unavailable: dict = {}
         active = site_is_active(url, timeout,
                                 sites_unavailable)
         if active:
@@ -1902,7 +1902,7 @@ def _command_options() -> None:
         if yggdrasil_domain:
             session_yggdrasil = create_session('yggdrasil')
         followers_sync_cache = {}
-        sites_unavailable: list[str] = []
+        sites_unavailable: dict = {}
         system_language = argb.language
         mitm_servers: list[str] = []
         manual_approve_follow_request(session, session_onion, session_i2p,
@@ -1963,7 +1963,7 @@ def _command_options() -> None:
         if yggdrasil_domain:
             session_yggdrasil = create_session('yggdrasil')
         followers_sync_cache = {}
-        sites_unavailable: list[str] = []
+        sites_unavailable: dict = {}
         mitm_servers: list[str] = []
         system_language = argb.language
         manual_deny_follow_request2(session, session_onion, session_i2p,
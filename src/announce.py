@@ -181,7 +181,7 @@ def create_announce(session, base_dir: str, federation_list: [],
                     curr_domain: str,
                     onion_domain: str, i2p_domain: str,
                     yggdrasil_domain: str,
-                    sites_unavailable: [],
+                    sites_unavailable: {},
                     system_language: str,
                     mitm_servers: []) -> {}:
     """Creates an announce message
@@ -267,7 +267,7 @@ def announce_public(session, base_dir: str, federation_list: [],
                     curr_domain: str,
                     onion_domain: str, i2p_domain: str,
                     yggdrasil_domain: str,
-                    sites_unavailable: [],
+                    sites_unavailable: {},
                     system_language: str,
                     mitm_servers: []) -> {}:
     """Makes a public announcement
@@ -62,6 +62,213 @@ from src.data import erase_file
 from src.data import move_file
 from src.data import is_a_file
 
+# compiled indexes of blocklists, keyed by the name of an in-memory
+# list or by the filename of a blocking file
+_BLOCK_INDEXES: dict = {}
+
+
+def _new_block_index() -> {}:
+    """Returns an empty index of blocked handles and domains
+    """
+    return {
+        "handles": set(),
+        "nicknames": set(),
+        "nicknameWildcards": [],
+        "domains": set(),
+        "domainWildcards": [],
+        "suffixes": {},
+        "hashtags": set()
+    }
+
+
+def _block_index_add(block_index: {}, blocked_str: str) -> None:
+    """Adds a blocklist entry to an index. Entries may be
+    nickname@domain, nickname@*, *@domain or a domain
+    """
+    blocked_str = blocked_str.strip()
+    if not blocked_str:
+        return
+    if blocked_str.startswith('#'):
+        # hashtags and commented out lines
+        block_index['hashtags'].add(blocked_str)
+        return
+    if blocked_str.startswith('*@'):
+        blocked_dom = blocked_str[2:]
+        if '*' in blocked_dom or '?' in blocked_dom:
+            if len(blocked_dom) >= 3:
+                block_index['domainWildcards'].append(blocked_dom)
+            return
+        _block_index_add_domain(block_index, blocked_dom)
+    elif blocked_str.endswith('@*'):
+        blocked_nick = blocked_str[:-2]
+        if '*' in blocked_nick or '?' in blocked_nick:
+            if len(blocked_nick) >= 3:
+                block_index['nicknameWildcards'].append(blocked_nick)
+            return
+        block_index['nicknames'].add(blocked_nick)
+    elif '@' in blocked_str or '://' in blocked_str:
+        block_index['handles'].add(blocked_str)
+    else:
+        _block_index_add_domain(block_index, blocked_str)
+
+
+def _block_index_add_domain(block_index: {}, blocked_dom: str) -> None:
+    """Adds a domain to an index, including to the suffix trie
+    which is used to match its subdomains
+    """
+    block_index['domains'].add(blocked_dom)
+    node = block_index['suffixes']
+    for label in reversed(blocked_dom.split('.')):
+        node = node.setdefault(label, {})
+    # labels never contain a dot, so this marks the end of a domain
+    node['.'] = True
+
+
+def _block_index_domain(block_index: {}, domain: str) -> bool:
+    """Returns True if the given domain, or a domain which it is a
+    subdomain of, is within the index
+    """
+    if domain in block_index['domains']:
+        return True
+    node = block_index['suffixes']
+    for label in reversed(domain.split('.')):
+        node = node.get(label)
+        if node is None:
+            return False
+        if node.get('.'):
+            return True
+    return False
+
+
+def _block_index_domain_wildcard(block_index: {}, domain: str) -> bool:
+    """Returns True if the given domain matches a wildcard domain block
+    """
+    for blocked_dom in block_index['domainWildcards']:
+        if fnmatch.fnmatchcase(domain, blocked_dom):
+            return True
+    return False
+
+
+def _block_index_nickname(block_index: {}, nickname: str) -> bool:
+    """Returns True if the given nickname is blocked on all instances
+    """
+    if nickname in block_index['nicknames']:
+        return True
+    for blocked_nick in block_index['nicknameWildcards']:
+        if fnmatch.fnmatchcase(nickname, blocked_nick):
+            return True
+    return False
+
+
+def _get_list_block_index(index_name: str, block_list: []) -> {}:
+    """Returns the index for an in-memory blocklist, compiling it
+    if the list has been replaced or changed in size
+    """
+    if not block_list:
+        return None
+    entry = _BLOCK_INDEXES.get(index_name)
+    if entry:
+        if entry['source'] is block_list and \
+           entry['size'] == len(block_list):
+            return entry['index']
+    return _compile_list_block_index(index_name, block_list)
+
+
+def _compile_list_block_index(index_name: str, block_list: []) -> {}:
+    """Compiles the index for an in-memory blocklist
+    """
+    block_index = _new_block_index()
+    for blocked_str in block_list:
+        _block_index_add(block_index, blocked_str)
+    _BLOCK_INDEXES[index_name] = {
+        "source": block_list,
+        "size": len(block_list),
+        "index": block_index
+    }
+    return block_index
+
+
+def _block_file_state(filename: str) -> (int, int, int):
+    """Returns the modification time, size and inode of a blocking file.
+    File timestamps are coarse, so the size and inode are also used
+    to detect changes. Returns zeros if the file does not exist
+    """
+    try:
+        file_stat = os.stat(filename)
+    except OSError:
+        return (0, 0, 0)
+    return (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
+
+def _get_file_block_index(filename: str) -> {}:
+    """Returns the index for a blocking or allow list file, which is
+    only loaded again if the file has been modified
+    """
+    modified = _block_file_state(filename)
+    if not modified[2]:
+        return None
+    entry = _BLOCK_INDEXES.get(filename)
+    if entry:
+        if entry['modified'] == modified:
+            return entry['index']
+    lines: list[str] = \
+        load_list(filename,
+                  'EX: _get_file_block_index unable to read ' +
+                  filename + ' [ex]')
+    if lines is None:
+        return None
+    block_index = _new_block_index()
+    for line in lines:
+        _block_index_add(block_index, line)
+    _BLOCK_INDEXES[filename] = {
+        "modified": modified,
+        "index": block_index
+    }
+    return block_index
+
+
+def _update_file_block_index(filename: str, blocked_str: str,
+                             prev_modified: []) -> None:
+    """Adds an entry which was appended to a blocking file to its
+    index, if the index was loaded from the file as it was before
+    the entry was appended. Otherwise the index is loaded again
+    when it is next used
+    """
+    entry = _BLOCK_INDEXES.get(filename)
+    if not entry:
+        return
+    modified = _block_file_state(filename)
+    if not modified[2] or entry['modified'] != prev_modified:
+        _BLOCK_INDEXES.pop(filename, None)
+        return
+    _block_index_add(entry['index'], blocked_str)
+    entry['modified'] = modified
+
+
+def _forget_file_block_index(filename: str) -> None:
+    """Forgets the index for a blocking file which was rewritten,
+    so that it is loaded again when it is next used
+    """
+    _BLOCK_INDEXES.pop(filename, None)
+
+
+def _global_block_index(base_dir: str, blocked_cache: []) -> {}:
+    """Returns the index of instance level blocks
+    """
+    if blocked_cache:
+        return _get_list_block_index('blocked_cache', blocked_cache)
+    global_blocking_filename = data_dir(base_dir) + '/blocking.txt'
+    return _get_file_block_index(global_blocking_filename)
+
+
+def _federated_block_index(base_dir: str, block_federated: []) -> {}:
+    """Returns the index of blocks obtained from federated blocklists
+    """
+    if block_federated:
+        return _get_list_block_index('block_federated', block_federated)
+    federated_blocks_filename = data_dir(base_dir) + '/block_api.txt'
+    return _get_file_block_index(federated_blocks_filename)
+
 
 def get_global_block_reason(search_text: str,
                             blocking_reasons_filename: str) -> str:
@@ -301,10 +508,13 @@ def add_global_block(base_dir: str,
             if text_in_file(block_handle, blocking_filename):
                 return False
         # block an account handle or domain
+        prev_modified = _block_file_state(blocking_filename)
         if not append_string(block_handle + '\n', blocking_filename,
                              'EX: unable to save blocked handle ' +
                              block_handle):
             return False
+        _update_file_block_index(blocking_filename, block_handle,
+                                 prev_modified)
     else:
         block_hashtag = block_nickname
         # is the hashtag already blocked?
@@ -312,10 +522,13 @@ def add_global_block(base_dir: str,
             if text_in_file(block_hashtag + '\n', blocking_filename):
                 return False
         # block a hashtag
+        prev_modified = _block_file_state(blocking_filename)
         if not append_string(block_hashtag + '\n', blocking_filename,
                              'EX: unable to save blocked hashtag ' +
                              block_hashtag):
             return False
+        _update_file_block_index(blocking_filename, block_hashtag,
+                                 prev_modified)
     return True
 
 
@@ -425,10 +638,13 @@ def add_block(base_dir: str, nickname: str, domain: str,
                                'EX: Unable to write followers ' +
                                followers_str):
                 return False
+    prev_modified = _block_file_state(blocking_filename)
     if not append_string(block_handle + '\n', blocking_filename,
                          'EX: unable to append block handle ' +
                          block_handle):
         return False
+    _update_file_block_index(blocking_filename, block_handle,
+                             prev_modified)
 
     if reason:
         _add_block_reason(base_dir, nickname, domain,
@@ -508,6 +724,7 @@ def remove_global_block(base_dir: str,
                     if not move_file(unblocking_filename + '.new',
                                      unblocking_filename, ex_text):
                         return False
+                    _forget_file_block_index(unblocking_filename)
                     return True
     else:
         unblock_hashtag = unblock_nickname
@@ -536,6 +753,7 @@ def remove_global_block(base_dir: str,
                     if not move_file(unblocking_filename + '.new',
                                      unblocking_filename, ex_text):
                         return False
+                    _forget_file_block_index(unblocking_filename)
                     return True
     return False
 
@@ -572,6 +790,7 @@ def remove_block(base_dir: str, nickname: str, domain: str,
                                  'EX: remove_block unable to rename 3 ' +
                                  unblocking_filename):
                     return False
+                _forget_file_block_index(unblocking_filename)
                 return True
     return False
 
@@ -583,11 +802,12 @@ def is_blocked_hashtag(base_dir: str, hashtag: str) -> bool:
     if len(hashtag) > 32:
         return True
     global_blocking_filename = data_dir(base_dir) + '/blocking.txt'
-    if is_a_file(global_blocking_filename):
+    block_index = _get_file_block_index(global_blocking_filename)
+    if block_index:
         hashtag = hashtag.strip('\n').strip('\r')
         if not hashtag.startswith('#'):
             hashtag: str = '#' + hashtag
-        if text_in_file(hashtag + '\n', global_blocking_filename):
+        if hashtag in block_index['hashtags']:
             return True
     return False
 
@@ -620,6 +840,9 @@ def update_blocked_cache(base_dir: str,
     # update the cache
     blocked_cache.clear()
     blocked_cache += evil_incarnate() + blocked_lines
+    _compile_list_block_index('blocked_cache', blocked_cache)
+    # the blocking file was read again, so its index is also reloaded
+    _forget_file_block_index(global_blocking_filename)
     return curr_time
 
 
@@ -650,53 +873,20 @@ def is_blocked_domain(base_dir: str, domain: str,
     short_domain = _get_short_domain(domain)
 
     if not broch_mode_is_active(base_dir):
-        block_federated_list = blocked_cache_list = []
-        if block_federated:
-            block_federated_list = block_federated
-
-        if not blocked_cache:
-            blocked_cache = []
-            # instance block list
-            global_blocking_filename = data_dir(base_dir) + '/blocking.txt'
-            if is_a_file(global_blocking_filename):
-                blocked_cache_str = \
-                    load_string(global_blocking_filename,
-                                'EX: is_blocked_domain unable to read ' +
-                                global_blocking_filename + ' [ex]')
-                if blocked_cache_str:
-                    blocked_cache = blocked_cache_str.split('\n')
-            if blocked_cache:
-                blocked_cache_list = blocked_cache
-        else:
-            blocked_cache_list = blocked_cache
-
-        search_str: str = '*@' + domain
-        for curr_block_list in (blocked_cache_list, block_federated_list):
-            for blocked_str in curr_block_list:
-                blocked_str = blocked_str.strip()
-                if not blocked_str:
-                    continue
-                if blocked_str.startswith('#'):
-                    # skip over commented out lines
-                    continue
-                if '*@' not in blocked_str:
-                    continue
-                blocked_dom = blocked_str.split('*@')[1]
-                if len(blocked_dom) < 3:
-                    continue
-                if '?' not in blocked_dom and '*' not in blocked_dom:
-                    if blocked_str == search_str:
-                        return True
-                    if short_domain:
-                        if blocked_str == '*@' + short_domain:
-                            return True
-                else:
-                    # allow wildcards within domain blocks
-                    if fnmatch.fnmatchcase(domain, blocked_dom):
-                        return True
-                    if short_domain:
-                        if fnmatch.fnmatchcase(short_domain, blocked_dom):
-                            return True
+        for block_index in (_global_block_index(base_dir, blocked_cache),
+                            _federated_block_index(base_dir,
+                                                   block_federated)):
+            if not block_index:
+                continue
+            # the suffix trie also matches subdomains
+            if _block_index_domain(block_index, domain):
+                return True
+            # allow wildcards within domain blocks
+            if _block_index_domain_wildcard(block_index, domain):
+                return True
+            if short_domain:
+                if _block_index_domain_wildcard(block_index, short_domain):
+                    return True
     else:
         # use temporary allowlist
         allow_filename = data_dir(base_dir) + '/allowedinstances.txt'
@@ -717,39 +907,11 @@ def is_blocked_nickname(base_dir: str, nickname: str,
     if evil_nickname(nickname):
         return True
 
-    if not blocked_cache:
-        # instance-wide block list
-        blocked_cache: list[str] = []
-        global_blocking_filename = data_dir(base_dir) + '/blocking.txt'
-        if is_a_file(global_blocking_filename):
-            blocked_cache_str = \
-                load_string(global_blocking_filename,
-                            'EX: is_blocked_nickname unable to read ' +
-                            global_blocking_filename + ' [ex]')
-            if blocked_cache_str:
-                blocked_cache = blocked_cache_str.split('\n')
-
-    if blocked_cache:
-        search_str = nickname + '@*'
-        for blocked_str in blocked_cache:
-            blocked_str = blocked_str.strip()
-            if not blocked_str:
-                continue
-            if blocked_str.startswith('#'):
-                # skip over commented out blocklist entries
-                continue
-            if not blocked_str.endswith('@*'):
-                continue
-            blocked_nick = blocked_str.split('@*')[0]
-            if len(blocked_nick) < 3:
-                continue
-            if '?' not in blocked_nick and '*' not in blocked_nick:
-                if blocked_str == search_str:
-                    return True
-            else:
-                # allow wildcards within nickname blocks
-                if fnmatch.fnmatchcase(nickname, blocked_nick):
-                    return True
+    block_index = _global_block_index(base_dir, blocked_cache)
+    if block_index:
+        # allow wildcards within nickname blocks
+        if _block_index_nickname(block_index, nickname):
+            return True
 
     return False
 
@@ -768,95 +930,63 @@ def is_blocked(base_dir: str, nickname: str, domain: str,
         block_handle = block_nickname + '@' + block_domain
 
     if not broch_mode_is_active(base_dir):
-        # instance level block list
-        if block_federated:
-            for blocked_str in block_federated:
-                if '@' in blocked_str or '://' in blocked_str:
-                    if block_handle:
-                        if blocked_str == block_handle:
-                            return True
-                elif blocked_str == block_domain:
+        # federated block list
+        block_index = _federated_block_index(base_dir, block_federated)
+        if block_index:
+            if block_handle:
+                if block_handle in block_index['handles']:
+                    return True
+            if block_domain:
+                if _block_index_domain(block_index, block_domain):
                     return True
 
-        if blocked_cache:
-            for blocked_str in blocked_cache:
-                if block_nickname:
-                    if block_nickname + '@*' in blocked_str:
-                        print('BLOCK: pattern ' +
-                              block_nickname + '@* ' + blocked_str)
-                        return True
-                if block_domain:
-                    if '*@' + block_domain in blocked_str:
-                        print('BLOCK: pattern ' +
-                              '*@' + block_domain + ' ' + blocked_str)
-                        return True
-                if block_handle:
-                    if blocked_str == block_handle:
-                        print('BLOCK: pattern ' + block_handle)
-                        return True
-        else:
-            global_blocks_filename = data_dir(base_dir) + '/blocking.txt'
-            if is_a_file(global_blocks_filename):
-                if block_nickname:
-                    if text_in_file(block_nickname + '@*\n',
-                                    global_blocks_filename):
-                        print('BLOCK: global pattern ' + block_nickname + '@*')
-                        return True
-                if text_in_file('*@' + block_domain, global_blocks_filename):
-                    print('BLOCK: global pattern *@' + block_domain)
+        # instance level block list
+        block_index = _global_block_index(base_dir, blocked_cache)
+        if block_index:
+            if block_nickname:
+                if _block_index_nickname(block_index, block_nickname):
+                    print('BLOCK: pattern ' + block_nickname + '@*')
+                    return True
+            if block_domain:
+                if _block_index_domain(block_index, block_domain):
+                    print('BLOCK: pattern *@' + block_domain)
+                    return True
+            if block_handle:
+                if block_handle in block_index['handles']:
+                    print('BLOCK: pattern ' + block_handle)
                     return True
-                if block_handle:
-                    block_str = block_handle + '\n'
-                    if text_in_file(block_str, global_blocks_filename):
-                        print('BLOCK: global pattern ' + block_str)
-                        return True
-            if not block_federated:
-                federated_blocks_filename = \
-                    data_dir(base_dir) + '/block_api.txt'
-                if is_a_file(federated_blocks_filename):
-                    block_federated: list[str] = []
-                    block_federated_str = \
-                        load_string(federated_blocks_filename,
-                                    'EX: is_blocked unable to load ' +
-                                    federated_blocks_filename)
-                    if block_federated_str:
-                        block_federated = block_federated_str.split('\n')
-                    if block_domain in block_federated:
-                        return True
-                    if block_handle:
-                        if block_handle in block_federated:
-                            return True
     else:
         # instance allow list
         allow_filename = data_dir(base_dir) + '/allowedinstances.txt'
-        short_domain = _get_short_domain(block_domain)
-        if not short_domain and block_domain:
-            if not text_in_file(block_domain + '\n', allow_filename):
-                return True
-        else:
-            if not text_in_file(short_domain + '\n', allow_filename):
-                return True
+        allow_index = _get_file_block_index(allow_filename)
+        if not allow_index or not block_domain:
+            return True
+        if not _block_index_domain(allow_index, block_domain):
+            return True
 
     # account level allow list
     account_dir = acct_dir(base_dir, nickname, domain)
     allow_filename = account_dir + '/allowedinstances.txt'
-    if block_domain and is_a_file(allow_filename):
-        if not text_in_file(block_domain + '\n', allow_filename):
-            return True
+    if block_domain:
+        allow_index = _get_file_block_index(allow_filename)
+        if allow_index:
+            if block_domain not in allow_index['domains']:
+                return True
 
     # account level block list
     blocking_filename = account_dir + '/blocking.txt'
-    if is_a_file(blocking_filename):
+    block_index = _get_file_block_index(blocking_filename)
+    if block_index:
         if block_nickname:
-            if text_in_file(block_nickname + '@*\n', blocking_filename):
+            if block_nickname in block_index['nicknames']:
                 print('BLOCK: account pattern ' + block_nickname + '@*')
                 return True
         if block_domain:
-            if text_in_file('*@' + block_domain + '\n', blocking_filename):
+            if _block_index_domain(block_index, block_domain):
                 print('BLOCK: account pattern *@' + block_domain)
                 return True
         if block_handle:
-            if text_in_file(block_handle + '\n', blocking_filename):
+            if block_handle in block_index['handles']:
                 print('BLOCK: account pattern ' + block_handle)
                 return True
     return False
@@ -2087,6 +2217,7 @@ def _update_federated_blocks(session, base_dir: str,
     """Creates block_api.txt
     """
     block_federated: list[str] = []
+    block_federated_set: set[str] = set()
     debug = True
 
     if not session:
@@ -2134,9 +2265,8 @@ def _update_federated_blocks(session, base_dir: str,
                             handle = handle[1:]
                         if _valid_federated_blocklist_entry(handle,
                                                             domain):
-                            if handle not in new_block_api_str:
-                                new_block_api_str += handle + '\n'
-                            if handle not in block_federated:
+                            if handle not in block_federated_set:
+                                block_federated_set.add(handle)
                                 block_federated.append(handle)
                         continue
 
@@ -2153,11 +2283,12 @@ def _update_federated_blocks(session, base_dir: str,
                         if not _valid_federated_blocklist_entry(handle,
                                                                 domain):
                             continue
-                        if handle not in new_block_api_str:
-                            new_block_api_str += handle + '\n'
-                        if handle not in block_federated:
+                        if handle not in block_federated_set:
+                            block_federated_set.add(handle)
                             block_federated.append(handle)
 
+    if block_federated:
+        new_block_api_str = '\n'.join(block_federated) + '\n'
     block_api_filename = \
         data_dir(base_dir) + '/block_api.txt'
     if not new_block_api_str:
@@ -2171,6 +2302,7 @@ def _update_federated_blocks(session, base_dir: str,
         save_string(new_block_api_str, block_api_filename,
                     'EX: unable to write block_api.txt')
 
+    _compile_list_block_index('block_federated', block_federated)
     return block_federated
 
 
@@ -34,9 +34,9 @@ from src.utils import remove_html
 from src.utils import get_actor_from_post
 from src.posts import get_person_box
 from src.session import post_json
+from src.data import append_index_entry
 from src.data import load_string
 from src.data import save_string
-from src.data import prepend_string
 from src.data import erase_file
 from src.data import is_a_file
 
@@ -244,16 +244,17 @@ def update_bookmarks_collection(recent_posts_cache: {},
 
     save_json(post_json_object, post_filename)
 
-    # prepend to the index
+    # append to the index
     bookmarks_index_filename = \
         acct_dir(base_dir, nickname, domain) + '/bookmarks.index'
     bookmark_index = post_filename.split('/')[-1]
     if is_a_file(bookmarks_index_filename):
         if not text_in_file(bookmark_index, bookmarks_index_filename):
-            if prepend_string(bookmark_index, bookmarks_index_filename,
-                              'EX: ' +
-                              'Failed to prepend entry to bookmarks index ' +
-                              bookmarks_index_filename + ' [ex]'):
+            if append_index_entry(bookmark_index, bookmarks_index_filename,
+                                  'EX: ' +
+                                  'Failed to append entry to ' +
+                                  'bookmarks index ' +
+                                  bookmarks_index_filename + ' [ex]'):
                 if debug:
                     print('DEBUG: bookmark added to index')
     else:
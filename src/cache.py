@@ -9,6 +9,9 @@ __module_group__ = "Core"
 
 import os
 import json
+import time
+import threading
+from collections import OrderedDict
 from src.session import download_image
 from src.session import url_exists
 from src.session import get_json
@@ -19,6 +22,7 @@ from src.utils import get_url_from_post
 from src.utils import data_dir
 from src.utils import get_attributed_to
 from src.utils import remove_id_ending
+from src.utils import remove_recent_post
 from src.utils import get_post_attachments
 from src.utils import has_object_dict
 from src.utils import contains_statuses
@@ -28,15 +32,92 @@ from src.utils import get_file_case_insensitive
 from src.utils import get_user_paths
 from src.utils import is_yggdrasil_url
 from src.formats import get_image_extensions
-from src.timeFunctions import date_from_string_format
-from src.timeFunctions import date_utcnow
 from src.content import remove_script
+from src.keycache import remove_key_from_cache
 from src.data import save_binary
 from src.data import load_binary
 from src.data import erase_file
 from src.data import is_a_file
 from src.data import is_a_dir
 
+# lock which is held while a person cache is changed, since actors are
+# stored and retrieved by the http threads and the inbox queue thread
+_PERSON_CACHE_LOCK = threading.RLock()
+
+
+def person_cache_create_stats(max_entries: int, max_bytes: int) -> {}:
+    """Returns the limits and statistics for a person cache, which are
+    kept alongside the cache. Zero limits use the defaults
+    """
+    stats = {
+        "maxEntries": 4096,
+        "maxBytes": 64 * 1024 * 1024,
+        "entries": 0,
+        "bytes": 0,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "expired": 0
+    }
+    if max_entries > 0:
+        stats['maxEntries'] = max_entries
+    if max_bytes > 0:
+        stats['maxBytes'] = max_bytes
+    return stats
+
+
+def _person_cache_tally(cache_json: {}, person_cache_stats: {}) -> None:
+    """Moves the hit and miss counts of a cached actor into the
+    statistics for the cache.
+    This should be called with the lock held
+    """
+    person_cache_stats['hits'] += cache_json['hits']
+    cache_json['hits'] = 0
+    if cache_json.get('missed'):
+        person_cache_stats['misses'] += 1
+        del cache_json['missed']
+
+
+def _person_cache_update_stats(person_cache: {},
+                               person_cache_stats: {}) -> None:
+    """Updates the statistics for the person cache.
+    This should be called with the lock held
+    """
+    person_cache_stats['entries'] = len(person_cache)
+    person_cache_stats['bytes'] = 0
+    for cache_json in person_cache.values():
+        _person_cache_tally(cache_json, person_cache_stats)
+        person_cache_stats['bytes'] += cache_json['size']
+
+
+def person_cache_evict(person_cache: {}, person_cache_stats: {}) -> None:
+    """Removes the least recently used actors until the cache is
+    within its limits.
+    Actors are moved to the end of the dict when they are used,
+    so the least recently used one is the first
+    """
+    with _PERSON_CACHE_LOCK:
+        _person_cache_update_stats(person_cache, person_cache_stats)
+        while person_cache_stats['entries'] > 1 and \
+                (person_cache_stats['entries'] >
+                 person_cache_stats['maxEntries'] or
+                 person_cache_stats['bytes'] >
+                 person_cache_stats['maxBytes']):
+            lru_url = next(iter(person_cache))
+            cache_json = person_cache.pop(lru_url)
+            person_cache_stats['entries'] -= 1
+            person_cache_stats['bytes'] -= cache_json['size']
+            person_cache_stats['evictions'] += 1
+
+
+def person_cache_statistics(person_cache: {},
+                            person_cache_stats: {}) -> {}:
+    """Returns a copy of the person cache statistics
+    """
+    with _PERSON_CACHE_LOCK:
+        _person_cache_update_stats(person_cache, person_cache_stats)
+        return person_cache_stats.copy()
+
 
 def remove_person_from_cache(base_dir: str, person_url: str,
                              person_cache: {}) -> bool:
@@ -48,8 +129,14 @@ def remove_person_from_cache(base_dir: str, person_url: str,
         ex_text = \
             'EX: unable to delete cached actor ' + str(cache_filename)
         erase_file(cache_filename, ex_text)
-    if person_cache.get(person_url):
-        del person_cache[person_url]
+    # the actor's keys may have been rotated, so remove the parsed
+    # public key object
+    with _PERSON_CACHE_LOCK:
+        cache_json = person_cache.pop(person_url, None)
+    if cache_json:
+        pub_key, _ = get_actor_public_key_from_id(cache_json['actor'], None)
+        if pub_key:
+            remove_key_from_cache(pub_key)
 
 
 def clear_actor_cache(base_dir: str, person_cache: {},
@@ -104,11 +191,22 @@ def store_person_in_cache(base_dir: str, person_url: str,
         # This is not an actor or person account
         return
 
-    curr_time = date_utcnow()
-    person_cache[person_url] = {
+    cache_json = {
         "actor": person_json,
-        "timestamp": curr_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        "timestamp": time.monotonic(),
+        "size": len(json.dumps(person_json)),
+        "hits": 0
     }
+    with _PERSON_CACHE_LOCK:
+        prev_json = person_cache.pop(person_url, None)
+        if prev_json:
+            cache_json['hits'] = prev_json['hits']
+            if prev_json.get('missed'):
+                cache_json['missed'] = True
+        else:
+            # the actor was not already in memory
+            cache_json['missed'] = True
+        person_cache[person_url] = cache_json
     if not base_dir:
         return
 
@@ -140,30 +238,34 @@ def get_person_from_cache(base_dir: str, person_url: str,
                                       person_cache, False)
                 loaded_from_file = True
 
-    if person_cache.get(person_url):
+    with _PERSON_CACHE_LOCK:
+        cache_json = person_cache.get(person_url)
+        if not cache_json:
+            return None
         if not loaded_from_file:
+            cache_json['hits'] += 1
             # update the timestamp for the last time the actor was retrieved
-            curr_time = date_utcnow()
-            curr_time_str = curr_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-            person_cache[person_url]['timestamp'] = curr_time_str
-        return person_cache[person_url]['actor']
-    return None
+            cache_json['timestamp'] = time.monotonic()
+            # move to the most recently used end
+            if person_cache.pop(person_url, None):
+                person_cache[person_url] = cache_json
+        return cache_json['actor']
 
 
-def expire_person_cache(person_cache: {}):
+def expire_person_cache(person_cache: {}, person_cache_stats: {}):
     """Expires old entries from the cache in memory
     """
-    curr_time = date_utcnow()
+    curr_time = time.monotonic()
     removals: list[str] = []
-    for person_url, cache_json in person_cache.items():
-        cache_time = date_from_string_format(cache_json['timestamp'],
-                                             ["%Y-%m-%dT%H:%M:%S%z"])
-        days_since_cached = (curr_time - cache_time).days
-        if days_since_cached > 2:
-            removals.append(person_url)
-    if removals:
+    with _PERSON_CACHE_LOCK:
+        for person_url, cache_json in person_cache.items():
+            if curr_time - cache_json['timestamp'] > 2 * 24 * 60 * 60:
+                removals.append(person_url)
         for person_url in removals:
-            del person_cache[person_url]
+            cache_json = person_cache.pop(person_url)
+            _person_cache_tally(cache_json, person_cache_stats)
+            person_cache_stats['expired'] += 1
+    if removals:
         print(str(len(removals)) + ' actors were expired from the cache')
 
 
@@ -210,18 +312,9 @@ def get_actor_public_key_from_id(person_json: {}, key_id: str) -> (str, str):
     return pub_key, pub_key_id
 
 
-def get_person_pub_key(base_dir: str, session, person_url: str,
-                       person_cache: {}, debug: bool,
-                       project_version: str, http_prefix: str,
-                       domain: str, onion_domain: str,
-                       i2p_domain: str, yggdrasil_domain: str,
-                       signing_priv_key_pem: str,
-                       mitm_servers: []) -> str:
-    """Get the public key for an actor
+def _actor_url_from_key_id(person_url: str, debug: bool) -> str:
+    """Returns the actor url for the given key id
     """
-    original_person_url = person_url
-    if not person_url:
-        return None
     if '#/publicKey' in person_url:
         person_url = person_url.replace('#/publicKey', '')
     elif '/main-key' in person_url:
@@ -236,6 +329,39 @@ def get_person_pub_key(base_dir: str, session, person_url: str,
             person_url = \
                 person_url.replace(possible_users_path + 'inbox', '/inbox')
             break
+    return person_url
+
+
+def get_cached_person_pub_key(base_dir: str, person_url: str,
+                              person_cache: {}) -> str:
+    """Returns the public key for an actor only if it is already cached.
+    This never makes any network requests
+    """
+    if not person_url:
+        return None
+    original_person_url = person_url
+    person_url = _actor_url_from_key_id(person_url, False)
+    person_json = \
+        get_person_from_cache(base_dir, person_url, person_cache)
+    if not person_json:
+        return None
+    pub_key, _ = get_actor_public_key_from_id(person_json, original_person_url)
+    return pub_key
+
+
+def get_person_pub_key(base_dir: str, session, person_url: str,
+                       person_cache: {}, debug: bool,
+                       project_version: str, http_prefix: str,
+                       domain: str, onion_domain: str,
+                       i2p_domain: str, yggdrasil_domain: str,
+                       signing_priv_key_pem: str,
+                       mitm_servers: []) -> str:
+    """Get the public key for an actor
+    """
+    original_person_url = person_url
+    if not person_url:
+        return None
+    person_url = _actor_url_from_key_id(person_url, debug)
     person_json = \
         get_person_from_cache(base_dir, person_url, person_cache)
     if not person_json:
@@ -374,26 +500,49 @@ def update_recent_posts_cache(recent_posts_cache: {}, max_recent_posts: int,
         post_id = post_id.split('#', 1)[0]
     post_id = remove_id_ending(post_id).replace('/', '#')
     if recent_posts_cache.get('index'):
+        # the index is ordered from least to most recently used
         if post_id in recent_posts_cache['index']:
+            recent_posts_cache['index'].move_to_end(post_id)
             return
-        recent_posts_cache['index'].append(post_id)
+        recent_posts_cache['index'][post_id] = True
         post_json_object['muted'] = False
         recent_posts_cache['json'][post_id] = json.dumps(post_json_object)
         recent_posts_cache['html'][post_id] = html_str
 
-        while len(recent_posts_cache['html'].items()) > max_recent_posts:
-            post_id = recent_posts_cache['index'][0]
-            recent_posts_cache['index'].pop(0)
+        # remove the least recently used posts
+        while len(recent_posts_cache['index']) > max_recent_posts:
+            post_id, _ = recent_posts_cache['index'].popitem(last=False)
             if recent_posts_cache['json'].get(post_id):
                 del recent_posts_cache['json'][post_id]
             if recent_posts_cache['html'].get(post_id):
                 del recent_posts_cache['html'][post_id]
     else:
-        recent_posts_cache['index'] = [post_id]
+        recent_posts_cache['index'] = OrderedDict()
+        recent_posts_cache['index'][post_id] = True
         recent_posts_cache['json'] = {}
         recent_posts_cache['html'] = {}
         recent_posts_cache['json'][post_id] = json.dumps(post_json_object)
         recent_posts_cache['html'][post_id] = html_str
+        if not recent_posts_cache.get('hits'):
+            recent_posts_cache['hits'] = 0
+            recent_posts_cache['misses'] = 0
+
+
+def get_recent_post(recent_posts_cache: {}, post_id: str,
+                    field: str) -> str:
+    """Returns the json or html for a post within the recent posts cache,
+    or None if it is not cached.
+    This also counts cache hits and misses
+    """
+    if not recent_posts_cache.get('index'):
+        return None
+    if post_id not in recent_posts_cache['index'] or \
+       not recent_posts_cache[field].get(post_id):
+        recent_posts_cache['misses'] += 1
+        return None
+    recent_posts_cache['hits'] += 1
+    recent_posts_cache['index'].move_to_end(post_id)
+    return recent_posts_cache[field][post_id]
 
 
 def remove_avatar_from_cache(base_dir: str, actor_str: str) -> None:
@@ -434,13 +583,5 @@ def clear_from_post_caches(base_dir: str, recent_posts_cache: {},
                     str(post_filename)
                 erase_file(post_filename, ex_text)
             # if the post is in the recent posts cache then remove it
-            if recent_posts_cache.get('index'):
-                if post_id in recent_posts_cache['index']:
-                    recent_posts_cache['index'].remove(post_id)
-            if recent_posts_cache.get('json'):
-                if recent_posts_cache['json'].get(post_id):
-                    del recent_posts_cache['json'][post_id]
-            if recent_posts_cache.get('html'):
-                if recent_posts_cache['html'].get(post_id):
-                    del recent_posts_cache['html'][post_id]
+            remove_recent_post(recent_posts_cache, post_id)
         break
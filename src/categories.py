@@ -8,9 +8,6 @@ __status__ = "Production"
 __module_group__ = "RSS Feeds"
 
 import os
-import datetime
-from src.timeFunctions import date_utcnow
-from src.timeFunctions import date_epoch
 from src.utils import data_dir
 from src.utils import replace_strings
 from src.utils import get_invalid_characters
@@ -20,6 +17,9 @@ from src.data import erase_file
 from src.data import is_a_file
 from src.data import is_a_dir
 from src.data import makedir
+from src.hashtagstats import get_hashtag_stats
+from src.hashtagstats import get_hashtag_stats_category
+from src.hashtagstats import hashtag_category_changed
 
 MAX_TAG_LENGTH = 42
 
@@ -29,21 +29,10 @@ INVALID_HASHTAG_CHARS = (',', ' ', '<', ';', '\\', '"', '&', '#')
 def get_hashtag_category(base_dir: str, hashtag: str) -> str:
     """Returns the category for the hashtag
     """
-    category_filename = base_dir + '/tags/' + hashtag + '.category'
-    if not is_a_file(category_filename):
-        category_filename = base_dir + '/tags/' + hashtag.title() + '.category'
-        if not is_a_file(category_filename):
-            category_filename = \
-                base_dir + '/tags/' + hashtag.upper() + '.category'
-            if not is_a_file(category_filename):
-                return ''
-
-    category_str: str = \
-        load_string(category_filename,
-                    'EX: unable to read category ' +
-                    category_filename + ' [ex]')
-    if category_str:
-        return category_str
+    for tag_name in (hashtag, hashtag.title(), hashtag.upper()):
+        category_str = get_hashtag_stats_category(base_dir, tag_name)
+        if category_str:
+            return category_str
     return ''
 
 
@@ -85,9 +74,11 @@ def load_city_hashtags(base_dir: str, translate: {}) -> None:
                 hashtag2 = replace_strings(hashtag, replacements2)
                 city_filename = base_dir + '/tags/' + hashtag2 + '.category'
                 if not is_a_file(city_filename):
-                    save_string(category_str, city_filename,
-                                'EX: unable to write city category ' +
-                                city_filename)
+                    if save_string(category_str, city_filename,
+                                   'EX: unable to write city category ' +
+                                   city_filename):
+                        hashtag_category_changed(base_dir, hashtag2,
+                                                 category_str)
                 if '-' in hashtag:
                     section = hashtag.split('-')
                     new_hashtag: str = ''
@@ -97,9 +88,11 @@ def load_city_hashtags(base_dir: str, translate: {}) -> None:
                     city_filename = \
                         base_dir + '/tags/' + hashtag2 + '.category'
                     if not is_a_file(city_filename):
-                        save_string(category_str, city_filename,
-                                    'EX: unable to write city category2 ' +
-                                    city_filename)
+                        if save_string(category_str, city_filename,
+                                       'EX: unable to write city ' +
+                                       'category2 ' + city_filename):
+                            hashtag_category_changed(base_dir, hashtag2,
+                                                     category_str)
                 if ' ' in hashtag:
                     section = hashtag.split(' ')
                     new_hashtag: str = ''
@@ -109,9 +102,11 @@ def load_city_hashtags(base_dir: str, translate: {}) -> None:
                     city_filename = \
                         base_dir + '/tags/' + hashtag2 + '.category'
                     if not is_a_file(city_filename):
-                        save_string(category_str, city_filename,
-                                    'EX: unable to write city category3 ' +
-                                    city_filename)
+                        if save_string(category_str, city_filename,
+                                       'EX: unable to write city ' +
+                                       'category3 ' + city_filename):
+                            hashtag_category_changed(base_dir, hashtag2,
+                                                     category_str)
 
 
 def get_hashtag_categories(base_dir: str,
@@ -120,54 +115,28 @@ def get_hashtag_categories(base_dir: str,
     """
     hashtag_categories = {}
 
+    # hashtags used today or yesterday, or all hashtags
+    days: int = 0
     if recent:
-        curr_time = date_utcnow()
-        days_since_epoch = (curr_time - date_epoch()).days
-        recently = days_since_epoch - 1
-
-    for _, _, files in os.walk(base_dir + '/tags'):
-        for catfile in files:
-            if not catfile.endswith('.category'):
-                continue
-            category_filename = os.path.join(base_dir + '/tags', catfile)
-            if not is_a_file(category_filename):
-                continue
-            hashtag = catfile.split('.')[0]
-            if len(hashtag) > MAX_TAG_LENGTH:
-                continue
-
-            category_str: str = \
-                load_string(category_filename,
-                            'EX: get_hashtag_categories ' +
-                            category_filename + ' [ex]')
-            if not category_str:
+        days = 2
+    hashtag_stats = get_hashtag_stats(base_dir, days)
+    for hashtag, tag_stats in hashtag_stats.items():
+        if len(hashtag) > MAX_TAG_LENGTH:
+            continue
+        category_str = tag_stats['category']
+        if not category_str:
+            continue
+
+        if category:
+            # only return a dictionary for a specific category
+            if category_str != category:
                 continue
 
-            if category:
-                # only return a dictionary for a specific category
-                if category_str != category:
-                    continue
-
-            if recent:
-                tags_filename = base_dir + '/tags/' + hashtag + '.txt'
-                if not is_a_file(tags_filename):
-                    continue
-                mod_time_since_epoc = \
-                    os.path.getmtime(tags_filename)
-                last_modified_date = \
-                    datetime.datetime.fromtimestamp(mod_time_since_epoc,
-                                                    datetime.timezone.utc)
-                file_days_since_epoch = \
-                    (last_modified_date - date_epoch()).days
-                if file_days_since_epoch < recently:
-                    continue
-
-            if not hashtag_categories.get(category_str):
-                hashtag_categories[category_str] = [hashtag]
-            else:
-                if hashtag not in hashtag_categories[category_str]:
-                    hashtag_categories[category_str].append(hashtag)
-        break
+        if not hashtag_categories.get(category_str):
+            hashtag_categories[category_str] = [hashtag]
+        else:
+            if hashtag not in hashtag_categories[category_str]:
+                hashtag_categories[category_str].append(hashtag)
     return hashtag_categories
 
 
@@ -257,6 +226,7 @@ def set_hashtag_category(base_dir: str, hashtag: str, category: str,
                    'EX: unable to write category ' + category_filename +
                    ' [ex]'):
         category_written = True
+        hashtag_category_changed(base_dir, hashtag, category)
 
     if category_written:
         if update:
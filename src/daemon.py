@@ -13,9 +13,14 @@ import time
 import os
 from socket import error as SocketError
 import errno
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 # for saving images
 from src.metadata import metadata_custom_emoji
+from src.cache import person_cache_create_stats
+from src.session import set_session_pool_limits
+from src.migrate import migrate_timeline_indexes
+from src.migrate import migrate_hashtag_indexes
 from src.person import update_memorial_flags
 from src.person import clear_person_qrcodes
 from src.person import create_shared_inbox
@@ -23,11 +28,14 @@ from src.person import create_news_inbox
 from src.keys import get_instance_actor_key
 from src.posts import expire_cache
 from src.inbox import run_inbox_queue
+from src.inbox import inbox_queue_create
 from src.inbox import run_inbox_queue_watchdog
 from src.follow import create_initial_last_seen
 from src.threads import begin_thread
 from src.threads import thread_with_trace
 from src.threads import remove_dormant_threads
+from src.delivery import update_delivery_queue
+from src.delivery import start_deliveries
 from src.cwlists import load_cw_lists
 from src.blocking import run_federated_blocks_daemon
 from src.blocking import load_federated_blocks_endpoints
@@ -85,6 +93,8 @@ from src.newsdaemon import run_newswire_watchdog
 from src.newsdaemon import run_newswire_daemon
 from src.fitnessFunctions import fitness_thread
 from src.siteactive import load_unavailable_sites
+from src.siteactive import set_sites_unavailable
+from src.siteactive import load_domain_capabilities
 from src.crawlers import load_known_web_bots
 from src.qrcode import save_domain_qrcode
 from src.importFollowing import run_import_following_watchdog
@@ -426,6 +436,7 @@ class EpicyonServer(ThreadingHTTPServer):
     base_dir: str = ''
     instance_id: str = ''
     person_cache: dict = {}
+    person_cache_stats: dict = {}
     cached_webfingers: dict = {}
     favicons_cache: dict = {}
     proxy_type = None
@@ -438,10 +449,15 @@ class EpicyonServer(ThreadingHTTPServer):
     getreq_busy: bool = False
     postreq_busy: bool = False
     received_message: bool = False
-    inbox_queue: list[dict] = []
+    inbox_queue: dict = {}
     send_threads = None
     post_log: list[str] = []
     max_queue_length: int = 64
+    inbox_max_items_per_sec: int = 0
+    inbox_verify_workers: int = 0
+    send_to_followers_workers: int = 0
+    delivery_workers: int = 8
+    domain_capabilities: dict = {}
     allow_deletion: bool = True
     last_login_time: int = 0
     last_login_failure: int = 0
@@ -528,12 +544,24 @@ class EpicyonServer(ThreadingHTTPServer):
 
 
 def run_posts_queue(base_dir: str, send_threads: [], debug: bool,
-                    timeout_mins: int) -> None:
-    """Manages the threads used to send posts
+                    timeout_mins: int, httpd) -> None:
+    """Manages the threads used to send posts, and the pool of
+    workers which deliver posts from the outgoing queue
     """
+    delivery_pool = ThreadPoolExecutor(max_workers=httpd.delivery_workers)
+    delivery_futures: dict = {}
+    delivery_queue: list = []
+    # when the queue directory was last changed and scanned.
+    # Scanning at startup resumes any deliveries which were pending
+    delivery_scan: dict = {}
     while True:
         time.sleep(1)
         remove_dormant_threads(base_dir, send_threads, debug, timeout_mins)
+        update_delivery_queue(base_dir, delivery_queue, delivery_futures,
+                              delivery_scan)
+        start_deliveries(httpd, base_dir, delivery_pool,
+                         delivery_futures, delivery_queue,
+                         httpd.delivery_workers, debug)
 
 
 def run_shares_expire(version_number: str, base_dir: str, httpd) -> None:
@@ -560,7 +588,7 @@ def run_posts_watchdog(base_dir: str, send_threads: [], debug: bool,
         httpd.thrPostsQueue = \
             thread_with_trace(target=run_posts_queue,
                               args=(base_dir, send_threads, debug,
-                                    timeout_mins),
+                                    timeout_mins, httpd),
                               daemon=True)
         print('Restarting posts queue...')
 
@@ -749,6 +777,42 @@ def run_daemon(accounts_data_dir: str,
     if not isinstance(httpd.log_unknown_requests, bool):
         httpd.log_unknown_requests = False
 
+    # optional ceiling on the number of inbox queue items processed
+    # per second. Zero means that the queue is drained as fast as possible
+    httpd.inbox_max_items_per_sec = 0
+    inbox_max_items_per_sec = \
+        get_config_param(base_dir, 'inboxMaxItemsPerSecond')
+    if inbox_max_items_per_sec is not None:
+        if str(inbox_max_items_per_sec).isdigit():
+            httpd.inbox_max_items_per_sec = int(inbox_max_items_per_sec)
+
+    # number of worker threads used to obtain public keys and verify
+    # signatures of inbox queue items ahead of them being processed.
+    # Zero or one means that verification happens serially
+    httpd.inbox_verify_workers = 0
+    inbox_verify_workers = \
+        get_config_param(base_dir, 'inboxVerifyWorkers')
+    if inbox_verify_workers is not None:
+        if str(inbox_verify_workers).isdigit():
+            httpd.inbox_verify_workers = int(inbox_verify_workers)
+
+    # the number of instances which a post is sent to at the same time
+    # Zero means use the default
+    httpd.send_to_followers_workers = 0
+    send_to_followers_workers = \
+        get_config_param(base_dir, 'sendToFollowersWorkers')
+    if send_to_followers_workers is not None:
+        if str(send_to_followers_workers).isdigit():
+            httpd.send_to_followers_workers = int(send_to_followers_workers)
+
+    # number of workers which deliver posts from the outgoing queue
+    httpd.delivery_workers = 8
+    delivery_workers = get_config_param(base_dir, 'deliveryWorkers')
+    if delivery_workers is not None:
+        if str(delivery_workers).isdigit():
+            if int(delivery_workers) > 0:
+                httpd.delivery_workers = int(delivery_workers)
+
     # servers with man-in-the-middle transport encryption
     httpd.mitm_servers = load_mitm_servers(base_dir)
 
@@ -821,6 +885,12 @@ def run_daemon(accounts_data_dir: str,
 
     # list of websites which are currently down
     httpd.sites_unavailable = load_unavailable_sites(base_dir)
+    set_sites_unavailable(httpd.sites_unavailable)
+
+    # known capabilities of other instances, such as having a shared inbox,
+    # so that they don't need to be checked every time a post is sent
+    httpd.domain_capabilities = \
+        load_domain_capabilities(base_dir, 7 * 24 * 60 * 60)
 
     # maximum number of shared items attached to actors, as in
     # https://codeberg.org/fediverse/fep/src/branch/main/fep/0837/fep-0837.md
@@ -1167,6 +1237,37 @@ def run_daemon(accounts_data_dir: str,
     httpd.base_dir = base_dir
     httpd.instance_id = instance_id
     httpd.person_cache = {}
+
+    # limits on the number of actors, and their total size in megabytes,
+    # which are held in memory. Zero means use the default
+    person_cache_max_entries: int = 0
+    max_entries = get_config_param(base_dir, 'personCacheMaxEntries')
+    if max_entries is not None:
+        if str(max_entries).isdigit():
+            person_cache_max_entries = int(max_entries)
+    person_cache_max_mb: int = 0
+    max_mb = get_config_param(base_dir, 'personCacheMaxMegabytes')
+    if max_mb is not None:
+        if str(max_mb).isdigit():
+            person_cache_max_mb = int(max_mb)
+    httpd.person_cache_stats = \
+        person_cache_create_stats(person_cache_max_entries,
+                                  person_cache_max_mb * 1024 * 1024)
+
+    # limits of the pools of connections to other instances which are
+    # kept alive within each session. Zero means use the default
+    pool_hosts: int = 0
+    pool_hosts_str = get_config_param(base_dir, 'httpPoolHosts')
+    if pool_hosts_str is not None:
+        if str(pool_hosts_str).isdigit():
+            pool_hosts = int(pool_hosts_str)
+    pool_per_host: int = 0
+    pool_per_host_str = get_config_param(base_dir, 'httpPoolPerHost')
+    if pool_per_host_str is not None:
+        if str(pool_per_host_str).isdigit():
+            pool_per_host = int(pool_per_host_str)
+    set_session_pool_limits(pool_hosts, pool_per_host)
+
     httpd.cached_webfingers = {}
     httpd.favicons_cache = {}
     httpd.proxy_type = proxy_type
@@ -1179,7 +1280,7 @@ def run_daemon(accounts_data_dir: str,
     httpd.getreq_busy = False
     httpd.postreq_busy = False
     httpd.received_message = False
-    httpd.inbox_queue: list[dict] = []
+    httpd.inbox_queue = inbox_queue_create()
     httpd.send_threads = send_threads
     httpd.post_log: list[str] = []
     httpd.max_queue_length = 64
@@ -1222,6 +1323,10 @@ def run_daemon(accounts_data_dir: str,
         create_news_inbox(base_dir, domain, port, http_prefix)
         set_config_param(base_dir, "listsEnabled", "Murdoch press")
 
+    # convert any timeline indexes which have the newest entry first
+    migrate_timeline_indexes(base_dir)
+    migrate_hashtag_indexes(base_dir)
+
     # dict of known web crawlers accessing nodeinfo or the masto API
     # and how many times they have been seen
     httpd.known_crawlers = {}
@@ -1270,6 +1375,9 @@ def run_daemon(accounts_data_dir: str,
     if not is_a_dir(base_dir + '/cache/avatars'):
         print('Creating avatars cache')
         makedir(base_dir + '/cache/avatars')
+    if not is_a_dir(base_dir + '/cache/hashtags'):
+        print('Creating hashtags cache')
+        makedir(base_dir + '/cache/hashtags')
 
     archive_dir = base_dir + '/archive'
     if not is_a_dir(archive_dir):
@@ -1283,7 +1391,8 @@ def run_daemon(accounts_data_dir: str,
     print('THREAD: Creating fitness thread')
     httpd.thrFitness = \
         thread_with_trace(target=fitness_thread,
-                          args=(base_dir, httpd.fitness), daemon=True)
+                          args=(base_dir, httpd.fitness, httpd),
+                          daemon=True)
     begin_thread(httpd.thrFitness, 'run_daemon thrFitness')
 
     httpd.recent_posts_cache = {}
@@ -1292,6 +1401,7 @@ def run_daemon(accounts_data_dir: str,
     httpd.thrCache = \
         thread_with_trace(target=expire_cache,
                           args=(base_dir, httpd.person_cache,
+                                httpd.person_cache_stats,
                                 httpd.http_prefix,
                                 archive_dir,
                                 httpd.recent_posts_cache,
@@ -1306,7 +1416,8 @@ def run_daemon(accounts_data_dir: str,
     httpd.thrPostsQueue = \
         thread_with_trace(target=run_posts_queue,
                           args=(base_dir, httpd.send_threads, debug,
-                                httpd.send_threads_timeout_mins), daemon=True)
+                                httpd.send_threads_timeout_mins, httpd),
+                          daemon=True)
     if not unit_test:
         print('THREAD: run_posts_watchdog')
         httpd.thrPostsWatchdog = \
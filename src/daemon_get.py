@@ -23,6 +23,7 @@ from src.blocking import remove_global_block
 from src.blocking import update_blocked_cache
 from src.blocking import add_global_block
 from src.blocking import blocked_timeline_json
+from src.cache import person_cache_statistics
 from src.cache import get_person_from_cache
 from src.webapp_moderation import html_account_info
 from src.webapp_calendar import html_calendar_delete_confirm
@@ -57,6 +58,7 @@ from src.webapp_login import html_login
 from src.followerSync import update_followers_sync_cache
 from src.securemode import secure_mode
 from src.fitnessFunctions import sorted_watch_points
+from src.fitnessFunctions import fitness_cache_stats
 from src.fitnessFunctions import fitness_performance
 from src.fitnessFunctions import html_watch_points_graph
 from src.session import establish_session
@@ -1978,8 +1980,16 @@ def daemon_http_get(self) -> None:
             graph = 'INBOX'
         elif graph == 'get':
             graph = '_GET'
-        watch_points_json = \
-            sorted_watch_points(self.server.fitness, graph)
+        if graph == 'caches':
+            # statistics for in-memory caches
+            person_stats = \
+                person_cache_statistics(self.server.person_cache,
+                                        self.server.person_cache_stats)
+            fitness_cache_stats(self.server.fitness, 'person', person_stats)
+            watch_points_json = self.server.fitness['caches']
+        else:
+            watch_points_json = \
+                sorted_watch_points(self.server.fitness, graph)
         msg_str = json.dumps(watch_points_json,
                              ensure_ascii=False)
         msg_str = convert_domains(calling_domain,
@@ -41,7 +41,7 @@ def follow_approve_button(self, calling_domain: str, path: str,
                           cached_webfingers: {},
                           person_cache: {},
                           project_version: str,
-                          sites_unavailable: [],
+                          sites_unavailable: {},
                           system_language: str,
                           fitness: {},
                           signing_priv_key_pem: str,
@@ -147,7 +147,7 @@ def follow_deny_button(self, calling_domain: str, path: str,
                        project_version: str,
                        signing_priv_key_pem: str,
                        followers_sync_cache: {},
-                       sites_unavailable: [],
+                       sites_unavailable: {},
                        system_language: str,
                        fitness: {},
                        session, session_onion, session_i2p,
@@ -42,7 +42,7 @@ def announce_button(self, calling_domain: str, path: str,
                     getreq_start_time,
                     repeat_private: bool,
                     debug: bool,
-                    curr_session, sites_unavailable: [],
+                    curr_session, sites_unavailable: {},
                     federation_list: [],
                     send_threads: {},
                     post_log: {},
@@ -65,7 +65,7 @@ def show_shares_feed(self, authorized: bool,
                      content_license_url: str,
                      buy_sites: [],
                      max_shares_on_profile: int,
-                     sites_unavailable: [],
+                     sites_unavailable: {},
                      no_of_books: int,
                      auto_cw_cache: {},
                      fitness: {},
@@ -238,7 +238,7 @@ def show_following_feed(self, authorized: bool,
                         bold_reading_nicknames: {},
                         hide_follows: {},
                         max_shares_on_profile: int,
-                        sites_unavailable: [],
+                        sites_unavailable: {},
                         signing_priv_key_pem: str,
                         rss_icon_at_top: bool,
                         default_timeline: str,
@@ -450,7 +450,7 @@ def show_moved_feed(self, authorized: bool,
                     shared_items_federated_domains: [],
                     bold_reading_nicknames: {},
                     max_shares_on_profile: int,
-                    sites_unavailable: [],
+                    sites_unavailable: {},
                     signing_priv_key_pem: str,
                     rss_icon_at_top: bool,
                     default_timeline: str,
@@ -640,7 +640,7 @@ def show_inactive_feed(self, authorized: bool,
                        proxy_type: str, cookie: str,
                        debug: bool, curr_session,
                        dormant_months: int,
-                       sites_unavailable: [],
+                       sites_unavailable: {},
                        follows_per_page: int,
                        access_keys: {},
                        key_shortcuts: {}, city: str,
@@ -847,7 +847,7 @@ def show_followers_feed(self, authorized: bool,
                         bold_reading_nicknames: {},
                         hide_follows: {},
                         max_shares_on_profile: int,
-                        sites_unavailable: [],
+                        sites_unavailable: {},
                         signing_priv_key_pem: str,
                         rss_icon_at_top: bool,
                         default_timeline: str,
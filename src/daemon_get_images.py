@@ -18,6 +18,7 @@ from src.httpcodes import write2
 from src.httpcodes import http_304
 from src.httpcodes import http_404
 from src.httpheaders import set_headers_etag
+from src.httpmedia import send_media_file
 from src.utils import data_dir
 from src.utils import get_nickname_from_actor
 from src.utils import acct_dir
@@ -114,15 +115,8 @@ def show_avatar_or_banner(self, referer_domain: str, path: str,
         last_modified_time.strftime('%a, %d %b %Y %H:%M:%S GMT')
 
     media_image_type = get_image_mime_type(avatar_file)
-    media_binary = load_binary(avatar_filename,
-                               'EX: unable to read avatar ' +
-                               avatar_filename)
-    if media_binary:
-        set_headers_etag(self, avatar_filename, media_image_type,
-                         media_binary, None,
-                         referer_domain, True,
-                         last_modified_time_str)
-        write2(self, media_binary)
+    send_media_file(self, avatar_filename, media_image_type, None,
+                    referer_domain, True, last_modified_time_str)
     fitness_performance(getreq_start_time, fitness,
                         '_GET', 'show_avatar_or_banner',
                         debug)
@@ -140,17 +134,9 @@ def show_cached_avatar(self, referer_domain: str, path: str,
             # The file has not changed
             http_304(self)
             return
-        media_binary = load_binary(media_filename,
-                                   'EX: unable to read cached avatar ' +
-                                   media_filename)
-        if media_binary:
-            mime_type = media_file_mime_type(media_filename)
-            set_headers_etag(self, media_filename,
-                             mime_type,
-                             media_binary, None,
-                             referer_domain,
-                             False, None)
-            write2(self, media_binary)
+        mime_type = media_file_mime_type(media_filename)
+        if send_media_file(self, media_filename, mime_type, None,
+                           referer_domain, False, None):
             fitness_performance(getreq_start_time, fitness,
                                 '_GET', 'show_cached_avatar',
                                 debug)
@@ -187,17 +173,9 @@ def show_help_screen_image(self, path: str,
         http_304(self)
         return
     if is_a_file(media_filename):
-        media_binary = load_binary(media_filename,
-                                   'EX: unable to read help image ' +
-                                   media_filename)
-        if media_binary:
-            mime_type = media_file_mime_type(media_filename)
-            set_headers_etag(self, media_filename,
-                             mime_type,
-                             media_binary, None,
-                             domain_full,
-                             False, None)
-            write2(self, media_binary)
+        mime_type = media_file_mime_type(media_filename)
+        send_media_file(self, media_filename, mime_type, None,
+                        domain_full, False, None)
         fitness_performance(getreq_start_time, fitness,
                             '_GET', 'show_help_screen_image',
                             debug)
@@ -325,16 +303,8 @@ def show_share_image(self, path: str,
         return True
 
     media_file_type = get_image_mime_type(media_filename)
-    media_binary = load_binary(media_filename,
-                               'EX: unable to read binary ' +
-                               media_filename)
-    if media_binary:
-        set_headers_etag(self, media_filename,
-                         media_file_type,
-                         media_binary, None,
-                         domain_full,
-                         False, None)
-        write2(self, media_binary)
+    send_media_file(self, media_filename, media_file_type, None,
+                    domain_full, False, None)
     fitness_performance(getreq_start_time, fitness,
                         '_GET', 'show_share_image',
                         debug)
@@ -447,15 +417,8 @@ def show_media(self, path: str, base_dir: str,
 
             if debug:
                 print('DEBUG: showing media ' + media_filename)
-            media_binary = load_binary(media_filename,
-                                       'EX: unable to read media binary ' +
-                                       media_filename)
-            if media_binary:
-                set_headers_etag(self, media_filename, media_file_type,
-                                 media_binary, None,
-                                 None, True,
-                                 last_modified_time_str)
-                write2(self, media_binary)
+            send_media_file(self, media_filename, media_file_type, None,
+                            None, True, last_modified_time_str)
             fitness_performance(getreq_start_time, fitness,
                                 '_GET', 'show_media', debug)
             return
@@ -741,16 +704,8 @@ def show_emoji(self, path: str,
                 return
 
             media_image_type = get_image_mime_type(emoji_filename)
-            media_binary = load_binary(emoji_filename,
-                                       'EX: unable to read emoji image ' +
-                                       emoji_filename)
-            if media_binary:
-                set_headers_etag(self, emoji_filename,
-                                 media_image_type,
-                                 media_binary, None,
-                                 domain_full,
-                                 False, None)
-                write2(self, media_binary)
+            send_media_file(self, emoji_filename, media_image_type, None,
+                            domain_full, False, None)
             fitness_performance(getreq_start_time, fitness,
                                 '_GET', 'show_emoji', debug)
             return
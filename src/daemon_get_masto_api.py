@@ -40,7 +40,7 @@ def masto_api(self, path: str, calling_domain: str,
               show_node_info_accounts: bool,
               referer_domain: str, debug: bool,
               known_crawlers: {},
-              sites_unavailable: [],
+              sites_unavailable: {},
               unit_test: bool,
               allow_local_network_access: bool) -> bool:
     if _masto_api_v2(self, path, calling_domain, ua_str, authorized,
@@ -85,7 +85,7 @@ def _masto_api_v1(self, path: str, calling_domain: str,
                   debug: bool,
                   calling_site_timeout: int,
                   known_crawlers: {},
-                  sites_unavailable: [],
+                  sites_unavailable: {},
                   unit_test: bool,
                   allow_local_network_access: bool) -> bool:
     """This is a vestigil mastodon API for the purpose
@@ -216,7 +216,7 @@ def _masto_api_v2(self, path: str, calling_domain: str,
                   debug: bool,
                   calling_site_timeout: int,
                   known_crawlers: {},
-                  sites_unavailable: [],
+                  sites_unavailable: {},
                   unit_test: bool,
                   allow_local_network_access: bool) -> bool:
     """This is a vestigil mastodon v2 API for the purpose
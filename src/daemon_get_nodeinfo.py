@@ -32,7 +32,7 @@ def get_nodeinfo(self, ua_str: str, calling_domain: str,
                  domain_full: str,
                  path: str,
                  allow_local_network_access: bool,
-                 sites_unavailable: [],
+                 sites_unavailable: {},
                  known_crawlers: [],
                  onion_domain: str,
                  i2p_domain: str,
@@ -52,7 +52,7 @@ def show_person_profile(self, authorized: bool,
                         account_timezone: {},
                         bold_reading_nicknames: {},
                         max_shares_on_profile: int,
-                        sites_unavailable: [],
+                        sites_unavailable: {},
                         fitness: {},
                         signing_priv_key_pem: str,
                         rss_icon_at_top: bool,
@@ -251,7 +251,7 @@ def show_roles(self, calling_domain: str, referer_domain: str,
                content_license_url: str,
                buy_sites: {},
                max_shares_on_profile: int,
-               sites_unavailable: [],
+               sites_unavailable: {},
                no_of_books: int,
                auto_cw_cache: {},
                fitness: {},
@@ -414,7 +414,7 @@ def show_skills(self, calling_domain: str, referer_domain: str,
                 cw_lists: {},
                 lists_enabled: {},
                 buy_sites: [],
-                sites_unavailable: [],
+                sites_unavailable: {},
                 no_of_books: int,
                 auto_cw_cache: {},
                 fitness: {},
@@ -9,7 +9,6 @@ __module_group__ = "Daemon"
 
 import os
 import datetime
-from hashlib import md5
 from src.flags import is_image_file
 from src.formats import media_file_mime_type
 from src.utils import data_dir
@@ -19,13 +18,11 @@ from src.utils import check_bad_path
 from src.httpcodes import http_400
 from src.httpcodes import http_404
 from src.httpheaders import set_headers_head
+from src.httpheaders import media_file_etag
 from src.media import path_is_video
 from src.media import path_is_audio
 from src.daemon_utils import get_user_agent
 from src.daemon_utils import log_epicyon_instances
-from src.data import load_string
-from src.data import load_binary
-from src.data import save_string
 from src.data import is_a_file
 
 
@@ -121,23 +118,7 @@ def daemon_http_head(self) -> None:
                 time_format_str = '%a, %d %b %Y %H:%M:%S GMT'
                 last_modified_time_str = \
                     last_modified_time.strftime(time_format_str)
-                media_tag_filename = media_filename + '.etag'
-                if is_a_file(media_tag_filename):
-                    etag_str = load_string(media_tag_filename,
-                                           'EX: do_HEAD unable to read ' +
-                                           media_tag_filename)
-                    if etag_str:
-                        etag = etag_str
-                else:
-                    media_binary = \
-                        load_binary(media_filename,
-                                    'EX: unable to read media binary ' +
-                                    media_filename)
-                    if media_binary:
-                        etag = md5(media_binary).hexdigest()  # nosec
-                        save_string(etag, media_tag_filename,
-                                    'EX: do_HEAD unable to write ' +
-                                    media_tag_filename)
+                etag = media_file_etag(media_filename)
             else:
                 http_404(self, 151)
                 return
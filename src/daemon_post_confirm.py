@@ -165,7 +165,7 @@ def follow_confirm2(self, calling_domain: str, cookie: str,
                     cached_webfingers: {},
                     person_cache: {},
                     project_version: str,
-                    sites_unavailable: [],
+                    sites_unavailable: {},
                     mitm_servers: []) -> None:
     """Confirm a follow from profile after search or from src.person options
     """
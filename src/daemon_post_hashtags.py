@@ -19,6 +19,7 @@ from src.content import extract_text_fields_in_post
 from src.blocking import is_blocked_hashtag
 from src.filters import is_filtered
 from src.categories import set_hashtag_category
+from src.hashtagstats import hashtag_category_changed
 from src.data import erase_file
 from src.data import is_a_file
 
@@ -132,9 +133,10 @@ def set_hashtag_category2(self, calling_domain: str, cookie: str,
         else:
             category_filename = base_dir + '/tags/' + hashtag + '.category'
             if is_a_file(category_filename):
-                erase_file(category_filename,
-                           'EX: _set_hashtag_category unable to delete ' +
-                           category_filename)
+                if erase_file(category_filename,
+                              'EX: _set_hashtag_category unable to ' +
+                              'delete ' + category_filename):
+                    hashtag_category_changed(base_dir, hashtag, '')
 
     # redirect back to the default timeline
     redirect_headers(self, tag_screen_str,
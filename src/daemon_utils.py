@@ -17,8 +17,11 @@ from src.httpcodes import http_404
 from src.httpcodes import http_503
 from src.httpcodes import http_400
 from src.httpcodes import write2
+from src.httpheaders import load_etag
 from src.context import has_valid_context
 from src.inbox import save_post_to_inbox_queue
+from src.inbox import inbox_queue_push
+from src.inbox import inbox_queue_length
 from src.inbox import clear_queue_items
 from src.blocking import update_blocked_cache
 from src.blocking import is_blocked_nickname
@@ -80,7 +83,6 @@ from src.httpheaders import redirect_headers
 from src.httpheaders import set_headers
 from src.fitnessFunctions import fitness_performance
 from src.siteactive import is_online
-from src.data import load_string
 from src.data import is_a_file
 
 
@@ -479,7 +481,8 @@ def update_inbox_queue(self, nickname: str, message_json: {},
     # if the inbox queue is full then return a busy code
     if debug:
         print('INBOX: checking for full queue')
-    if len(self.server.inbox_queue) >= self.server.max_queue_length:
+    if inbox_queue_length(self.server.inbox_queue) >= \
+       self.server.max_queue_length:
         if message_domain:
             print('INBOX: Queue: ' +
                   'Inbox queue is full. Incoming post from ' +
@@ -573,8 +576,8 @@ def update_inbox_queue(self, nickname: str, message_json: {},
                                  self.server.block_nostr)
     if queue_filename:
         # add json to the queue
-        if queue_filename not in self.server.inbox_queue:
-            self.server.inbox_queue.append(queue_filename)
+        inbox_queue_push(self.server.inbox_queue, queue_filename,
+                         time.time())
         if debug:
             time_diff = int((time.time() - begin_save_time) * 1000)
             if time_diff > 200:
@@ -920,14 +923,17 @@ def etag_exists(self, media_filename: str) -> bool:
             etag_header = 'If-none-match'
 
     if self.headers.get(etag_header):
-        old_etag = self.headers[etag_header].replace('"', '')
-        if is_a_file(media_filename + '.etag'):
-            # load the etag from file
-            exc_str = 'EX: _etag_exists unable to read ' + \
-                str(media_filename)
-            curr_etag = load_string(media_filename + '.etag', exc_str)
-            if curr_etag:
-                if old_etag == curr_etag:
+        # the etag is only used if the file hasn't changed since it
+        # was stored
+        curr_etag = load_etag(media_filename)
+        if curr_etag:
+            # there may be a list of etags, which could be weak
+            for old_etag in self.headers[etag_header].split(','):
+                old_etag = old_etag.strip()
+                if old_etag.startswith('W/'):
+                    old_etag = old_etag[2:]
+                old_etag = old_etag.replace('"', '')
+                if old_etag in (curr_etag, '*'):
                     # The file has not changed
                     return True
     return False
@@ -9,6 +9,9 @@ __module_group__ = "Core"
 
 import os
 
+# number of entries between offsets in timeline index sidecar files
+INDEX_OFFSETS_STEP = 256
+
 
 def _store_base(text: str, filename: str, exception_text: str,
                 mode: str) -> bool:
@@ -172,6 +175,267 @@ def prepend_string(text: str, filename: str, exception_text: str) -> bool:
     return False
 
 
+def _load_file_tail(filename: str, size: int) -> str:
+    """Returns up to the given number of bytes from the end of a file
+    """
+    try:
+        with open(filename, 'rb') as fp:
+            file_size = fp.seek(0, os.SEEK_END)
+            fp.seek(max(0, file_size - size))
+            return fp.read().decode('utf-8', errors='ignore')
+    except OSError as exc:
+        print('EX: _load_file_tail unable to read ' + filename + ' ' +
+              str(exc))
+    return ''
+
+
+def append_index_entry(entry: str, filename: str,
+                       exception_text: str) -> bool:
+    """Adds an entry to a timeline index.
+    Timeline indexes are append-only, with the newest entry at the
+    end of the file, so that adding an entry does not rewrite the
+    whole index. Duplicates of recently added entries are ignored
+    """
+    if is_a_file(filename):
+        recent_entries: str = '\n' + _load_file_tail(filename, 8192)
+        if '\n' + entry + '\n' in recent_entries:
+            return True
+    return append_string(entry + '\n', filename, exception_text)
+
+
+def index_entries_newest_first(filename: str, exception_text: str,
+                               end_offset: int = -1):
+    """Yields the entries of a timeline index, newest first.
+    The file is read backwards in blocks, so only as much of the
+    index as is needed gets read.
+    If an end offset is given then reading begins from that
+    byte position rather than from the end of the file
+    """
+    try:
+        with open(filename, 'rb') as fp:
+            position: int = fp.seek(0, os.SEEK_END)
+            if 0 <= end_offset < position:
+                position = end_offset
+            remainder: bytes = b''
+            while position > 0:
+                block_size: int = min(8192, position)
+                position -= block_size
+                fp.seek(position)
+                lines = (fp.read(block_size) + remainder).split(b'\n')
+                # the first line may be incomplete
+                remainder = lines[0]
+                for line in reversed(lines[1:]):
+                    line = line.strip()
+                    if line:
+                        yield line.decode('utf-8')
+            remainder = remainder.strip()
+            if remainder:
+                yield remainder.decode('utf-8')
+    except OSError as exc:
+        if '[ex]' in exception_text:
+            exception_text = exception_text.replace('[ex]', str(exc))
+        print(exception_text)
+    except UnicodeDecodeError as exc:
+        if '[ex]' in exception_text:
+            exception_text = exception_text.replace('[ex]', str(exc))
+        print(exception_text)
+
+
+def _load_index_offsets(offsets_filename: str) -> (int, int, str, []):
+    """Loads the offsets table for a timeline index.
+    Returns the indexed file size, the number of entries, the last
+    entry and the list of byte offsets for every Nth entry
+    """
+    offsets_str: str = load_string(offsets_filename,
+                                   'EX: _load_index_offsets unable to read ' +
+                                   offsets_filename)
+    if not offsets_str:
+        return 0, 0, '', []
+    lines: list[str] = offsets_str.split('\n')
+    if len(lines) < 3:
+        return 0, 0, '', []
+    header: list[str] = lines[0].split(' ')
+    if len(header) != 3:
+        return 0, 0, '', []
+    if header[0] != str(INDEX_OFFSETS_STEP):
+        return 0, 0, '', []
+    if not header[1].isdigit() or not header[2].isdigit():
+        return 0, 0, '', []
+    offsets: list[int] = []
+    for line in lines[2:]:
+        if not line:
+            continue
+        if not line.isdigit():
+            return 0, 0, '', []
+        offsets.append(int(line))
+    return int(header[1]), int(header[2]), lines[1], offsets
+
+
+def _index_offsets_valid(fp, indexed_size: int, last_entry: str) -> bool:
+    """Is the indexed part of a timeline index unchanged?
+    Entries are only ever appended, so if anything else changed the
+    index, such as a post being removed, then the last indexed entry
+    will no longer be in the same place
+    """
+    if indexed_size == 0:
+        return True
+    tail: bytes = (last_entry + '\n').encode('utf-8')
+    if indexed_size < len(tail):
+        return False
+    fp.seek(indexed_size - len(tail))
+    if fp.read(len(tail)) != tail:
+        return False
+    if indexed_size == len(tail):
+        return True
+    # the last entry should start at the beginning of a line
+    fp.seek(indexed_size - len(tail) - 1)
+    return fp.read(1) == b'\n'
+
+
+def _index_offsets_table(filename: str, offsets_filename: str) -> (int, []):
+    """Returns the number of entries within a timeline index, together
+    with the byte offsets of every Nth entry from the start.
+    The offsets are kept within a sidecar file and updated from only
+    the newly appended part of the index, so that any page of a
+    timeline can be seeked to without reading all of the index.
+    If no offsets filename is given then the sidecar file is kept
+    next to the index
+    """
+    if not offsets_filename:
+        offsets_filename = filename + '.offsets'
+    indexed_size: int = 0
+    no_of_entries: int = 0
+    last_entry: str = ''
+    offsets: list[int] = []
+    if is_a_file(offsets_filename):
+        indexed_size, no_of_entries, last_entry, offsets = \
+            _load_index_offsets(offsets_filename)
+    try:
+        with open(filename, 'rb') as fp:
+            file_size: int = fp.seek(0, os.SEEK_END)
+            if indexed_size == file_size and \
+               _index_offsets_valid(fp, indexed_size, last_entry):
+                return no_of_entries, offsets
+            if indexed_size > file_size or \
+               not _index_offsets_valid(fp, indexed_size, last_entry):
+                # the index was rewritten, so start again
+                indexed_size = 0
+                no_of_entries = 0
+                last_entry = ''
+                offsets = []
+            fp.seek(indexed_size)
+            new_data: bytes = fp.read(file_size - indexed_size)
+    except OSError as exc:
+        print('EX: _index_offsets_table unable to read ' + filename + ' ' +
+              str(exc))
+        return 0, []
+
+    # only complete lines are indexed
+    position: int = indexed_size
+    for line in new_data.split(b'\n')[:-1]:
+        line_start: int = position
+        position += len(line) + 1
+        entry: str = line.strip().decode('utf-8', errors='ignore')
+        if not entry:
+            continue
+        if no_of_entries % INDEX_OFFSETS_STEP == 0:
+            offsets.append(line_start)
+        no_of_entries += 1
+        last_entry = line.decode('utf-8', errors='ignore')
+        indexed_size = position
+
+    offsets_str: str = \
+        str(INDEX_OFFSETS_STEP) + ' ' + str(indexed_size) + ' ' + \
+        str(no_of_entries) + '\n' + last_entry + '\n'
+    for offset in offsets:
+        offsets_str += str(offset) + '\n'
+    save_string(offsets_str, offsets_filename,
+                'EX: _index_offsets_table unable to save ' + offsets_filename)
+    return no_of_entries, offsets
+
+
+def _index_table_offset(no_of_entries: int, offsets: [],
+                        skip_entries: int) -> (int, int):
+    """Returns the byte offset from which to read backwards in order to
+    skip the given number of newest entries, using the offsets table
+    of a timeline index
+    """
+    if skip_entries <= 0:
+        return -1, 0
+    if no_of_entries == 0:
+        return -1, skip_entries
+    if skip_entries >= no_of_entries:
+        return 0, 0
+    # entry number of the newest entry after skipping
+    entry_no: int = no_of_entries - skip_entries
+    offset_index: int = \
+        (entry_no + INDEX_OFFSETS_STEP - 1) // INDEX_OFFSETS_STEP
+    if offset_index >= len(offsets):
+        return -1, skip_entries
+    return offsets[offset_index], \
+        offset_index * INDEX_OFFSETS_STEP - entry_no
+
+
+def index_page_offset(filename: str, skip_entries: int,
+                      offsets_filename: str = None) -> (int, int):
+    """Returns the byte offset within a timeline index from which to
+    read backwards in order to skip the given number of newest entries,
+    and the number of entries which then still need to be skipped
+    """
+    if skip_entries <= 0:
+        return -1, 0
+    no_of_entries, offsets = _index_offsets_table(filename, offsets_filename)
+    end_offset, remaining_skip = \
+        _index_table_offset(no_of_entries, offsets, skip_entries)
+    return end_offset, remaining_skip
+
+
+def index_page_entries(filename: str, page_number: int,
+                       entries_per_page: int, exception_text: str,
+                       offsets_filename: str = None) -> ([], int):
+    """Returns the entries on a page of an append-only index, newest
+    first, together with the total number of entries within the index.
+    Only the part of the index containing the page is read
+    """
+    no_of_entries, offsets = _index_offsets_table(filename, offsets_filename)
+    if page_number < 1:
+        page_number = 1
+    skip_entries: int = (page_number - 1) * entries_per_page
+    if skip_entries >= no_of_entries:
+        return [], no_of_entries
+    end_offset, remaining_skip = \
+        _index_table_offset(no_of_entries, offsets, skip_entries)
+    entries: list[str] = []
+    index_entries = \
+        index_entries_newest_first(filename, exception_text, end_offset)
+    for entry in index_entries:
+        if remaining_skip > 0:
+            remaining_skip -= 1
+            continue
+        entries.append(entry)
+        if len(entries) >= entries_per_page:
+            break
+    return entries, no_of_entries
+
+
+def index_entry_offset(filename: str, entry: str) -> int:
+    """Returns the byte offset of the end of the newest timeline index
+    entry containing the given text, or -1 if it was not found
+    """
+    index_bytes = load_binary(filename,
+                              'EX: index_entry_offset unable to read ' +
+                              filename)
+    if not index_bytes:
+        return -1
+    position: int = index_bytes.rfind(entry.encode('utf-8'))
+    if position < 0:
+        return -1
+    end_position: int = index_bytes.find(b'\n', position)
+    if end_position < 0:
+        return len(index_bytes)
+    return end_position + 1
+
+
 def erase_file(filename: str, exception_text: str) -> bool:
     """Deletes a file
     """
@@ -21,6 +21,7 @@ from src.utils import delete_post
 from src.utils import remove_moderation_post_from_index
 from src.utils import local_actor_url
 from src.utils import get_actor_from_post
+from src.utils import get_hashtag_offsets_filename
 from src.timeFunctions import date_epoch
 from src.timeFunctions import date_from_numbers
 from src.timeFunctions import date_utcnow
@@ -28,6 +29,8 @@ from src.session import post_json
 from src.webfinger import webfinger_handle
 from src.auth import create_basic_auth_header
 from src.posts import get_person_box
+from src.hashtagstats import hashtag_removed
+from src.hashtagstats import hashtag_category_changed
 from src.data import erase_file
 from src.data import is_a_file
 
@@ -198,6 +201,9 @@ def remove_old_hashtags(base_dir: str, max_months: int) -> str:
 
     for _, _, files in os.walk(base_dir + '/tags'):
         for fname in files:
+            # keep flag files, such as .indexAppendOnly
+            if fname.startswith('.'):
+                continue
             tags_filename: str = os.path.join(base_dir + '/tags', fname)
             if not is_a_file(tags_filename):
                 continue
@@ -216,9 +222,21 @@ def remove_old_hashtags(base_dir: str, max_months: int) -> str:
         break
 
     for erase_filename in remove_hashtags:
-        erase_file(erase_filename,
-                   'EX: remove_old_hashtags unable to delete ' +
-                   erase_filename)
+        if not erase_file(erase_filename,
+                          'EX: remove_old_hashtags unable to delete ' +
+                          erase_filename):
+            continue
+        tag_name = os.path.basename(erase_filename).split('.')[0]
+        if erase_filename.endswith('.txt'):
+            offsets_filename: str = \
+                get_hashtag_offsets_filename(base_dir, tag_name)
+            if is_a_file(offsets_filename):
+                erase_file(offsets_filename,
+                           'EX: remove_old_hashtags unable to delete ' +
+                           offsets_filename)
+            hashtag_removed(base_dir, tag_name)
+        elif erase_filename.endswith('.category'):
+            hashtag_category_changed(base_dir, tag_name, '')
 
 
 def remove_old_labels(base_dir: str, max_months: int) -> str:
@@ -0,0 +1,502 @@
+__filename__ = "delivery.py"
+__author__ = "Bob Mottram"
+__license__ = "AGPL3+"
+__version__ = "1.7.0"
+__maintainer__ = "Bob Mottram"
+__email__ = "bob@libreserver.org"
+__status__ = "Production"
+__module_group__ = "ActivityPub"
+
+# Queue of outgoing posts on disk, sent by a pool of delivery workers
+
+import os
+import time
+import random
+import heapq
+from src.utils import data_dir
+from src.utils import acct_dir
+from src.utils import load_json
+from src.utils import save_json
+from src.utils import text_in_file
+from src.utils import get_full_domain
+from src.data import save_string
+from src.data import load_string
+from src.data import append_string
+from src.data import erase_file
+from src.data import move_file
+from src.data import is_a_file
+from src.data import is_a_dir
+from src.data import makedir
+from src.keys import get_person_key
+from src.httpsig import create_signed_header
+from src.session import create_session
+from src.session import post_json_string
+from src.session import get_session_for_domain
+from src.session import set_session_for_sender
+from src.siteactive import site_is_available
+from src.siteactive import site_next_probe
+from src.siteactive import site_failed
+from src.siteactive import site_succeeded
+
+# delay before the first retry
+DELIVERY_RETRY_BASE_SEC = 30
+# longest delay between retries
+DELIVERY_RETRY_MAX_SEC = 6 * 60 * 60
+# attempts after which a delivery is abandoned
+DELIVERY_MAX_ATTEMPTS = 12
+# age after which a delivery is abandoned
+DELIVERY_MAX_AGE_SEC = 2 * 24 * 60 * 60
+# rescan the queue directory at least this often
+DELIVERY_RESCAN_SEC = 10
+# fields which each queued delivery must contain
+DELIVERY_REQUIRED_FIELDS = (
+    'inbox', 'post', 'nickname', 'accountDomain', 'domain', 'port',
+    'toDomain', 'toPort', 'path', 'httpPrefix', 'withDigest',
+    'headers', 'headersLd', 'attempts', 'created'
+)
+
+
+def _deliveries_dir(base_dir: str) -> str:
+    """Returns the directory containing queued deliveries
+    """
+    deliveries_dir = data_dir(base_dir) + '/deliveries'
+    if not is_a_dir(deliveries_dir):
+        makedir(deliveries_dir)
+    return deliveries_dir
+
+
+def _delivery_filename(base_dir: str, next_attempt: float,
+                       delivery_id: str) -> str:
+    """Returns the filename for a delivery which is due at the given time
+    """
+    return _deliveries_dir(base_dir) + '/' + \
+        str(int(next_attempt * 1000)) + '_' + delivery_id + '.json'
+
+
+def _delivery_host(filename: str) -> str:
+    """Returns the instance which a delivery is sent to from its filename
+    """
+    delivery_name = os.path.basename(filename).replace('.json', '')
+    name_sections = delivery_name.split('_', 2)
+    if len(name_sections) < 3:
+        return ''
+    return name_sections[2]
+
+
+def _delivery_due_time(filename: str) -> float:
+    """Returns the time when a delivery is due from its filename
+    """
+    due_str = os.path.basename(filename).split('_', 1)[0]
+    if not due_str.isdigit():
+        return 0
+    return int(due_str) / 1000
+
+
+def delivery_retry_sec(attempts: int) -> float:
+    """Returns the number of seconds to wait before retrying a delivery
+    which has failed the given number of times. The delay doubles with
+    each attempt, and is jittered so that retries to an instance which
+    was unavailable don't all arrive at once when it returns
+    """
+    if attempts < 1:
+        return 0
+    delay_sec = DELIVERY_RETRY_MAX_SEC
+    if attempts < 16:
+        delay_sec = \
+            min(DELIVERY_RETRY_BASE_SEC * (2 ** (attempts - 1)),
+                DELIVERY_RETRY_MAX_SEC)
+    return delay_sec / 2 + random.uniform(0, delay_sec / 2)
+
+
+def _add_send_block(base_dir: str, nickname: str, domain: str,
+                    inbox_url: str) -> None:
+    """Adds an inbox which is blocking this instance
+    """
+    send_block_filename = \
+        acct_dir(base_dir, nickname, domain) + '/send_blocks.txt'
+
+    inbox_url = inbox_url + '\n'
+    if inbox_url.endswith('/inbox\n'):
+        inbox_url = inbox_url.replace('/inbox\n', '\n')
+
+    if not is_a_file(send_block_filename):
+        save_string(inbox_url, send_block_filename,
+                    'EX: _add_send_block unable to create ' +
+                    send_block_filename)
+        return
+
+    if not text_in_file(inbox_url, send_block_filename, False):
+        append_string(inbox_url, send_block_filename,
+                      'EX: _add_send_block unable to write ' +
+                      send_block_filename)
+
+
+def _remove_send_block(base_dir: str, nickname: str, domain: str,
+                       inbox_url: str) -> None:
+    """Removes an inbox which is blocking this instance
+    """
+    send_block_filename = \
+        acct_dir(base_dir, nickname, domain) + '/send_blocks.txt'
+
+    inbox_url = inbox_url + '\n'
+    if inbox_url.endswith('/inbox\n'):
+        inbox_url = inbox_url.replace('/inbox\n', '\n')
+
+    if not is_a_file(send_block_filename):
+        return
+
+    if not text_in_file(inbox_url, send_block_filename, False):
+        return
+
+    send_blocks_str = \
+        load_string(send_block_filename,
+                    'EX: _remove_send_block unable to read ' +
+                    send_block_filename)
+    if send_blocks_str is None:
+        send_blocks_str = ''
+    send_blocks_str = send_blocks_str.replace(inbox_url, '')
+    save_string(send_blocks_str, send_block_filename,
+                'EX: _remove_send_block unable to write ' +
+                send_block_filename)
+
+
+def _save_delivery(delivery: {}, filename: str) -> bool:
+    """Saves a delivery so that it only appears in the queue
+    directory once it has been completely written
+    """
+    new_filename = filename + '.new'
+    if not save_json(delivery, new_filename):
+        return False
+    return move_file(new_filename, filename,
+                     'EX: _save_delivery unable to move ' + new_filename)
+
+
+def enqueue_delivery(base_dir: str, inbox_url: str, post_json_str: str,
+                     nickname: str, account_domain: str,
+                     domain: str, port: int,
+                     to_domain: str, to_port: int, post_path: str,
+                     http_prefix: str, with_digest: bool,
+                     extra_headers: {}, extra_headers_ld: {},
+                     body_digest: str) -> str:
+    """Adds a post to the outgoing delivery queue.
+    The http signature is created at the time of each attempt, so only
+    the fields needed to create it are stored.
+    account_domain is the domain of the account whose private key is
+    used, and domain is the one which the post is sent from.
+    body_digest is the digest of post_json_str, if it is already known.
+    Returns the filename of the queued delivery
+    """
+    curr_time = time.time()
+    # the instance is within the filename, so that the number of
+    # deliveries to each instance at the same time can be limited
+    delivery_id = \
+        str(random.randint(0, 0xffffffffffff)) + '_' + \
+        to_domain.replace('/', '_')
+    delivery = {
+        "inbox": inbox_url,
+        "post": post_json_str,
+        "nickname": nickname,
+        "accountDomain": account_domain,
+        "domain": domain,
+        "port": port,
+        "toDomain": to_domain,
+        "toPort": to_port,
+        "path": post_path,
+        "httpPrefix": http_prefix,
+        "withDigest": with_digest,
+        "headers": extra_headers,
+        "headersLd": extra_headers_ld,
+        "digest": body_digest,
+        "attempts": 0,
+        "created": curr_time
+    }
+    filename = _delivery_filename(base_dir, curr_time, delivery_id)
+    if not _save_delivery(delivery, filename):
+        return None
+    return filename
+
+
+def _dead_letter_delivery(base_dir: str, filename: str,
+                          to_domain: str) -> None:
+    """Moves a delivery which has failed too many times into the
+    dead letter directory for its host, where it can be inspected.
+    Deliveries which could not be read have no host
+    """
+    dead_dir = data_dir(base_dir) + '/deliveries_failed'
+    if not is_a_dir(dead_dir):
+        makedir(dead_dir)
+    if to_domain:
+        dead_dir += '/' + to_domain.replace('/', '_')
+        if not is_a_dir(dead_dir):
+            makedir(dead_dir)
+    dead_filename = dead_dir + '/' + os.path.basename(filename)
+    move_file(filename, dead_filename,
+              'EX: _dead_letter_delivery unable to move ' + filename)
+
+
+def _reschedule_delivery(base_dir: str, filename: str, delivery: {},
+                         next_attempt: float) -> None:
+    """Moves a delivery to the given time within the queue
+    """
+    delivery_id = os.path.basename(filename).split('_', 1)[1]
+    delivery_id = delivery_id.replace('.json', '')
+    new_filename = _delivery_filename(base_dir, next_attempt, delivery_id)
+    if _save_delivery(delivery, new_filename):
+        erase_file(filename, 'EX: _reschedule_delivery unable to delete ' +
+                   filename)
+
+
+def _retry_delivery(base_dir: str, filename: str, delivery: {},
+                    curr_time: float) -> bool:
+    """Reschedules a delivery which failed.
+    Returns False if the delivery has been abandoned
+    """
+    delivery['attempts'] += 1
+    if delivery['attempts'] >= DELIVERY_MAX_ATTEMPTS or \
+       curr_time - delivery['created'] > DELIVERY_MAX_AGE_SEC:
+        _dead_letter_delivery(base_dir, filename, delivery['toDomain'])
+        return False
+    next_attempt = curr_time + delivery_retry_sec(delivery['attempts'])
+    _reschedule_delivery(base_dir, filename, delivery, next_attempt)
+    return True
+
+
+def _postpone_delivery(base_dir: str, filename: str, delivery: {},
+                       next_attempt: float, curr_time: float) -> bool:
+    """Reschedules a delivery which was not attempted because its
+    instance is unavailable. Nothing was sent, so this doesn't count
+    as an attempt, and only the age of the delivery is limited.
+    Returns False if the delivery has been abandoned
+    """
+    if curr_time - delivery['created'] > DELIVERY_MAX_AGE_SEC:
+        _dead_letter_delivery(base_dir, filename, delivery['toDomain'])
+        return False
+    _reschedule_delivery(base_dir, filename, delivery, next_attempt)
+    return True
+
+
+def _log_delivery(base_dir: str, log_str: str) -> None:
+    """Appends to the debug log of sent posts
+    """
+    post_log_filename = base_dir + '/post.log'
+    if is_a_file(post_log_filename):
+        append_string(log_str + '\n', post_log_filename,
+                      'EX: _log_delivery unable to append ' +
+                      post_log_filename)
+    else:
+        save_string(log_str + '\n', post_log_filename,
+                    'EX: _log_delivery unable to write ' +
+                    post_log_filename)
+
+
+def _post_delivery(server, session, delivery: {}, private_key_pem: str,
+                   content_type: str, debug: bool) -> (bool, bool, int):
+    """Signs and posts a delivery with the given content type
+    """
+    nickname = delivery['nickname']
+    domain = delivery['domain']
+    port = delivery['port']
+    post_json_str = delivery['post']
+    signature_header = \
+        create_signed_header(None, private_key_pem, nickname, domain, port,
+                             delivery['toDomain'], delivery['toPort'],
+                             delivery['path'], delivery['httpPrefix'],
+                             delivery['withDigest'], post_json_str,
+                             content_type, delivery.get('digest'))
+    if content_type == 'application/ld+json':
+        signature_header.update(delivery['headersLd'])
+    else:
+        signature_header.update(delivery['headers'])
+    domain_full = get_full_domain(domain, port)
+    try:
+        return post_json_string(session, post_json_str,
+                                server.federation_list,
+                                delivery['inbox'], signature_header,
+                                debug, delivery['httpPrefix'],
+                                domain_full)
+    except BaseException as ex:
+        print('EX: _post_delivery failed ' + delivery['inbox'] +
+              ' ' + str(ex))
+    return None, False, 0
+
+
+def _delivery_is_valid(delivery: {}) -> bool:
+    """Returns true if a delivery loaded from file has the fields needed
+    """
+    if not isinstance(delivery, dict):
+        return False
+    for field_name in DELIVERY_REQUIRED_FIELDS:
+        if field_name not in delivery:
+            return False
+    return True
+
+
+def _deliver(server, base_dir: str, filename: str, debug: bool) -> None:
+    """Attempts to send a queued delivery. This runs within the
+    pool of delivery workers
+    """
+    if not is_a_file(filename):
+        return
+    delivery = load_json(filename)
+    if not _delivery_is_valid(delivery):
+        # otherwise this would be attempted again on every rescan
+        print('WARN: delivery could not be read ' + filename)
+        _dead_letter_delivery(base_dir, filename, None)
+        return
+    nickname = delivery['nickname']
+    domain = delivery['domain']
+    inbox_url = delivery['inbox']
+    private_key_pem = \
+        get_person_key(nickname, delivery['accountDomain'], base_dir,
+                       'private', debug)
+    if not private_key_pem:
+        print('WARN: delivery abandoned, no private key for ' +
+              nickname + '@' + delivery['accountDomain'])
+        erase_file(filename, 'EX: _deliver unable to delete ' + filename)
+        return
+
+    # don't connect to an instance which is known to be down, and
+    # try again when it is next probed
+    if not site_is_available(server.sites_unavailable, inbox_url):
+        if debug:
+            print('DEBUG: delivery postponed, instance unavailable ' +
+                  inbox_url)
+        curr_time = time.time()
+        next_attempt = site_next_probe(server.sites_unavailable, inbox_url)
+        if next_attempt <= curr_time:
+            next_attempt = curr_time + DELIVERY_RETRY_BASE_SEC
+        if not _postpone_delivery(base_dir, filename, delivery,
+                                  next_attempt, curr_time):
+            print('WARN: delivery to ' + inbox_url + ' abandoned after ' +
+                  'the instance was unavailable for too long')
+        return
+
+    session, proxy_type = \
+        get_session_for_domain(server, delivery['toDomain'])
+    if not session:
+        session = create_session(proxy_type)
+        if not session:
+            _retry_delivery(base_dir, filename, delivery, time.time())
+            return
+        set_session_for_sender(server, proxy_type, session)
+
+    post_result, unauthorized, return_code = \
+        _post_delivery(server, session, delivery, private_key_pem,
+                       'application/activity+json', debug)
+    if unauthorized:
+        # try again with application/ld+json header
+        post_result, unauthorized, return_code = \
+            _post_delivery(server, session, delivery, private_key_pem,
+                           'application/ld+json', debug)
+
+    # update the health of the instance
+    if post_result:
+        site_succeeded(server.sites_unavailable, inbox_url)
+    elif return_code == 0 or return_code in range(500, 600):
+        # unable to connect, or the instance has a runtime error
+        if not unauthorized:
+            site_failed(server.sites_unavailable, inbox_url)
+
+    tries = delivery['attempts']
+    if unauthorized:
+        _add_send_block(base_dir, nickname, domain, inbox_url)
+        print('WARN: delivery: Post is unauthorized ' + inbox_url)
+        erase_file(filename, 'EX: _deliver unable to delete ' + filename)
+        return
+    if post_result:
+        _remove_send_block(base_dir, nickname, domain, inbox_url)
+        erase_file(filename, 'EX: _deliver unable to delete ' + filename)
+        if debug:
+            _log_delivery(base_dir, 'Success on try ' + str(tries) + ': ' +
+                          delivery['post'])
+            print('DEBUG: successful json post to ' + inbox_url)
+        return
+    if debug:
+        _log_delivery(base_dir, 'Retry ' + str(tries) + ': ' +
+                      delivery['post'])
+    if not _retry_delivery(base_dir, filename, delivery, time.time()):
+        print('WARN: delivery to ' + inbox_url + ' abandoned after ' +
+              str(delivery['attempts']) + ' attempts')
+
+
+def _load_delivery_queue(base_dir: str, delivery_queue: [],
+                         delivery_futures: {}) -> None:
+    """Loads the queued deliveries from disk, ordered by the time
+    when they are next due. Deliveries already being sent are excluded
+    """
+    deliveries_dir = _deliveries_dir(base_dir)
+    delivery_queue.clear()
+    with os.scandir(deliveries_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
+            filename = entry.path
+            if filename in delivery_futures:
+                continue
+            delivery_queue.append((_delivery_due_time(filename), filename))
+    heapq.heapify(delivery_queue)
+
+
+def update_delivery_queue(base_dir: str, delivery_queue: [],
+                          delivery_futures: {}, delivery_scan: {}) -> bool:
+    """Reloads the queue when the queue directory has changed, or
+    periodically. On the first call this resumes any deliveries which
+    were pending when the daemon stopped.
+    Returns True if the queue was reloaded
+    """
+    try:
+        mtime = os.stat(_deliveries_dir(base_dir)).st_mtime_ns
+    except OSError:
+        return False
+    curr_time = time.time()
+    if delivery_scan.get('mtime') == mtime and \
+       curr_time - delivery_scan['time'] < DELIVERY_RESCAN_SEC:
+        return False
+    # store the mtime before scanning, so that any change during
+    # the scan results in another one
+    delivery_scan['mtime'] = mtime
+    delivery_scan['time'] = curr_time
+    _load_delivery_queue(base_dir, delivery_queue, delivery_futures)
+    return True
+
+
+def start_deliveries(server, base_dir: str, delivery_pool,
+                     delivery_futures: {}, delivery_queue: [],
+                     max_workers: int, debug: bool) -> int:
+    """Submits deliveries which are due to the pool of workers,
+    without queueing more within the pool than there are workers to
+    take them. Only one delivery to each instance is sent at a time.
+    Returns the number of deliveries started
+    """
+    # forget about deliveries which have finished
+    for filename in list(delivery_futures.keys()):
+        if delivery_futures[filename].done():
+            del delivery_futures[filename]
+
+    # instances which deliveries are currently being sent to
+    busy_hosts: set[str] = set()
+    for filename in delivery_futures:
+        busy_hosts.add(_delivery_host(filename))
+
+    started: int = 0
+    curr_time = time.time()
+    waiting: list[tuple] = []
+    while delivery_queue and len(delivery_futures) < max_workers:
+        due_time, filename = delivery_queue[0]
+        if due_time > curr_time:
+            break
+        heapq.heappop(delivery_queue)
+        if filename in delivery_futures:
+            continue
+        host = _delivery_host(filename)
+        if host and host in busy_hosts:
+            # wait until the current delivery to this instance is done
+            waiting.append((due_time, filename))
+            continue
+        delivery_futures[filename] = \
+            delivery_pool.submit(_deliver, server, base_dir, filename, debug)
+        busy_hosts.add(host)
+        started += 1
+    for item in waiting:
+        heapq.heappush(delivery_queue, item)
+    return started
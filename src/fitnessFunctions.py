@@ -13,6 +13,8 @@ from src.webapp_utils import html_footer
 from src.utils import data_dir
 from src.utils import get_config_param
 from src.utils import save_json
+from src.cache import person_cache_statistics
+from src.session import session_pool_statistics
 from src.data import is_a_file
 
 
@@ -125,11 +127,30 @@ def html_watch_points_graph(base_dir: str, fitness: {}, fitness_id: str,
     return html_str
 
 
-def fitness_thread(base_dir: str, fitness: {}) -> None:
+def fitness_cache_stats(fitness_state: {}, cache_name: str,
+                        stats: {}) -> None:
+    """Records statistics for an in-memory cache
+    """
+    if fitness_state is None:
+        return
+    if 'caches' not in fitness_state:
+        fitness_state['caches'] = {}
+    fitness_state['caches'][cache_name] = stats
+
+
+def fitness_thread(base_dir: str, fitness: {}, httpd) -> None:
     """Thread used to save fitness function scores
     """
     fitness_filename: str = data_dir(base_dir) + '/fitness.json'
     while True:
         # every 10 mins
         time.sleep(60 * 10)
+        person_stats = \
+            person_cache_statistics(httpd.person_cache,
+                                    httpd.person_cache_stats)
+        fitness_cache_stats(fitness, 'person', person_stats)
+        sessions = [httpd.session, httpd.session_onion,
+                    httpd.session_i2p, httpd.session_yggdrasil]
+        fitness_cache_stats(fitness, 'connections',
+                            session_pool_statistics(sessions))
         save_json(fitness, fitness_filename)
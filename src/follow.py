@@ -34,6 +34,8 @@ from src.utils import text_in_file
 from src.utils import remove_eol
 from src.utils import get_actor_from_post
 from src.utils import data_dir
+from src.utils import in_follow_file
+from src.utils import follow_file_changed
 from src.status import get_status_number
 from src.posts import send_signed_json
 from src.posts import get_person_box
@@ -208,7 +210,8 @@ def is_following_actor(base_dir: str,
         return False
     if actor.startswith('@'):
         actor = actor[1:]
-    if text_in_file(actor, following_file, False):
+    if in_follow_file(following_file, actor) or \
+       in_follow_file(following_file, '!' + actor):
         return True
     following_nickname: str = get_nickname_from_actor(actor)
     if not following_nickname:
@@ -221,7 +224,8 @@ def is_following_actor(base_dir: str,
     following_handle: str = \
         get_full_domain(following_nickname + '@' + following_domain,
                         following_port)
-    if text_in_file(following_handle, following_file, False):
+    if in_follow_file(following_file, following_handle) or \
+       in_follow_file(following_file, '!' + following_handle):
         return True
     return False
 
@@ -281,30 +285,20 @@ def is_follower_of_person(base_dir: str, nickname: str, domain: str,
     if not is_a_file(followers_file):
         return False
     handle: str = follower_nickname + '@' + follower_domain
+    if in_follow_file(followers_file, handle) or \
+       in_follow_file(followers_file, '!' + handle):
+        return True
 
-    already_following: bool = False
-
-    followers_str: str = load_string(followers_file,
-                                     'EX: is_follower_of_person ' +
-                                     followers_file)
-    if followers_str is None:
-        followers_str = ''
-
-    if handle in followers_str:
-        already_following = True
-    else:
-        paths: list[str] = get_user_paths()
-        for user_path in paths:
-            url: str = '://' + follower_domain + user_path + follower_nickname
-            if url in followers_str:
-                already_following = True
-                break
-        if not already_following:
-            url: str = '://' + follower_domain + '/' + follower_nickname
-            if url in followers_str:
-                already_following = True
-
-    return already_following
+    # followers may also be listed by actor url
+    paths: list[str] = list(get_user_paths()) + ['/']
+    for user_path in paths:
+        for prefix in ('https', 'http'):
+            url: str = \
+                prefix + '://' + follower_domain + user_path + \
+                follower_nickname
+            if in_follow_file(followers_file, url):
+                return True
+    return False
 
 
 def unfollow_account(base_dir: str, nickname: str, domain: str,
@@ -353,6 +347,7 @@ def unfollow_account(base_dir: str, nickname: str, domain: str,
         save_string(text, filename,
                     'EX: unfollow_account unable to write ' +
                     filename + ' [ex]')
+        follow_file_changed(filename)
 
     # write to an unfollowed file so that if a follow accept
     # later arrives then it can be ignored
@@ -395,6 +390,7 @@ def clear_follows(base_dir: str, nickname: str, domain: str,
     if is_a_file(filename):
         erase_file(filename,
                    'EX: clear_follows unable to delete ' + filename)
+        follow_file_changed(filename)
 
 
 def clear_followers(base_dir: str, nickname: str, domain: str) -> None:
@@ -756,7 +752,7 @@ def followed_account_accepts(session, base_dir: str, http_prefix: str,
                              onion_domain: str, i2p_domain: str,
                              yggdrasil_domain: str,
                              followers_sync_cache: {},
-                             sites_unavailable: [],
+                             sites_unavailable: {},
                              system_language: str,
                              mitm_servers: []):
     """The person receiving a follow request accepts the new follower
@@ -831,7 +827,7 @@ def followed_account_rejects(session, session_onion, session_i2p,
                              debug: bool, project_version: str,
                              signing_priv_key_pem: str,
                              followers_sync_cache: {},
-                             sites_unavailable: [],
+                             sites_unavailable: {},
                              system_language: str,
                              mitm_servers: []):
     """The person receiving a follow request rejects the new follower
@@ -921,7 +917,7 @@ def send_follow_request(session, base_dir: str,
                         curr_domain: str,
                         onion_domain: str, i2p_domain: str,
                         yggdrasil_domain: str,
-                        sites_unavailable: [],
+                        sites_unavailable: {},
                         system_language: str,
                         mitm_servers: []) -> {}:
     """Gets the json object for sending a follow request
@@ -1573,6 +1569,7 @@ def remove_follower(base_dir: str,
     save_string(new_followers_str, followers_filename,
                 'EX: remove_follower unable to write followers ' +
                 followers_filename)
+    follow_file_changed(followers_filename)
     return True
 
 
@@ -7,6 +7,7 @@ __email__ = "bob@libreserver.org"
 __status__ = "Production"
 __module_group__ = "Core"
 
+import os
 from uuid import UUID
 from hashlib import md5
 from datetime import datetime
@@ -45,6 +46,12 @@ from src.data import is_a_file
 from src.data import is_a_dir
 from src.data import makedir
 
+# fields of event, place and location tags which are stored within
+# the event index for each calendar month
+CALENDAR_INDEX_TAG_FIELDS = (
+    'type', 'name', 'startTime', 'endTime', 'url', 'address'
+)
+
 
 def _strings_are_digits(strings_list: []) -> bool:
     """Are the given list of strings digits?
@@ -109,7 +116,7 @@ def _remove_event_from_timeline(event_id: str,
 
 
 def save_event_post(base_dir: str, handle: str, post_id: str,
-                    event_json: {}) -> bool:
+                    event_json: {}, post_json_object: {}) -> bool:
     """Saves an event to the calendar and/or the events timeline
     If an event has extra fields, as per Mobilizon,
     Then it is saved as a separate entity and added to the
@@ -179,6 +186,12 @@ def save_event_post(base_dir: str, handle: str, post_id: str,
     calendar_filename = calendar_path + '/' + str(event_year) + \
         '/' + str(event_month_number) + '.txt'
 
+    # update the event index for the calendar month
+    handle_nickname = handle.split('@')[0]
+    handle_domain = handle.split('@')[1]
+    _calendar_index_add(base_dir, handle_nickname, handle_domain,
+                        calendar_filename, post_id, post_json_object)
+
     # Does this event post already exist within the calendar month?
     if is_a_file(calendar_filename):
         if text_in_file(post_id, calendar_filename):
@@ -224,6 +237,152 @@ def _is_happening_post(post_json_object: {}) -> bool:
     return True
 
 
+def _calendar_index_filename(calendar_filename: str) -> str:
+    """Returns the filename of the event index for a calendar month.
+    The index is kept alongside the file containing the post ids for
+    the month, so that calendar views don't need to read each post
+    """
+    return calendar_filename.replace('.txt', '.events')
+
+
+def _post_modified(post_filename: str) -> int:
+    """Returns the modification time of a post file, or zero if
+    it doesn't exist
+    """
+    if not post_filename:
+        return 0
+    try:
+        return os.stat(post_filename).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _calendar_index_entry(post_json_object: {}, post_filename: str) -> {}:
+    """Returns the event index entry for a post, containing the
+    start and end times, titles and locations of its events
+    """
+    event_entry = {
+        "filename": post_filename,
+        "modified": _post_modified(post_filename),
+        "published": '',
+        "public": False,
+        "reminder": False,
+        "tags": []
+    }
+    if not _is_happening_post(post_json_object):
+        return event_entry
+    published = post_json_object['object'].get('published')
+    if isinstance(published, str):
+        event_entry['published'] = published
+    event_entry['public'] = is_public_post(post_json_object)
+    event_entry['reminder'] = is_reminder(post_json_object)
+    for tag in post_json_object['object']['tag']:
+        if not isinstance(tag, dict):
+            continue
+        if not _is_happening_event(tag):
+            continue
+        index_tag = {}
+        for field_name in CALENDAR_INDEX_TAG_FIELDS:
+            if field_name in tag:
+                index_tag[field_name] = tag[field_name]
+        event_entry['tags'].append(index_tag)
+    return event_entry
+
+
+def _calendar_index_add(base_dir: str, nickname: str, domain: str,
+                        calendar_filename: str, post_id: str,
+                        post_json_object: {}) -> None:
+    """Adds a post to the event index for a calendar month
+    """
+    index_filename = _calendar_index_filename(calendar_filename)
+    calendar_index = {}
+    if is_a_file(index_filename):
+        calendar_index = load_json(index_filename)
+        if not calendar_index:
+            calendar_index = {}
+    post_filename = locate_post(base_dir, nickname, domain, post_id)
+    if not post_filename:
+        # the post has not been saved yet, so it will be located
+        # when the calendar is next shown
+        post_filename = ''
+    calendar_index[post_id] = \
+        _calendar_index_entry(post_json_object, post_filename)
+    save_json(calendar_index, index_filename)
+
+
+def _calendar_month_events(base_dir: str, nickname: str, domain: str,
+                           calendar_filename: str,
+                           exception_text: str) -> []:
+    """Returns a list of post ids and event index entries for a calendar
+    month. The index entry is None if the post no longer exists.
+    Posts are only read if they are not within the event index or if
+    they have changed since they were indexed
+    """
+    calendar_list: list[str] = load_list(calendar_filename, exception_text)
+    if calendar_list is None:
+        return None
+
+    index_filename = _calendar_index_filename(calendar_filename)
+    calendar_index = None
+    if is_a_file(index_filename):
+        calendar_index = load_json(index_filename)
+    if not calendar_index:
+        calendar_index = {}
+    index_changed: bool = False
+
+    month_events: list[tuple] = []
+    for post_id in calendar_list:
+        post_id = remove_eol(post_id)
+        event_entry = calendar_index.get(post_id)
+        if event_entry:
+            if event_entry['modified'] and \
+               _post_modified(event_entry['filename']) == \
+               event_entry['modified']:
+                month_events.append((post_id, event_entry))
+                continue
+
+        post_filename = locate_post(base_dir, nickname, domain, post_id)
+        if not post_filename:
+            if event_entry:
+                del calendar_index[post_id]
+                index_changed = True
+            month_events.append((post_id, None))
+            continue
+
+        post_json_object = load_json(post_filename)
+        event_entry = _calendar_index_entry(post_json_object, post_filename)
+        if post_json_object:
+            calendar_index[post_id] = event_entry
+            index_changed = True
+        month_events.append((post_id, event_entry))
+
+    if index_changed:
+        save_json(calendar_index, index_filename)
+    return month_events
+
+
+def _calendar_event_content(post_filename: str,
+                            system_language: str) -> str:
+    """Returns the content of an event post, used for text matching
+    """
+    post_json_object = load_json(post_filename)
+    if not post_json_object:
+        return None
+    if not post_json_object.get('object'):
+        return None
+    if not isinstance(post_json_object['object'], dict):
+        return None
+    content = None
+    if system_language and post_json_object['object'].get('contentMap'):
+        content_map = post_json_object['object']['contentMap']
+        if content_map.get(system_language):
+            content = content_map[system_language]
+    if not content:
+        if post_json_object['object'].get('content'):
+            content = post_json_object['object']['content']
+    return content
+
+
 def _event_text_match(content: str, text_match: str) -> bool:
     """Returns true of the content matches the search text
     """
@@ -295,44 +454,33 @@ def get_todays_events(base_dir: str, nickname: str, domain: str,
 
     calendar_post_ids: list[str] = []
     recreate_events_file: bool = False
-    calendar_list: list[str] = \
-        load_list(calendar_filename,
-                  'EX: get_todays_events failed to read ' +
-                  calendar_filename + ' [ex]')
-    if calendar_list is not None:
-        for post_id in calendar_list:
-            post_id = remove_eol(post_id)
-            post_filename = \
-                locate_post(base_dir, nickname, domain, post_id)
-            if not post_filename:
+    month_events = \
+        _calendar_month_events(base_dir, nickname, domain,
+                               calendar_filename,
+                               'EX: get_todays_events failed to read ' +
+                               calendar_filename + ' [ex]')
+    if month_events is not None:
+        for post_id, event_entry in month_events:
+            if not event_entry:
                 recreate_events_file = True
                 continue
-
-            post_json_object = load_json(post_filename)
-            if not _is_happening_post(post_json_object):
+            if not event_entry['tags']:
                 continue
 
             content_language = system_language
-            if post_json_object.get('object'):
-                content = None
-                if post_json_object['object'].get('contentMap'):
-                    sys_lang = system_language
-                    content_map = post_json_object['object']['contentMap']
-                    if content_map.get(sys_lang):
-                        content = content_map[sys_lang]
-                        content_language = sys_lang
-                if not content:
-                    if post_json_object['object'].get('content'):
-                        content = post_json_object['object']['content']
+            if text_match:
+                content = \
+                    _calendar_event_content(event_entry['filename'],
+                                            system_language)
                 if content:
                     if not _event_text_match(content, text_match):
                         continue
 
-            public_event = is_public_post(post_json_object)
+            public_event = event_entry['public']
 
             post_event: list[dict] = []
             day_of_month = None
-            for tag in post_json_object['object']['tag']:
+            for tag in event_entry['tags']:
                 if not _is_happening_event(tag):
                     continue
 
@@ -368,6 +516,7 @@ def get_todays_events(base_dir: str, nickname: str, domain: str,
                     tag['sender'] = tag['sender'].replace('#', '/')
                     tag['public'] = public_event
                     tag['language'] = content_language
+                    tag['published'] = event_entry['published']
                 post_event.append(tag)
 
             if not (post_event and day_of_month):
@@ -426,11 +575,14 @@ def _icalendar_day(base_dir: str, nickname: str, domain: str,
         event_is_public: bool = False
         event_start = None
         event_end = None
+        event_published = None
 
         for evnt in event_post:
             if evnt['type'] == 'Event':
                 if evnt.get('id'):
                     post_id = evnt['id']
+                if evnt.get('published'):
+                    event_published = evnt['published']
                 if evnt.get('startTime'):
                     event_start = \
                         date_from_string_format(evnt['startTime'],
@@ -472,26 +624,10 @@ def _icalendar_day(base_dir: str, nickname: str, domain: str,
            not event_description or not sender_actor:
             continue
 
-        # find the corresponding post
-        post_filename = locate_post(base_dir, nickname, domain, post_id)
-        if not post_filename:
-            continue
-
-        post_json_object = load_json(post_filename)
-        if not post_json_object:
+        # the published date of the post, from the event index
+        if not event_published:
             continue
-
-        # get the published date from the post
-        if not post_json_object.get('object'):
-            continue
-        if not isinstance(post_json_object['object'], dict):
-            continue
-        if not post_json_object['object'].get('published'):
-            continue
-        if not isinstance(post_json_object['object']['published'], str):
-            continue
-        published = \
-            _ical_date_string(post_json_object['object']['published'])
+        published = _ical_date_string(event_published)
 
         event_start = \
             _ical_date_string(event_start.strftime("%Y-%m-%dT%H:%M:%SZ"))
@@ -620,22 +756,17 @@ def day_events_check(base_dir: str, nickname: str, domain: str,
         return False
 
     events_exist: bool = False
-    calendar_list: list[str] = \
-        load_list(calendar_filename,
-                  'EX: day_events_check failed to read ' + calendar_filename)
-    if calendar_list is not None:
-        for post_id in calendar_list:
-            post_id = remove_eol(post_id)
-            post_filename = \
-                locate_post(base_dir, nickname, domain, post_id)
-            if not post_filename:
-                continue
-
-            post_json_object = load_json(post_filename)
-            if not _is_happening_post(post_json_object):
+    month_events = \
+        _calendar_month_events(base_dir, nickname, domain,
+                               calendar_filename,
+                               'EX: day_events_check failed to read ' +
+                               calendar_filename)
+    if month_events is not None:
+        for _, event_entry in month_events:
+            if not event_entry:
                 continue
 
-            for tag in post_json_object['object']['tag']:
+            for tag in event_entry['tags']:
                 if not _is_happening_event(tag):
                     continue
                 # this tag is an event or a place
@@ -680,26 +811,20 @@ def get_this_weeks_events(base_dir: str, nickname: str, domain: str) -> {}:
 
     calendar_post_ids: list[str] = []
     recreate_events_file: bool = False
-    calendar_list: list[str] = \
-        load_list(calendar_filename,
-                  'EX: get_this_weeks_events failed to read ' +
-                  calendar_filename)
-    if calendar_list is not None:
-        for post_id in calendar_list:
-            post_id = remove_eol(post_id)
-            post_filename = \
-                locate_post(base_dir, nickname, domain, post_id)
-            if not post_filename:
+    month_events = \
+        _calendar_month_events(base_dir, nickname, domain,
+                               calendar_filename,
+                               'EX: get_this_weeks_events failed to read ' +
+                               calendar_filename)
+    if month_events is not None:
+        for post_id, event_entry in month_events:
+            if not event_entry:
                 recreate_events_file = True
                 continue
 
-            post_json_object = load_json(post_filename)
-            if not _is_happening_post(post_json_object):
-                continue
-
             post_event: list[dict] = []
             week_day_index = None
-            for tag in post_json_object['object']['tag']:
+            for tag in event_entry['tags']:
                 if not _is_happening_event(tag):
                     continue
 
@@ -756,37 +881,32 @@ def get_calendar_events(base_dir: str, nickname: str, domain: str,
 
     calendar_post_ids: list[str] = []
     recreate_events_file: bool = False
-    calendar_list: list[str] = \
-        load_list(calendar_filename,
-                  'EX: get_calendar_events failed to read ' +
-                  calendar_filename)
-    if calendar_list is not None:
-        for post_id in calendar_list:
-            post_id = remove_eol(post_id)
-            post_filename = \
-                locate_post(base_dir, nickname, domain, post_id)
-            if not post_filename:
+    month_events = \
+        _calendar_month_events(base_dir, nickname, domain,
+                               calendar_filename,
+                               'EX: get_calendar_events failed to read ' +
+                               calendar_filename)
+    if month_events is not None:
+        for post_id, event_entry in month_events:
+            if not event_entry:
                 recreate_events_file = True
                 continue
-
-            post_json_object = load_json(post_filename)
-            if not post_json_object:
-                continue
-            if not _is_happening_post(post_json_object):
+            if not event_entry['tags']:
                 continue
             if only_show_reminders:
-                if not is_reminder(post_json_object):
+                if not event_entry['reminder']:
                     continue
 
-            if post_json_object.get('object'):
-                if post_json_object['object'].get('content'):
-                    content = post_json_object['object']['content']
+            if text_match:
+                content = \
+                    _calendar_event_content(event_entry['filename'], None)
+                if content:
                     if not _event_text_match(content, text_match):
                         continue
 
             post_event: list[dict] = []
             day_of_month = None
-            for tag in post_json_object['object']['tag']:
+            for tag in event_entry['tags']:
                 if not _is_happening_event(tag):
                     continue
 
@@ -817,6 +937,7 @@ def get_calendar_events(base_dir: str, nickname: str, domain: str,
                     tag['id'] = post_id.replace('#', '/')
                     tag['sender'] = post_id.split('#statuses#')[0]
                     tag['sender'] = tag['sender'].replace('#', '/')
+                    tag['published'] = event_entry['published']
                 post_event.append(tag)
 
             if not (post_event and day_of_month):
@@ -871,6 +992,18 @@ def remove_calendar_event(base_dir: str, nickname: str, domain: str,
                 'EX: unable to remove calendar event ' +
                 calendar_filename)
 
+    # remove from the event index for the month
+    index_filename = _calendar_index_filename(calendar_filename)
+    if not is_a_file(index_filename):
+        return
+    calendar_index = load_json(index_filename)
+    if not calendar_index:
+        return
+    for post_id in list(calendar_index.keys()):
+        if message_id in post_id:
+            del calendar_index[post_id]
+    save_json(calendar_index, index_filename)
+
 
 def _dav_decode_token(token: str) -> (int, int, str):
     """Decodes a token corresponding to a calendar event
@@ -1085,7 +1218,7 @@ def _dav_store_event(base_dir: str, nickname: str, domain: str,
         return False
     filename = outbox_dir + '/' + post_id.replace('/', '#') + '.json'
     save_json(event_json, filename)
-    save_event_post(base_dir, handle, post_id, event_json)
+    save_event_post(base_dir, handle, post_id, event_json, event_json)
 
     return True
 
@@ -0,0 +1,240 @@
+__filename__ = "hashtagstats.py"
+__author__ = "Bob Mottram"
+__license__ = "AGPL3+"
+__version__ = "1.7.0"
+__maintainer__ = "Bob Mottram"
+__email__ = "bob@libreserver.org"
+__status__ = "Production"
+__module_group__ = "Core"
+
+# In-memory statistics for the hashtags within the tags directory
+
+import os
+import threading
+from datetime import datetime, timezone
+from src.timeFunctions import date_utcnow
+from src.timeFunctions import date_epoch
+from src.data import index_entries_newest_first
+from src.data import load_string
+from src.data import is_a_dir
+
+# number of days for which the uses of each hashtag are counted
+HASHTAG_STATS_DAYS = 7
+
+_HASHTAG_STATS_LOCK = threading.Lock()
+_HASHTAG_STATS = {}
+
+
+def _days_since_epoch() -> int:
+    """Returns the current number of days since the epoch
+    """
+    return (date_utcnow() - date_epoch()).days
+
+
+def _tags_dir_modified(tags_dir: str) -> int:
+    """Returns the modification time of the tags directory
+    """
+    try:
+        return os.stat(tags_dir).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _new_tag_stats() -> {}:
+    """Returns empty statistics for a hashtag
+    """
+    return {
+        "lastUsed": -1,
+        "days": {},
+        "category": None
+    }
+
+
+def _read_tag_usage(tags_filename: str, tag_stats: {},
+                    earliest_day: int) -> None:
+    """Reads the recent uses of a hashtag from its tags file.
+    The newest entries are at the end of the file, so only the
+    end of the file needs to be read
+    """
+    tag_entries = \
+        index_entries_newest_first(tags_filename,
+                                   'EX: _read_tag_usage unable to read ' +
+                                   tags_filename + ' [ex]')
+    for line in tag_entries:
+        day_str = line.split('  ')[0]
+        if not day_str.isdigit():
+            break
+        day = int(day_str)
+        if tag_stats['lastUsed'] < 0:
+            tag_stats['lastUsed'] = day
+        if day < earliest_day:
+            break
+        tag_stats['days'][day] = tag_stats['days'].get(day, 0) + 1
+    if tag_stats['lastUsed'] >= 0:
+        return
+    # no entries, so use the time when the file was last modified
+    try:
+        modified = os.path.getmtime(tags_filename)
+    except OSError:
+        return
+    last_modified_date = datetime.fromtimestamp(modified, timezone.utc)
+    tag_stats['lastUsed'] = (last_modified_date - date_epoch()).days
+
+
+def _load_hashtag_stats(tags_dir: str) -> {}:
+    """Reads statistics for all hashtags within the tags directory
+    """
+    tags = {}
+    earliest_day = _days_since_epoch() - HASHTAG_STATS_DAYS + 1
+    for _, _, files in os.walk(tags_dir):
+        for fname in files:
+            if fname.endswith('.txt'):
+                tag_name = fname[:-len('.txt')]
+                if not tags.get(tag_name):
+                    tags[tag_name] = _new_tag_stats()
+                tags_filename = os.path.join(tags_dir, fname)
+                _read_tag_usage(tags_filename, tags[tag_name], earliest_day)
+            elif fname.endswith('.category'):
+                tag_name = fname[:-len('.category')]
+                if not tags.get(tag_name):
+                    tags[tag_name] = _new_tag_stats()
+                category_filename = os.path.join(tags_dir, fname)
+                category_str = \
+                    load_string(category_filename,
+                                'EX: _load_hashtag_stats unable to read ' +
+                                category_filename)
+                if category_str:
+                    tags[tag_name]['category'] = category_str
+        break
+    return tags
+
+
+def _hashtag_stats_for_dir(base_dir: str) -> {}:
+    """Returns the statistics for hashtags, reading them from the
+    tags directory if needed.
+    This should be called with the lock held
+    """
+    tags_dir = base_dir + '/tags'
+    modified = _tags_dir_modified(tags_dir)
+    stats = _HASHTAG_STATS.get(base_dir)
+    if stats is None or stats['modified'] != modified:
+        stats = {
+            "modified": modified,
+            "tags": _load_hashtag_stats(tags_dir)
+        }
+        _HASHTAG_STATS[base_dir] = stats
+    return stats
+
+
+def _hashtag_stats_after_change(base_dir: str) -> ({}, bool):
+    """Returns the statistics for hashtags after the caller has changed
+    a file within the tags directory, and whether they were just read
+    from the tags directory, in which case they already include the
+    change. A change made by the caller is not a reason to read the
+    whole tags directory again, so the modification time is refreshed.
+    This should be called with the lock held
+    """
+    stats = _HASHTAG_STATS.get(base_dir)
+    if stats is None:
+        return _hashtag_stats_for_dir(base_dir), True
+    stats['modified'] = _tags_dir_modified(base_dir + '/tags')
+    return stats, False
+
+
+def _update_hashtag_stats(base_dir: str, tag_name: str,
+                          used: bool, category: str) -> None:
+    """Updates the statistics for a hashtag after its tags file
+    or category file has been written.
+    A category of None leaves the category unchanged
+    """
+    with _HASHTAG_STATS_LOCK:
+        stats, loaded = _hashtag_stats_after_change(base_dir)
+        tag_stats = stats['tags'].get(tag_name)
+        if tag_stats is None:
+            tag_stats = _new_tag_stats()
+            stats['tags'][tag_name] = tag_stats
+        if used and not loaded:
+            today = _days_since_epoch()
+            tag_stats['lastUsed'] = today
+            days = tag_stats['days']
+            days[today] = days.get(today, 0) + 1
+            for day in list(days.keys()):
+                if day <= today - HASHTAG_STATS_DAYS:
+                    del days[day]
+        if category is not None:
+            if category:
+                tag_stats['category'] = category
+            else:
+                tag_stats['category'] = None
+
+
+def hashtag_used(base_dir: str, tag_name: str) -> None:
+    """Updates the statistics after a post with the given hashtag
+    was added to the tags directory
+    """
+    _update_hashtag_stats(base_dir, tag_name, True, None)
+
+
+def hashtag_category_changed(base_dir: str, tag_name: str,
+                             category: str) -> None:
+    """Updates the statistics after a hashtag category was set,
+    or removed if the category is an empty string
+    """
+    _update_hashtag_stats(base_dir, tag_name, False, category)
+
+
+def hashtag_removed(base_dir: str, tag_name: str) -> None:
+    """Updates the statistics after the tags file for a hashtag
+    is removed from the tags directory
+    """
+    with _HASHTAG_STATS_LOCK:
+        stats, _ = _hashtag_stats_after_change(base_dir)
+        tag_stats = stats['tags'].get(tag_name)
+        if tag_stats is not None:
+            if tag_stats['category']:
+                tag_stats['lastUsed'] = -1
+                tag_stats['days'] = {}
+            else:
+                del stats['tags'][tag_name]
+
+
+def get_hashtag_stats(base_dir: str, days: int) -> {}:
+    """Returns statistics for hashtags used within the given number
+    of days, or for all hashtags if the number of days is zero.
+    Each hashtag has the last day on which it was used, the number of
+    uses within the given number of days and its category
+    """
+    result = {}
+    if not is_a_dir(base_dir + '/tags'):
+        return result
+    today = _days_since_epoch()
+    earliest_day = today - days + 1
+    with _HASHTAG_STATS_LOCK:
+        stats = _hashtag_stats_for_dir(base_dir)
+        for tag_name, tag_stats in stats['tags'].items():
+            if days > 0 and tag_stats['lastUsed'] < earliest_day:
+                continue
+            uses = 0
+            for day, count in tag_stats['days'].items():
+                if day >= earliest_day or days <= 0:
+                    uses += count
+            result[tag_name] = {
+                "lastUsed": tag_stats['lastUsed'],
+                "uses": uses,
+                "category": tag_stats['category']
+            }
+    return result
+
+
+def get_hashtag_stats_category(base_dir: str, tag_name: str) -> str:
+    """Returns the category for a hashtag, or None if it has
+    no category
+    """
+    if not is_a_dir(base_dir + '/tags'):
+        return None
+    with _HASHTAG_STATS_LOCK:
+        stats = _hashtag_stats_for_dir(base_dir)
+        tag_stats = stats['tags'].get(tag_name)
+        if tag_stats is None:
+            return None
+        return tag_stats['category']
@@ -7,6 +7,7 @@ __email__ = "bob@libreserver.org"
 __status__ = "Production"
 __module_group__ = "Core"
 
+import os
 import urllib.parse
 from hashlib import md5
 from src.utils import string_contains
@@ -20,6 +21,9 @@ from src.data import load_string
 from src.data import save_string
 from src.data import is_a_file
 
+# size of the chunks in which files are read when calculating etags
+ETAG_CHUNK_SIZE = 1024 * 1024
+
 
 def login_headers(self, file_format: str, length: int,
                   calling_domain: str) -> None:
@@ -131,8 +135,9 @@ def clear_login_details(self, nickname: str, calling_domain: str) -> None:
 
 
 def _set_headers_base(self, file_format: str, length: int, cookie: str,
-                      calling_domain: str, permissive: bool) -> None:
-    self.send_response(200)
+                      calling_domain: str, permissive: bool,
+                      http_code: int = 200) -> None:
+    self.send_response(http_code)
     self.send_header('Content-type', file_format)
     if string_contains(file_format, ('image/', 'audio/', 'video/')):
         cache_control = 'public, max-age=84600, immutable'
@@ -212,37 +217,115 @@ def set_headers_head(self, file_format: str, length: int, etag: str,
                       permissive)
     if etag:
         self.send_header('ETag', '"' + etag + '"')
+        # media files can be requested in byte ranges
+        self.send_header('accept-ranges', 'bytes')
     if last_modified_time_str:
         self.send_header('last-modified',
                          last_modified_time_str)
     self.end_headers()
 
 
+def _etag_is_current(media_filename: str, etag_filename: str) -> bool:
+    """Is the etag file at least as recent as the file which it
+    describes? If the file was replaced, such as when a new avatar
+    is uploaded, then its etag needs to be calculated again
+    """
+    try:
+        etag_time = os.path.getmtime(etag_filename)
+        media_time = os.path.getmtime(media_filename)
+    except OSError:
+        return False
+    return etag_time >= media_time
+
+
+def load_etag(media_filename: str) -> str:
+    """Returns the stored etag for a file, or None if there is no
+    etag or if the file has changed since the etag was stored
+    """
+    etag_filename = media_filename + '.etag'
+    if not is_a_file(etag_filename):
+        return None
+    if not _etag_is_current(media_filename, etag_filename):
+        return None
+    return load_string(etag_filename,
+                       'EX: load_etag unable to read ' + etag_filename)
+
+
+def media_file_etag(media_filename: str) -> str:
+    """Returns the etag for a file. If it needs to be calculated then
+    the file is read in chunks, so that large media files are not
+    loaded into memory
+    """
+    etag = load_etag(media_filename)
+    if etag:
+        return etag
+    file_hash = md5()  # nosec
+    try:
+        with open(media_filename, 'rb') as fp_media:
+            while True:
+                chunk = fp_media.read(ETAG_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_hash.update(chunk)
+    except OSError as exc:
+        print('EX: media_file_etag unable to read ' + media_filename +
+              ' ' + str(exc))
+        return None
+    etag = file_hash.hexdigest()
+    etag_filename = media_filename + '.etag'
+    save_string(etag, etag_filename,
+                'EX: media_file_etag unable to write ' + etag_filename)
+    return etag
+
+
 def set_headers_etag(self, media_filename: str, file_format: str,
                      data, cookie: str, calling_domain: str,
                      permissive: bool, last_modified: str) -> None:
     datalen = len(data)
     _set_headers_base(self, file_format, datalen, cookie, calling_domain,
                       permissive)
-    etag = None
-    etag_filename = media_filename + '.etag'
-    if is_a_file(etag_filename):
-        etag = load_string(etag_filename,
-                           'EX: _set_headers_etag ' +
-                           'unable to read ' + etag_filename)
+    etag = load_etag(media_filename)
     if not etag:
         etag = md5(data).hexdigest()  # nosec
+        etag_filename = media_filename + '.etag'
         save_string(etag, etag_filename,
                     'EX: _set_headers_etag ' +
                     'unable to write ' + etag_filename)
-    # if etag:
-    #     self.send_header('ETag', '"' + etag + '"')
+    if etag:
+        self.send_header('ETag', '"' + etag + '"')
     if last_modified:
         self.send_header('last-modified', last_modified)
+    self.end_headers()
+
+
+def set_headers_media(self, file_format: str, length: int, etag: str,
+                      cookie: str, calling_domain: str, permissive: bool,
+                      last_modified: str, http_code: int,
+                      content_range: str) -> None:
+    """Headers for a media file, or for part of it if a byte range
+    was requested
+    """
+    _set_headers_base(self, file_format, length, cookie, calling_domain,
+                      permissive, http_code)
+    if etag:
+        self.send_header('ETag', '"' + etag + '"')
+    if last_modified:
+        self.send_header('last-modified', last_modified)
+    if content_range:
+        self.send_header('Content-Range', content_range)
     self.send_header('accept-ranges', 'bytes')
     self.end_headers()
 
 
+def set_headers_range_not_satisfiable(self, file_size: int) -> None:
+    """None of the requested byte ranges are within the file
+    """
+    self.send_response(416)
+    self.send_header('Content-Range', 'bytes */' + str(file_size))
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+
 def update_headers_catalog(base_dir: str, headers_catalog: {},
                            headers: {}) -> None:
     """Creates a catalog of headers
@@ -0,0 +1,189 @@
+__filename__ = "httpmedia.py"
+__author__ = "Bob Mottram"
+__license__ = "AGPL3+"
+__version__ = "1.7.0"
+__maintainer__ = "Bob Mottram"
+__email__ = "bob@libreserver.org"
+__status__ = "Production"
+__module_group__ = "Core"
+
+# Sending of media files over HTTP, with etags and byte ranges
+
+import os
+import secrets
+from src.httpcodes import write2
+from src.httpheaders import media_file_etag
+from src.httpheaders import set_headers_media
+from src.httpheaders import set_headers_range_not_satisfiable
+
+# maximum number of byte ranges within a Range request header
+MAX_BYTE_RANGES = 16
+
+
+def parse_byte_ranges(range_str: str, file_size: int) -> []:
+    """Parses a Range request header, returning a list of (start, end)
+    byte positions where the end is inclusive.
+    An empty list means that the whole file should be sent, and None
+    means that none of the ranges are within the file
+    """
+    if not range_str or file_size <= 0:
+        return []
+    range_str = range_str.strip()
+    if not range_str.startswith('bytes='):
+        return []
+    range_specs = range_str[len('bytes='):].split(',')
+    if len(range_specs) > MAX_BYTE_RANGES:
+        # too many ranges, so send the whole file
+        return []
+    byte_ranges: list[tuple] = []
+    for spec in range_specs:
+        spec = spec.strip()
+        if '-' not in spec:
+            return []
+        start_str, end_str = spec.split('-', 1)
+        start_str = start_str.strip()
+        end_str = end_str.strip()
+        if not start_str:
+            # the last N bytes of the file
+            if not end_str.isdigit():
+                return []
+            suffix_length = int(end_str)
+            if suffix_length == 0:
+                continue
+            start = max(file_size - suffix_length, 0)
+            end = file_size - 1
+        else:
+            if not start_str.isdigit():
+                return []
+            start = int(start_str)
+            end = file_size - 1
+            if end_str:
+                if not end_str.isdigit():
+                    return []
+                end_value = int(end_str)
+                if end_value < start:
+                    return []
+                end = min(end_value, file_size - 1)
+            if start >= file_size:
+                continue
+        byte_ranges.append((start, end))
+    if not byte_ranges:
+        return None
+    return byte_ranges
+
+
+def _send_file_range(self, fp_media, start: int, length: int) -> bool:
+    """Sends part of a file. The socket sendfile is used, which avoids
+    copying the file through memory where the connection allows it
+    """
+    if length <= 0:
+        return True
+    try:
+        self.wfile.flush()
+        self.connection.sendfile(fp_media, start, length)
+    except (BrokenPipeError, ConnectionResetError) as exc:
+        # this is common when audio or video is seeked
+        if self.server.debug:
+            print('EX: _send_file_range connection closed ' + str(exc))
+        return False
+    except OSError as exc:
+        print('EX: _send_file_range unable to send ' + str(exc))
+        return False
+    return True
+
+
+def _byte_range_str(start: int, end: int, file_size: int) -> str:
+    """Returns the value of a Content-Range header
+    """
+    return 'bytes ' + str(start) + '-' + str(end) + '/' + str(file_size)
+
+
+def _send_multipart_ranges(self, fp_media, byte_ranges: [],
+                           file_size: int, file_format: str, etag: str,
+                           cookie: str, calling_domain: str,
+                           permissive: bool, last_modified: str) -> None:
+    """Sends multiple byte ranges of a file as multipart/byteranges
+    """
+    boundary = secrets.token_hex(16)
+    part_headers: list[bytes] = []
+    content_length: int = 0
+    for start, end in byte_ranges:
+        content_range = _byte_range_str(start, end, file_size)
+        part_header_str = \
+            '\r\n--' + boundary + '\r\n' + \
+            'Content-Type: ' + file_format + '\r\n' + \
+            'Content-Range: ' + content_range + '\r\n\r\n'
+        part_header = part_header_str.encode('utf-8')
+        part_headers.append(part_header)
+        content_length += len(part_header) + end - start + 1
+    closing_str = '\r\n--' + boundary + '--\r\n'
+    closing = closing_str.encode('utf-8')
+    content_length += len(closing)
+
+    multipart_format = 'multipart/byteranges; boundary=' + boundary
+    set_headers_media(self, multipart_format, content_length, etag,
+                      cookie, calling_domain, permissive, last_modified,
+                      206, None)
+    for index, byte_range in enumerate(byte_ranges):
+        start, end = byte_range
+        if not write2(self, part_headers[index]):
+            return
+        if not _send_file_range(self, fp_media, start, end - start + 1):
+            return
+    write2(self, closing)
+
+
+def send_media_file(self, media_filename: str, file_format: str,
+                    cookie: str, calling_domain: str,
+                    permissive: bool, last_modified: str) -> bool:
+    """Sends a media file with an etag, or the byte ranges of it
+    which were requested.
+    Returns False if the file could not be read, in which case nothing
+    has been sent
+    """
+    try:
+        fp_media = open(media_filename, 'rb')
+    except OSError as exc:
+        print('EX: send_media_file unable to open ' + media_filename +
+              ' ' + str(exc))
+        return False
+
+    with fp_media:
+        file_size = os.fstat(fp_media.fileno()).st_size
+        etag = media_file_etag(media_filename)
+
+        byte_ranges: list[tuple] = []
+        range_str = self.headers.get('Range')
+        if range_str:
+            # ranges are only sent if the client has the same version
+            # of the file, otherwise the whole file is sent
+            if_range = self.headers.get('If-Range')
+            if if_range:
+                if_range = if_range.strip().replace('"', '')
+            if not if_range or if_range in (etag, last_modified):
+                byte_ranges = parse_byte_ranges(range_str, file_size)
+
+        if byte_ranges is None:
+            set_headers_range_not_satisfiable(self, file_size)
+            return True
+
+        if not byte_ranges:
+            set_headers_media(self, file_format, file_size, etag,
+                              cookie, calling_domain, permissive,
+                              last_modified, 200, None)
+            _send_file_range(self, fp_media, 0, file_size)
+            return True
+
+        if len(byte_ranges) == 1:
+            start, end = byte_ranges[0]
+            content_range = _byte_range_str(start, end, file_size)
+            set_headers_media(self, file_format, end - start + 1, etag,
+                              cookie, calling_domain, permissive,
+                              last_modified, 206, content_range)
+            _send_file_range(self, fp_media, start, end - start + 1)
+            return True
+
+        _send_multipart_ranges(self, fp_media, byte_ranges, file_size,
+                               file_format, etag, cookie, calling_domain,
+                               permissive, last_modified)
+    return True
@@ -13,9 +13,6 @@ __module_group__ = "Security"
 # This might change in future
 # see https://tools.ietf.org/html/draft-ietf-httpbis-message-signatures
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
-from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import utils as hazutils
@@ -23,6 +20,8 @@ import base64
 from time import gmtime, strftime
 from src.utils import get_full_domain
 from src.utils import get_sha_256
+from src.keycache import load_private_key
+from src.keycache import load_public_key
 from src.utils import get_sha_512
 from src.utils import local_actor_url
 from src.timeFunctions import date_epoch
@@ -70,9 +69,12 @@ def sign_post_headers(date_str: str, private_key_pem: str,
                       path: str, http_prefix: str,
                       message_body_json_str: str,
                       content_type: str, algorithm: str,
-                      digest_algorithm: str) -> str:
+                      digest_algorithm: str,
+                      body_digest: str = None) -> str:
     """Returns a raw signature string that can be plugged into a header and
     used to verify the authenticity of an HTTP transmission.
+    If the digest of the message body is already known then it can be
+    given, so that it isn't calculated again
     """
     domain = get_full_domain(domain, port)
 
@@ -94,8 +96,10 @@ def sign_post_headers(date_str: str, private_key_pem: str,
             'accept': content_type
         }
     else:
-        body_digest = \
-            message_content_digest(message_body_json_str, digest_algorithm)
+        if not body_digest:
+            body_digest = \
+                message_content_digest(message_body_json_str,
+                                       digest_algorithm)
         digest_prefix = get_digest_prefix(digest_algorithm)
         content_length = len(message_body_json_str)
         headers = {
@@ -106,8 +110,7 @@ def sign_post_headers(date_str: str, private_key_pem: str,
             'content-type': 'application/activity+json',
             'content-length': str(content_length)
         }
-    key = load_pem_private_key(private_key_pem.encode('utf-8'),
-                               None, backend=default_backend())
+    key = load_private_key(private_key_pem)
     # headers.update({
     #     '(request-target)': f'post {path}',
     # })
@@ -194,8 +197,7 @@ def sign_post_headers_new(date_str: str, private_key_pem: str,
             'content-type': 'application/activity+json',
             'content-length': str(content_length)
         }
-    key = load_pem_private_key(private_key_pem.encode('utf-8'),
-                               None, backend=default_backend())
+    key = load_private_key(private_key_pem)
     # build a digest for signing
     signed_header_keys = headers.keys()
     signed_header_text: str = ''
@@ -247,8 +249,10 @@ def create_signed_header(date_str: str, private_key_pem: str, nickname: str,
                          to_domain: str, to_port: int,
                          path: str, http_prefix: str, with_digest: bool,
                          message_body_json_str: str,
-                         content_type: str) -> {}:
-    """Note that the domain is the destination, not the sender
+                         content_type: str,
+                         body_digest: str = None) -> {}:
+    """Note that the domain is the destination, not the sender.
+    body_digest is the digest of the message body, if it is already known
     """
     algorithm = 'rsa-sha256'
     digest_algorithm = 'rsa-sha256'
@@ -275,8 +279,9 @@ def create_signed_header(date_str: str, private_key_pem: str, nickname: str,
                               path, http_prefix, None, content_type,
                               algorithm, None)
     else:
-        body_digest = message_content_digest(message_body_json_str,
-                                             digest_algorithm)
+        if not body_digest:
+            body_digest = message_content_digest(message_body_json_str,
+                                                 digest_algorithm)
         digest_prefix = get_digest_prefix(digest_algorithm)
         content_length = len(message_body_json_str)
         headers = {
@@ -292,7 +297,8 @@ def create_signed_header(date_str: str, private_key_pem: str, nickname: str,
                               domain, port,
                               to_domain, to_port,
                               path, http_prefix, message_body_json_str,
-                              content_type, algorithm, digest_algorithm)
+                              content_type, algorithm, digest_algorithm,
+                              body_digest)
     headers['signature'] = signature_header
     return headers
 
@@ -349,8 +355,7 @@ def verify_post_headers(http_prefix: str,
         print('verify_post_headers message_body_json_str: ' +
               str(message_body_json_str))
 
-    pubkey = load_pem_public_key(public_key_pem.encode('utf-8'),
-                                 backend=default_backend())
+    pubkey = load_public_key(public_key_pem)
     # Build a dictionary of the signature values
     if headers.get('Signature-Input') or headers.get('signature-input'):
         if headers.get('Signature-Input'):
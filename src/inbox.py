@@ -12,7 +12,10 @@ import os
 import datetime
 import time
 import random
+import heapq
+import threading
 from shutil import copyfile
+from concurrent.futures import ThreadPoolExecutor
 from src.linked_data_sig import verify_json_signature
 from src.flags import can_reply_to
 from src.flags import is_system_account
@@ -69,7 +72,7 @@ from src.utils import evil_nickname
 from src.status import get_status_number
 from src.httpsig import get_digest_algorithm_from_headers
 from src.httpsig import verify_post_headers
-from src.session import create_session
+from src.session import get_shared_session
 from src.follow import is_following_actor
 from src.follow import get_followers_of_actor
 from src.follow import is_follower_of_person
@@ -81,6 +84,9 @@ from src.follow import follow_approval_required
 from pprint import pprint
 from src.cache import cache_svg_images
 from src.cache import get_person_pub_key
+from src.cache import get_cached_person_pub_key
+from src.cache import person_cache_evict
+from src.siteactive import site_is_available
 from src.acceptreject import receive_accept_reject
 from src.acceptreject import receive_quote_request
 from src.blocking import is_blocked
@@ -143,6 +149,7 @@ from src.inbox_receive_undo import receive_undo_reaction
 from src.inbox_receive_undo import receive_undo_bookmark
 from src.inbox_receive_undo import receive_undo_announce
 from src.inbox_receive_undo import receive_undo
+from src.data import append_index_entry
 from src.data import save_string
 from src.data import save_flag_file
 from src.data import load_string
@@ -155,6 +162,14 @@ from src.data import makedir
 from src.content_labels import store_content_labels
 
 
+# the inbox queue is pushed to by http threads and removed from by
+# the inbox queue thread, so changes to it are made with this lock held
+_INBOX_QUEUE_LOCK = threading.Lock()
+
+# maximum time to wait for the public key of the sender of a queue item
+KEY_PENDING_TIMEOUT_SEC = 120
+
+
 def _store_last_post_id(base_dir: str, nickname: str, domain: str,
                         post_json_object: {}) -> None:
     """Stores the id of the last post made by an actor
@@ -987,9 +1002,9 @@ def update_edited_post(base_dir: str,
     index_filename = \
         acct_dir(base_dir, nickname, domain) + '/' + box_name + '.index'
     if not text_in_file(id_str, index_filename):
-        prepend_string(id_str, index_filename,
-                       'WARN: Failed to prepend index after edit ' +
-                       index_filename + ' [ex]')
+        append_index_entry(id_str, index_filename,
+                           'WARN: Failed to append index after edit ' +
+                           index_filename + ' [ex]')
 
 
 def populate_replies(base_dir: str, http_prefix: str, domain: str,
@@ -1202,7 +1217,7 @@ def _send_to_group_members(server, session, session_onion,
                            onion_domain: str, i2p_domain: str,
                            yggdrasil_domain: str,
                            signing_priv_key_pem: str,
-                           sites_unavailable: [],
+                           sites_unavailable: {},
                            system_language: str,
                            mitm_servers: []) -> None:
     """When a post arrives for a group send it out to the group members
@@ -1320,7 +1335,8 @@ def _inbox_update_calendar_from_tag(base_dir: str, handle: str,
             continue
         if not tag_dict.get('startTime'):
             continue
-        save_event_post(base_dir, handle, post_id, tag_dict)
+        save_event_post(base_dir, handle, post_id, tag_dict,
+                        post_json_object)
 
 
 def _inbox_update_calendar_from_event(base_dir: str, handle: str,
@@ -1356,7 +1372,8 @@ def _inbox_update_calendar_from_event(base_dir: str, handle: str,
         return
 
     post_id = remove_id_ending(post_json_object['id']).replace('/', '#')
-    save_event_post(base_dir, handle, post_id, post_json_object['object'])
+    save_event_post(base_dir, handle, post_id, post_json_object['object'],
+                    post_json_object)
 
 
 def _update_last_seen(base_dir: str, handle: str, actor: str) -> None:
@@ -1409,7 +1426,7 @@ def _bounce_dm(sender_post_id: str, session, http_prefix: str,
                bounce_is_chat: bool,
                curr_domain: str, onion_domain: str, i2p_domain: str,
                yggdrasil_domain: str,
-               sites_unavailable: [],
+               sites_unavailable: {},
                mitm_servers: []) -> bool:
     """Sends a bounce message back to the sending handle
     if a DM has been rejected
@@ -1532,7 +1549,7 @@ def _is_valid_dm(base_dir: str, nickname: str, domain: str, port: int,
                  languages_understood: [],
                  curr_domain: str, onion_domain: str, i2p_domain: str,
                  yggdrasil_domain: str,
-                 sites_unavailable: [],
+                 sites_unavailable: {},
                  mitm_servers: []) -> bool:
     """Is the given message a valid DM?
     """
@@ -1929,7 +1946,7 @@ def _inbox_after_initial(server, inbox_start_time,
                          mitm: bool, bold_reading: bool,
                          dogwhistles: {},
                          max_hashtags: int, buy_sites: {},
-                         sites_unavailable: [],
+                         sites_unavailable: {},
                          mitm_servers: [],
                          instance_software: {}) -> bool:
     """ Anything which needs to be done after initial checks have passed
@@ -2347,7 +2364,8 @@ def _inbox_after_initial(server, inbox_start_time,
                         server.block_military,
                         server.block_government,
                         server.block_bluesky,
-                        server.block_nostr):
+                        server.block_nostr,
+                        server.sites_unavailable):
         if debug:
             print('DEBUG: Announce accepted from ' + actor)
         fitness_performance(inbox_start_time, server.fitness,
@@ -2892,11 +2910,11 @@ def _inbox_after_initial(server, inbox_start_time,
     return True
 
 
-def clear_queue_items(base_dir: str, queue: []) -> None:
+def clear_queue_items(base_dir: str, queue: {}) -> None:
     """Clears the queue for each account
     """
     ctr: int = 0
-    queue.clear()
+    inbox_queue_clear(queue)
     dir_str = data_dir(base_dir)
     for _, dirs, _ in os.walk(dir_str):
         for account in dirs:
@@ -2916,10 +2934,87 @@ def clear_queue_items(base_dir: str, queue: []) -> None:
         print('Removed ' + str(ctr) + ' inbox queue items')
 
 
-def _restore_queue_items(base_dir: str, queue: []) -> None:
-    """Checks the queue for each account and appends filenames
+def inbox_queue_create() -> {}:
+    """Returns a new inbox queue.
+    The heap contains (arrival time, filename) so that the oldest item
+    can be obtained without sorting, and the set of filenames allows
+    duplicates to be detected without scanning the heap
+    """
+    return {
+        "heap": [],
+        "filenames": set()
+    }
+
+
+def inbox_queue_length(queue: {}) -> int:
+    """Returns the number of items within the inbox queue
+    """
+    return len(queue['heap'])
+
+
+def inbox_queue_push(queue: {}, queue_filename: str,
+                     arrival_time: float) -> None:
+    """Adds a filename to the inbox queue
+    """
+    with _INBOX_QUEUE_LOCK:
+        if queue_filename in queue['filenames']:
+            return
+        heapq.heappush(queue['heap'], (arrival_time, queue_filename))
+        queue['filenames'].add(queue_filename)
+
+
+def _inbox_queue_head(queue: {}) -> str:
+    """Returns the filename of the oldest item in the inbox queue
+    """
+    with _INBOX_QUEUE_LOCK:
+        if not queue['heap']:
+            return None
+        return queue['heap'][0][1]
+
+
+def inbox_queue_remove(queue: {}, queue_filename: str) -> float:
+    """Removes a filename from the inbox queue.
+    This is usually the oldest item, which is removed from the
+    top of the heap.
+    Returns the arrival time of the removed item, or None
+    """
+    with _INBOX_QUEUE_LOCK:
+        if queue_filename not in queue['filenames']:
+            return None
+        queue['filenames'].discard(queue_filename)
+        heap = queue['heap']
+        if heap[0][1] == queue_filename:
+            arrival_time, _ = heapq.heappop(heap)
+            return arrival_time
+        for index, item in enumerate(heap):
+            if item[1] == queue_filename:
+                heap[index] = heap[-1]
+                heap.pop()
+                heapq.heapify(heap)
+                return item[0]
+    return None
+
+
+def inbox_queue_clear(queue: {}) -> None:
+    """Removes all items from the inbox queue
+    """
+    with _INBOX_QUEUE_LOCK:
+        queue['heap'].clear()
+        queue['filenames'].clear()
+
+
+def _inbox_queue_oldest(queue: {}, no_of_items: int) -> []:
+    """Returns the oldest items within the inbox queue
+    """
+    with _INBOX_QUEUE_LOCK:
+        return heapq.nsmallest(no_of_items, queue['heap'])
+
+
+def _restore_queue_items(base_dir: str, queue: {}) -> None:
+    """Checks the queue for each account and adds filenames
+    ordered by the time when they arrived
     """
-    queue.clear()
+    restored: list[tuple] = []
     dir_str = data_dir(base_dir)
     for _, dirs, _ in os.walk(dir_str):
         for account in dirs:
@@ -2928,11 +3023,22 @@ def _restore_queue_items(base_dir: str, queue: []) -> None:
                 continue
             for _, _, queuefiles in os.walk(queue_dir):
                 for qfile in queuefiles:
-                    queue.append(os.path.join(queue_dir, qfile))
+                    queue_filename = os.path.join(queue_dir, qfile)
+                    try:
+                        arrival_time = os.path.getmtime(queue_filename)
+                    except OSError:
+                        print('EX: _restore_queue_items ' +
+                              'unable to get time of ' + queue_filename)
+                        continue
+                    restored.append((arrival_time, queue_filename))
                 break
         break
-    if queue:
-        print('Restored ' + str(len(queue)) + ' inbox queue items')
+    inbox_queue_clear(queue)
+    for arrival_time, queue_filename in restored:
+        inbox_queue_push(queue, queue_filename, arrival_time)
+    if inbox_queue_length(queue) > 0:
+        print('Restored ' + str(inbox_queue_length(queue)) +
+              ' inbox queue items')
 
 
 def run_inbox_queue_watchdog(httpd, project_version: str,
@@ -2993,7 +3099,7 @@ def run_inbox_queue_watchdog(httpd, project_version: str,
                                         httpd.default_reply_interval_hrs,
                                         httpd.cw_lists,
                                         httpd.max_hashtags), daemon=True)
-            httpd.inbox_queue.clear()
+            inbox_queue_clear(httpd.inbox_queue)
             begin_thread(httpd.thrInboxQueue, 'run_inbox_queue_watchdog 2')
             print('Restarting inbox queue...')
             httpd.restart_inbox_queue_in_progress = False
@@ -3018,13 +3124,12 @@ def _inbox_quota_exceeded(queue: {}, queue_filename: str,
                 print('Queue: Quota per day - Maximum posts for ' +
                       post_domain + ' reached (' +
                       str(domain_max_posts_per_day) + ')')
-                if queue:
+                if inbox_queue_length(queue) > 0:
                     ex_text = \
                         'EX: _inbox_quota_exceeded unable to delete 1 ' + \
                         str(queue_filename)
                     erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
+                    inbox_queue_remove(queue, queue_filename)
                 return True
             quotas_daily['domains'][post_domain] += 1
         else:
@@ -3040,13 +3145,12 @@ def _inbox_quota_exceeded(queue: {}, queue_filename: str,
                 print('Queue: Quota per min - Maximum posts for ' +
                       post_domain + ' reached (' +
                       str(domain_max_posts_per_min) + ')')
-                if queue:
+                if inbox_queue_length(queue) > 0:
                     ex_text = \
                         'EX: _inbox_quota_exceeded unable to delete 2 ' + \
                         str(queue_filename)
                     erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
+                    inbox_queue_remove(queue, queue_filename)
                 return True
             quotas_per_min['domains'][post_domain] += 1
         else:
@@ -3061,13 +3165,12 @@ def _inbox_quota_exceeded(queue: {}, queue_filename: str,
                       ' Maximum posts for ' +
                       post_handle + ' reached (' +
                       str(account_max_posts_per_day) + ')')
-                if queue:
+                if inbox_queue_length(queue) > 0:
                     ex_text = \
                         'EX: _inbox_quota_exceeded unable to delete 3 ' + \
                         str(queue_filename)
                     erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
+                    inbox_queue_remove(queue, queue_filename)
                 return True
             quotas_daily['accounts'][post_handle] += 1
         else:
@@ -3083,13 +3186,12 @@ def _inbox_quota_exceeded(queue: {}, queue_filename: str,
                       ' Maximum posts for ' +
                       post_handle + ' reached (' +
                       str(account_max_posts_per_min) + ')')
-                if queue:
+                if inbox_queue_length(queue) > 0:
                     ex_text = \
                         'EX: _inbox_quota_exceeded unable to delete 4 ' + \
                         str(queue_filename)
                     erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
+                    inbox_queue_remove(queue, queue_filename)
                 return True
             quotas_per_min['accounts'][post_handle] += 1
         else:
@@ -3169,7 +3271,7 @@ def _receive_follow_request(session, session_onion, session_i2p,
                             signing_priv_key_pem: str,
                             unit_test: bool, system_language: str,
                             followers_sync_cache: {},
-                            sites_unavailable: [],
+                            sites_unavailable: {},
                             mitm_servers: []) -> bool:
     """Receives a follow request within the POST section of HTTPServer
     """
@@ -3496,12 +3598,414 @@ def split_post_collection(collection_post_json: {}) -> []:
     return posts_list
 
 
+def _get_queue_item_key_id(queue_json: {}) -> str:
+    """Returns the keyId from the http signature of a queue item
+    """
+    signature_params = \
+        queue_json['httpHeaders']['signature'].split(',')
+    for signature_item in signature_params:
+        if signature_item.startswith('keyId='):
+            if '"' in signature_item:
+                return signature_item.split('"')[1]
+    return None
+
+
+def _inbox_fetch_pub_key(base_dir: str, session, key_id: str,
+                         person_cache: {}, debug: bool,
+                         project_version: str, http_prefix: str,
+                         domain: str, onion_domain: str, i2p_domain: str,
+                         yggdrasil_domain: str, signing_priv_key_pem: str,
+                         mitm_servers: [], key_fetches: {},
+                         sites_unavailable: {}) -> None:
+    """Obtains the public key for an actor in the background, so that
+    the inbox queue is not stalled by slow or unresponsive servers.
+    Once fetched the key is within the person cache
+    """
+    for tries in range(8):
+        # don't connect to an instance which is known to be down
+        if not site_is_available(sites_unavailable, key_id):
+            if debug:
+                print('DEBUG: instance unavailable for public key ' +
+                      key_id)
+            break
+        pub_key = \
+            get_person_pub_key(base_dir, session, key_id,
+                               person_cache, debug,
+                               project_version, http_prefix,
+                               domain, onion_domain, i2p_domain,
+                               yggdrasil_domain,
+                               signing_priv_key_pem,
+                               mitm_servers)
+        if pub_key:
+            if isinstance(pub_key, dict):
+                # http code error
+                break
+            key_fetches[key_id] = 'found'
+            return
+        if debug:
+            print('DEBUG: Retry ' + str(tries+1) +
+                  ' obtaining public key for ' + key_id)
+        time.sleep(1 + tries)
+    key_fetches[key_id] = 'failed'
+
+
+def inbox_park_queue_item(queue: {}, queue_filename: str, key_id: str,
+                          key_pending: {}, key_fetches: {},
+                          timeout_sec: int,
+                          base_dir: str, session,
+                          person_cache: {}, debug: bool,
+                          project_version: str, http_prefix: str,
+                          domain: str, onion_domain: str, i2p_domain: str,
+                          yggdrasil_domain: str, signing_priv_key_pem: str,
+                          mitm_servers: [], sites_unavailable: {}) -> None:
+    """Moves a queue item whose sender's public key is not yet known
+    out of the inbox queue and into the key pending queue, and begins
+    fetching the key in the background
+    """
+    arrival_time = inbox_queue_remove(queue, queue_filename)
+    if arrival_time is None:
+        arrival_time = time.time()
+    if queue_filename in key_pending:
+        return
+    key_pending[queue_filename] = {
+        "keyId": key_id,
+        "arrival": arrival_time,
+        "deadline": time.time() + timeout_sec
+    }
+    if key_fetches.get(key_id) == 'pending':
+        # the key for this actor is already being fetched
+        return
+    key_fetches[key_id] = 'pending'
+    if debug:
+        print('Queue: fetching public key in the background ' + key_id)
+    thr = \
+        thread_with_trace(target=_inbox_fetch_pub_key,
+                          args=(base_dir, session, key_id,
+                                person_cache, debug,
+                                project_version, http_prefix,
+                                domain, onion_domain, i2p_domain,
+                                yggdrasil_domain, signing_priv_key_pem,
+                                mitm_servers, key_fetches,
+                                sites_unavailable), daemon=True)
+    begin_thread(thr, 'inbox_park_queue_item')
+
+
+def inbox_requeue_key_pending(queue: {}, key_pending: {},
+                              key_fetches: {}, debug: bool) -> None:
+    """Returns items to the inbox queue once the public key of their
+    sender has been fetched, or drops them if the key could not be
+    obtained before the deadline
+    """
+    if not key_pending:
+        return
+    curr_time = time.time()
+    removals: list[str] = []
+    for queue_filename, item in key_pending.items():
+        status = key_fetches.get(item['keyId'])
+        if status == 'found':
+            inbox_queue_push(queue, queue_filename, item['arrival'])
+            removals.append(queue_filename)
+            continue
+        if status == 'pending' and curr_time < item['deadline']:
+            continue
+        print('Queue: public key could not be obtained from ' +
+              item['keyId'])
+        if is_a_file(queue_filename):
+            erase_file(queue_filename,
+                       'EX: inbox_requeue_key_pending unable to delete ' +
+                       str(queue_filename))
+        removals.append(queue_filename)
+    for queue_filename in removals:
+        del key_pending[queue_filename]
+
+    # forget completed fetches which no longer have items waiting
+    waiting_key_ids: list[str] = []
+    for item in key_pending.values():
+        waiting_key_ids.append(item['keyId'])
+    completed_key_ids: list[str] = []
+    for key_id, status in key_fetches.items():
+        if status != 'pending' and key_id not in waiting_key_ids:
+            completed_key_ids.append(key_id)
+    for key_id in completed_key_ids:
+        del key_fetches[key_id]
+    if debug and removals:
+        print('Queue: ' + str(len(removals)) +
+              ' items returned from key pending queue')
+
+
+def _inbox_item_session(queue_json: {}, session, session_onion,
+                        session_i2p, session_yggdrasil,
+                        proxy_type: str):
+    """Returns the session to be used for the sender of a queue item
+    """
+    if not queue_json.get('actor'):
+        return session
+    if not isinstance(queue_json['actor'], str):
+        return session
+    sender_domain, _ = get_domain_from_actor(queue_json['actor'])
+    if not sender_domain:
+        return session
+    if sender_domain.endswith('.onion') and \
+       session_onion and proxy_type != 'tor':
+        return session_onion
+    if sender_domain.endswith('.i2p') and \
+       session_i2p and proxy_type != 'i2p':
+        return session_i2p
+    if is_yggdrasil_address(sender_domain) and \
+       session_yggdrasil and proxy_type != 'yggdrasil':
+        return session_yggdrasil
+    return session
+
+
+def _inbox_verify_item(server, curr_session, queue_json: {},
+                       base_dir: str, person_cache: {}, debug: bool,
+                       project_version: str, http_prefix: str,
+                       domain: str, onion_domain: str, i2p_domain: str,
+                       yggdrasil_domain: str, signing_priv_key_pem: str,
+                       verify_all_signatures: bool) -> (str, str, bool):
+    """Obtains the public key of the sender of a queue item and checks
+    its http header signature and any jsonld signature.
+    Returns the key id, public key and whether the item was verified
+    """
+    inbox_start_time = time.time()
+    if debug and queue_json.get('actor'):
+        print('Obtaining public key for actor ' + str(queue_json['actor']))
+
+    pub_key = None
+    key_id = _get_queue_item_key_id(queue_json)
+    if not key_id:
+        print('Queue: No keyId in signature: ' +
+              queue_json['httpHeaders']['signature'])
+        return key_id, pub_key, False
+
+    # this is usually already cached, since items whose keys are
+    # not known are held back until the key has been fetched
+    pub_key = \
+        get_person_pub_key(base_dir, curr_session, key_id,
+                           person_cache, debug,
+                           project_version, http_prefix,
+                           domain, onion_domain, i2p_domain,
+                           yggdrasil_domain,
+                           signing_priv_key_pem,
+                           server.mitm_servers)
+    fitness_performance(inbox_start_time, server.fitness,
+                        'INBOX', 'get_person_pub_key', debug)
+    inbox_start_time = time.time()
+    if pub_key:
+        if not isinstance(pub_key, dict):
+            if debug:
+                print('DEBUG: public key: ' + str(pub_key))
+        else:
+            if debug:
+                print('DEBUG: http code error for public key: ' +
+                      str(pub_key))
+            pub_key = None
+
+    if not pub_key:
+        if debug:
+            print('Queue: public key could not be obtained from ' +
+                  str(key_id))
+        return key_id, pub_key, False
+
+    verified = \
+        _inbox_verify_signatures(server, queue_json, key_id, pub_key,
+                                 base_dir, debug, http_prefix,
+                                 verify_all_signatures)
+    return key_id, pub_key, verified
+
+
+def _inbox_verify_signatures(server, queue_json: {},
+                             key_id: str, pub_key: str,
+                             base_dir: str, debug: bool, http_prefix: str,
+                             verify_all_signatures: bool) -> bool:
+    """Checks the http header signature and any jsonld signature of
+    a queue item, using the public key of its sender.
+    This makes no network requests and has no side effects on
+    timelines, so it may run ahead of the main inbox queue within
+    a worker thread
+    """
+    inbox_start_time = time.time()
+    fitness_performance(inbox_start_time, server.fitness,
+                        'INBOX', 'begin_check_signature', debug)
+    if debug:
+        print('DEBUG: checking http header signature')
+        pprint(queue_json['httpHeaders'])
+    post_str = json.dumps(queue_json['post'])
+    http_signature_failed: bool = False
+    if not verify_post_headers(http_prefix, pub_key,
+                               queue_json['httpHeaders'],
+                               queue_json['path'], False,
+                               queue_json['digest'],
+                               post_str, debug):
+        http_signature_failed = True
+        print('Queue: Header signature check failed')
+        pprint(queue_json['httpHeaders'])
+    else:
+        if debug:
+            print('DEBUG: http header signature check success')
+    fitness_performance(inbox_start_time, server.fitness,
+                        'INBOX', 'verify_post_headers', debug)
+    inbox_start_time = time.time()
+
+    # check if a json signature exists on this post
+    has_json_signature, jwebsig_type = \
+        _check_json_signature(base_dir, queue_json)
+    fitness_performance(inbox_start_time, server.fitness,
+                        'INBOX', '_check_json_signature', debug)
+    inbox_start_time = time.time()
+
+    # strict enforcement of json signatures
+    if not has_json_signature:
+        if http_signature_failed:
+            if jwebsig_type:
+                print('Queue: Header signature check failed and does ' +
+                      'not have a recognised jsonld signature type ' +
+                      jwebsig_type)
+            else:
+                print('Queue: Header signature check failed and ' +
+                      'does not have jsonld signature')
+            if debug:
+                pprint(queue_json['httpHeaders'])
+
+        if verify_all_signatures:
+            original_json = queue_json['original']
+            print('Queue: inbox post does not have a jsonld signature ' +
+                  key_id + ' ' + str(original_json))
+
+        if http_signature_failed or verify_all_signatures:
+            return False
+    else:
+        if http_signature_failed or verify_all_signatures:
+            # use the original json message received, not one which
+            # may have been modified along the way
+            original_json = queue_json['original']
+            if not verify_json_signature(original_json, pub_key):
+                if debug:
+                    print('WARN: jsonld inbox signature check failed ' +
+                          key_id + ' ' + pub_key + ' ' +
+                          str(original_json))
+                else:
+                    print('WARN: jsonld inbox signature check failed ' +
+                          key_id)
+                fitness_performance(inbox_start_time, server.fitness,
+                                    'INBOX', 'not_verify_signature',
+                                    debug)
+                return False
+
+            if http_signature_failed:
+                print('jsonld inbox signature check success ' +
+                      'via relay ' + key_id)
+            else:
+                print('jsonld inbox signature check success ' + key_id)
+            fitness_performance(inbox_start_time, server.fitness,
+                                'INBOX', 'verify_signature_success',
+                                debug)
+    return True
+
+
+def _inbox_verify_queue_file(server, queue_json: {},
+                             key_id: str, pub_key: str,
+                             base_dir: str, debug: bool, http_prefix: str,
+                             verify_all_signatures: bool) -> (str, str, bool):
+    """Verifies a queue item ahead of it reaching the front of the
+    inbox queue. This runs within the verification worker pool
+    """
+    verified = \
+        _inbox_verify_signatures(server, queue_json, key_id, pub_key,
+                                 base_dir, debug, http_prefix,
+                                 verify_all_signatures)
+    return key_id, pub_key, verified
+
+
+def inbox_verify_ahead(verify_pool, verify_futures: {}, queue: {},
+                       max_ahead: int, server,
+                       base_dir: str, person_cache: {}, debug: bool,
+                       http_prefix: str,
+                       verify_all_signatures: bool) -> None:
+    """Submits the oldest items in the inbox queue to the worker pool
+    so that their signatures are verified before they reach the front
+    of the queue. Only items whose sender's public key is already
+    cached are submitted, since keys which are not known are fetched
+    in the background while the item is parked
+    """
+    for _, queue_filename in _inbox_queue_oldest(queue, max_ahead):
+        if queue_filename in verify_futures:
+            continue
+        queue_json = load_json(queue_filename)
+        if not queue_json:
+            continue
+        key_id = _get_queue_item_key_id(queue_json)
+        if not key_id:
+            continue
+        pub_key = \
+            get_cached_person_pub_key(base_dir, key_id, person_cache)
+        if not pub_key:
+            continue
+        verify_futures[queue_filename] = \
+            verify_pool.submit(_inbox_verify_queue_file, server,
+                               queue_json, key_id, pub_key,
+                               base_dir, debug, http_prefix,
+                               verify_all_signatures)
+
+
+def inbox_verified_queue_item(server, verify_future, queue: {},
+                              queue_filename: str, curr_session,
+                              queue_json: {}, base_dir: str,
+                              person_cache: {}, debug: bool,
+                              project_version: str, http_prefix: str,
+                              domain: str, onion_domain: str,
+                              i2p_domain: str, yggdrasil_domain: str,
+                              signing_priv_key_pem: str,
+                              verify_all_signatures: bool) -> (str, str, bool):
+    """Verifies the item at the front of the inbox queue, using the
+    result from the worker pool if it was verified ahead of time.
+    Items which are not verified are removed from the queue and deleted.
+    Returns the key id, public key and whether the item was verified
+    """
+    pub_key = None
+    if verify_future:
+        # signatures were checked ahead of time by the worker pool
+        key_id, pub_key, verified = verify_future.result()
+    if not pub_key:
+        # a verdict without a public key is not trusted, so verify again
+        key_id, pub_key, verified = \
+            _inbox_verify_item(server, curr_session, queue_json,
+                               base_dir, person_cache, debug,
+                               project_version, http_prefix,
+                               domain, onion_domain, i2p_domain,
+                               yggdrasil_domain, signing_priv_key_pem,
+                               verify_all_signatures)
+    if not verified:
+        if is_a_file(queue_filename):
+            ex_text = \
+                'EX: inbox_verified_queue_item unable to delete ' + \
+                str(queue_filename)
+            erase_file(queue_filename, ex_text)
+        inbox_queue_remove(queue, queue_filename)
+    return key_id, pub_key, verified
+
+
+def _inbox_queue_throttle(last_item_time: float,
+                          max_items_per_sec: int) -> float:
+    """If a ceiling on the number of queue items processed per second
+    has been set then pause for the remainder of the interval since
+    the previous item. Otherwise queue items are processed back-to-back.
+    Returns the time at which the next item starts
+    """
+    if max_items_per_sec > 0:
+        min_interval_sec = 1.0 / max_items_per_sec
+        elapsed_sec = time.time() - last_item_time
+        if 0 <= elapsed_sec < min_interval_sec:
+            time.sleep(min_interval_sec - elapsed_sec)
+    return time.time()
+
+
 def run_inbox_queue(server,
                     recent_posts_cache: {}, max_recent_posts: int,
                     project_version: str,
                     base_dir: str, http_prefix: str,
                     send_threads: [], post_log: [],
-                    cached_webfingers: {}, person_cache: {}, queue: [],
+                    cached_webfingers: {}, person_cache: {}, queue: {},
                     domain: str,
                     onion_domain: str, i2p_domain: str,
                     yggdrasil_domain: str,
@@ -3532,37 +4036,24 @@ def run_inbox_queue(server,
                         'INBOX', 'start', debug)
     inbox_start_time = time.time()
 
-    curr_session_time = int(time.time())
-    session_last_update: int = 0
-    session = create_session(proxy_type)
-    if session:
-        session_last_update = curr_session_time
-
-    session_restart_interval_secs = random.randrange(18000, 20000)
+    # sessions are shared with the delivery workers and newswire, so
+    # that connections to other instances can be reused between them
+    session = get_shared_session(server, proxy_type)
 
     # is this is a clearnet instance then optionally start sessions
     # for onion and i2p domains
     session_onion = None
     session_i2p = None
     session_yggdrasil = None
-    session_last_update_onion: int = 0
-    session_last_update_i2p: int = 0
-    session_last_update_yggdrasil: int = 0
     if proxy_type != 'tor' and onion_domain:
         print('Starting onion session when starting inbox queue')
-        session_onion = create_session('tor')
-        if session_onion:
-            session_onion = curr_session_time
+        session_onion = get_shared_session(server, 'tor')
     if proxy_type != 'i2p' and i2p_domain:
         print('Starting i2p session when starting inbox queue')
-        session_i2p = create_session('i2p')
-        if session_i2p:
-            session_i2p = curr_session_time
+        session_i2p = get_shared_session(server, 'i2p')
     if proxy_type != 'yggdrasil' and yggdrasil_domain:
         print('Starting yggdrasil session when starting inbox queue')
-        session_yggdrasil = create_session('yggdrasil')
-        if session_yggdrasil:
-            session_yggdrasil = curr_session_time
+        session_yggdrasil = get_shared_session(server, 'yggdrasil')
 
     inbox_handle = 'inbox@' + domain
     if debug:
@@ -3587,7 +4078,8 @@ def run_inbox_queue(server,
         'accounts': {}
     }
 
-    heart_beat_ctr: int = 0
+    last_heart_beat = time.time()
+    last_item_time = time.time()
     queue_restore_ctr: int = 0
     curr_mitm_servers: list[str] = []
 
@@ -3599,37 +4091,69 @@ def run_inbox_queue(server,
     # how long it takes for broch mode to lapse
     broch_lapse_days = random.randrange(7, 14)
 
+    # queue items which are waiting for the public key of their
+    # sender to be fetched, and the status of each fetch
+    key_pending: dict = {}
+    key_fetches: dict = {}
+
+    # optional pool of worker threads which obtain public keys and
+    # verify signatures ahead of items reaching the front of the queue
+    verify_pool = None
+    verify_futures: dict = {}
+    if server.inbox_verify_workers > 1:
+        verify_pool = \
+            ThreadPoolExecutor(max_workers=server.inbox_verify_workers)
+        print('Inbox signature verification using ' +
+              str(server.inbox_verify_workers) + ' workers')
+
     fitness_performance(inbox_start_time, server.fitness,
                         'INBOX', 'while_loop_start', debug)
     inbox_start_time = time.time()
     # the last time that a quote request was last received
     last_quote_request: int = 0
     while True:
-        time.sleep(1)
+        if inbox_queue_length(queue) == 0:
+            # back off only when there is nothing to process
+            time.sleep(1)
+        else:
+            # drain the queue, optionally with a ceiling on the
+            # number of items per second
+            last_item_time = \
+                _inbox_queue_throttle(last_item_time,
+                                      server.inbox_max_items_per_sec)
         inbox_start_time = time.time()
         fitness_performance(inbox_start_time, server.fitness,
                             'INBOX', 'while_loop_itteration', debug)
         inbox_start_time = time.time()
 
         # heartbeat to monitor whether the inbox queue is running
-        heart_beat_ctr += 1
-        if heart_beat_ctr >= 10:
+        if inbox_start_time - last_heart_beat >= 10:
             # turn off broch mode after it has timed out
             if broch_modeLapses(base_dir, broch_lapse_days):
                 broch_lapse_days = random.randrange(7, 14)
             fitness_performance(inbox_start_time, server.fitness,
                                 'INBOX', 'broch_modeLapses', debug)
             inbox_start_time = time.time()
-            print('>>> Heartbeat Q:' + str(len(queue)) + ' ' +
+            # keep the actors held in memory within their limits
+            person_cache_evict(person_cache, server.person_cache_stats)
+            fitness_performance(inbox_start_time, server.fitness,
+                                'INBOX', 'person_cache_evict', debug)
+            inbox_start_time = time.time()
+            print('>>> Heartbeat Q:' + str(inbox_queue_length(queue)) +
+                  ' K:' + str(len(key_pending)) + ' ' +
                   '{:%F %T}'.format(datetime.datetime.now()))
-            heart_beat_ctr: int = 0
+            last_heart_beat = inbox_start_time
 
             # save MITM servers list if it has changed
             if str(server.mitm_servers) != str(curr_mitm_servers):
                 curr_mitm_servers = server.mitm_servers.copy()
                 save_mitm_servers(base_dir, curr_mitm_servers)
 
-        if not queue:
+        # return any items whose public keys have now been obtained
+        inbox_requeue_key_pending(queue, key_pending, key_fetches, debug)
+
+        if inbox_queue_length(queue) == 0:
+            verify_futures.clear()
             # restore any remaining queue items
             queue_restore_ctr += 1
             if queue_restore_ctr >= 30:
@@ -3641,13 +4165,21 @@ def run_inbox_queue(server,
             continue
 
         # oldest item first
-        queue.sort()
-        queue_filename = queue[0]
+        queue_filename = _inbox_queue_head(queue)
+        if not queue_filename:
+            continue
+
+        verify_future = None
+        if verify_pool:
+            inbox_verify_ahead(verify_pool, verify_futures, queue,
+                               server.inbox_verify_workers * 2, server,
+                               base_dir, person_cache, debug, http_prefix,
+                               verify_all_signatures)
+            verify_future = verify_futures.pop(queue_filename, None)
         if not is_a_file(queue_filename):
             print("Queue: queue item rejected because it has no file: " +
                   queue_filename)
-            if queue:
-                queue.pop(0)
+            inbox_queue_remove(queue, queue_filename)
             continue
 
         if debug:
@@ -3662,8 +4194,7 @@ def run_inbox_queue(server,
             print('Queue: run_inbox_queue failed to load inbox queue item ' +
                   queue_filename)
             # Assume that the file is probably corrupt/unreadable
-            if queue:
-                queue.pop(0)
+            inbox_queue_remove(queue, queue_filename)
             # delete the queue file
             if is_a_file(queue_filename):
                 ex_text = \
@@ -3704,53 +4235,40 @@ def run_inbox_queue(server,
                             'INBOX', '_inbox_quota_exceeded', debug)
         inbox_start_time = time.time()
 
-        # recreate the session periodically
-        time_diff = curr_time - session_last_update
-        if not session or time_diff > session_restart_interval_secs:
-            print('Regenerating inbox queue session at 5hr interval')
-            session = create_session(proxy_type)
-            if session:
-                session_last_update = curr_time
-            else:
+        # create the sessions if they don't exist. They are kept
+        # rather than being recreated, so that connections are reused
+        if not session:
+            session = get_shared_session(server, proxy_type)
+            if not session:
                 print('WARN: inbox session not created')
+                # avoid busy looping while the queue is not empty
+                time.sleep(1)
                 continue
         if onion_domain:
-            time_diff = curr_time - session_last_update_onion
-            if not session_onion or time_diff > session_restart_interval_secs:
-                print('Regenerating inbox queue onion session at 5hr interval')
-                session_onion = create_session('tor')
-                if session_onion:
-                    session_last_update_onion = curr_time
-                else:
+            if not session_onion:
+                session_onion = get_shared_session(server, 'tor')
+                if not session_onion:
                     print('WARN: inbox onion session not created')
+                    time.sleep(1)
                     continue
         if i2p_domain:
-            time_diff = curr_time - session_last_update_i2p
-            if not session_i2p or time_diff > session_restart_interval_secs:
-                print('Regenerating inbox queue i2p session at 5hr interval')
-                session_i2p = create_session('i2p')
-                if session_i2p:
-                    session_last_update_i2p = curr_time
-                else:
+            if not session_i2p:
+                session_i2p = get_shared_session(server, 'i2p')
+                if not session_i2p:
                     print('WARN: inbox i2p session not created')
+                    time.sleep(1)
                     continue
         if yggdrasil_domain:
-            time_diff = curr_time - session_last_update_yggdrasil
-            if not session_yggdrasil or \
-               time_diff > session_restart_interval_secs:
-                print('Regenerating inbox queue ' +
-                      'yggdrasil session at 5hr interval')
-                session_yggdrasil = create_session('yggdrasil')
-                if session_yggdrasil:
-                    session_last_update_yggdrasil = curr_time
-                else:
+            if not session_yggdrasil:
+                session_yggdrasil = get_shared_session(server, 'yggdrasil')
+                if not session_yggdrasil:
                     print('WARN: inbox yggdrasil session not created')
+                    time.sleep(1)
                     continue
         fitness_performance(inbox_start_time, server.fitness,
                             'INBOX', 'recreate_session', debug)
         inbox_start_time = time.time()
 
-        curr_session = session
         if queue_json.get('actor'):
             if isinstance(queue_json['actor'], str):
                 # blocking based upon nickname
@@ -3761,179 +4279,48 @@ def run_inbox_queue(server,
                             'EX: run_inbox_queue 11 unable to delete ' + \
                             str(queue_filename)
                         erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
+                    inbox_queue_remove(queue, queue_filename)
                     continue
-
-                sender_domain, _ = get_domain_from_actor(queue_json['actor'])
-                if sender_domain:
-                    if sender_domain.endswith('.onion') and \
-                       session_onion and proxy_type != 'tor':
-                        curr_session = session_onion
-                    elif (sender_domain.endswith('.i2p') and
-                          session_i2p and proxy_type != 'i2p'):
-                        curr_session = session_i2p
-                    elif (is_yggdrasil_address(sender_domain) and
-                          session_yggdrasil and proxy_type != 'yggdrasil'):
-                        curr_session = session_yggdrasil
-
-                if debug:
-                    print('Obtaining public key for actor ' +
-                          queue_json['actor'])
+        curr_session = \
+            _inbox_item_session(queue_json, session, session_onion,
+                                session_i2p, session_yggdrasil, proxy_type)
+
+        # if the public key of the sender is not already known then
+        # fetch it in the background rather than stalling the queue
+        key_id = _get_queue_item_key_id(queue_json)
+        if key_id:
+            if not get_cached_person_pub_key(base_dir, key_id,
+                                             person_cache):
+                inbox_park_queue_item(queue, queue_filename, key_id,
+                                      key_pending, key_fetches,
+                                      KEY_PENDING_TIMEOUT_SEC,
+                                      base_dir, curr_session,
+                                      person_cache, debug,
+                                      project_version, http_prefix,
+                                      domain, onion_domain, i2p_domain,
+                                      yggdrasil_domain,
+                                      signing_priv_key_pem,
+                                      server.mitm_servers,
+                                      server.sites_unavailable)
+                continue
 
         fitness_performance(inbox_start_time, server.fitness,
                             'INBOX', 'start_get_pubkey', debug)
         inbox_start_time = time.time()
-        # Try a few times to obtain the public key
-        pub_key = None
-        key_id = None
-        for tries in range(8):
-            key_id = None
-            signature_params = \
-                queue_json['httpHeaders']['signature'].split(',')
-            for signature_item in signature_params:
-                if signature_item.startswith('keyId='):
-                    if '"' in signature_item:
-                        key_id = signature_item.split('"')[1]
-                        break
-            if not key_id:
-                print('Queue: No keyId in signature: ' +
-                      queue_json['httpHeaders']['signature'])
-                pub_key = None
-                break
-
-            pub_key = \
-                get_person_pub_key(base_dir, curr_session, key_id,
-                                   person_cache, debug,
-                                   project_version, http_prefix,
-                                   domain, onion_domain, i2p_domain,
-                                   yggdrasil_domain,
-                                   signing_priv_key_pem,
-                                   server.mitm_servers)
-            fitness_performance(inbox_start_time, server.fitness,
-                                'INBOX', 'get_person_pub_key', debug)
-            inbox_start_time = time.time()
-            if pub_key:
-                if not isinstance(pub_key, dict):
-                    if debug:
-                        print('DEBUG: public key: ' + str(pub_key))
-                else:
-                    if debug:
-                        print('DEBUG: http code error for public key: ' +
-                              str(pub_key))
-                    pub_key = None
-                break
-
-            if debug:
-                print('DEBUG: Retry ' + str(tries+1) +
-                      ' obtaining public key for ' + key_id)
-            time.sleep(1)
-
-        if not pub_key:
-            if debug:
-                print('Queue: public key could not be obtained from ' + key_id)
-            if is_a_file(queue_filename):
-                ex_text = \
-                    'EX: run_inbox_queue 2 unable to delete ' + \
-                    str(queue_filename)
-                erase_file(queue_filename, ex_text)
-            if queue:
-                queue.pop(0)
-            continue
-
-        # check the http header signature
-        fitness_performance(inbox_start_time, server.fitness,
-                            'INBOX', 'begin_check_signature', debug)
-        inbox_start_time = time.time()
-        if debug:
-            print('DEBUG: checking http header signature')
-            pprint(queue_json['httpHeaders'])
-        post_str = json.dumps(queue_json['post'])
-        http_signature_failed: bool = False
-        if not verify_post_headers(http_prefix, pub_key,
-                                   queue_json['httpHeaders'],
-                                   queue_json['path'], False,
-                                   queue_json['digest'],
-                                   post_str, debug):
-            http_signature_failed = True
-            print('Queue: Header signature check failed')
-            pprint(queue_json['httpHeaders'])
-        else:
-            if debug:
-                print('DEBUG: http header signature check success')
-        fitness_performance(inbox_start_time, server.fitness,
-                            'INBOX', 'verify_post_headers', debug)
-        inbox_start_time = time.time()
-
-        # check if a json signature exists on this post
-        has_json_signature, jwebsig_type = \
-            _check_json_signature(base_dir, queue_json)
+        key_id, pub_key, verified = \
+            inbox_verified_queue_item(server, verify_future, queue,
+                                      queue_filename, curr_session,
+                                      queue_json, base_dir, person_cache,
+                                      debug, project_version, http_prefix,
+                                      domain, onion_domain, i2p_domain,
+                                      yggdrasil_domain,
+                                      signing_priv_key_pem,
+                                      verify_all_signatures)
         fitness_performance(inbox_start_time, server.fitness,
-                            'INBOX', '_check_json_signature', debug)
+                            'INBOX', 'verify_item', debug)
         inbox_start_time = time.time()
-
-        # strict enforcement of json signatures
-        if not has_json_signature:
-            if http_signature_failed:
-                if jwebsig_type:
-                    print('Queue: Header signature check failed and does ' +
-                          'not have a recognised jsonld signature type ' +
-                          jwebsig_type)
-                else:
-                    print('Queue: Header signature check failed and ' +
-                          'does not have jsonld signature')
-                if debug:
-                    pprint(queue_json['httpHeaders'])
-
-            if verify_all_signatures:
-                original_json = queue_json['original']
-                print('Queue: inbox post does not have a jsonld signature ' +
-                      key_id + ' ' + str(original_json))
-
-            if http_signature_failed or verify_all_signatures:
-                if is_a_file(queue_filename):
-                    ex_text = \
-                        'EX: run_inbox_queue 3 unable to delete ' + \
-                        str(queue_filename)
-                    erase_file(queue_filename, ex_text)
-                if queue:
-                    queue.pop(0)
-                continue
-        else:
-            if http_signature_failed or verify_all_signatures:
-                # use the original json message received, not one which
-                # may have been modified along the way
-                original_json = queue_json['original']
-                if not verify_json_signature(original_json, pub_key):
-                    if debug:
-                        print('WARN: jsonld inbox signature check failed ' +
-                              key_id + ' ' + pub_key + ' ' +
-                              str(original_json))
-                    else:
-                        print('WARN: jsonld inbox signature check failed ' +
-                              key_id)
-                    if is_a_file(queue_filename):
-                        ex_text = \
-                            'EX: run_inbox_queue 4 unable to delete ' + \
-                            str(queue_filename)
-                        erase_file(queue_filename, ex_text)
-                    if queue:
-                        queue.pop(0)
-                    fitness_performance(inbox_start_time, server.fitness,
-                                        'INBOX', 'not_verify_signature',
-                                        debug)
-                    inbox_start_time = time.time()
-                    continue
-
-                if http_signature_failed:
-                    print('jsonld inbox signature check success ' +
-                          'via relay ' + key_id)
-                else:
-                    print('jsonld inbox signature check success ' + key_id)
-                fitness_performance(inbox_start_time, server.fitness,
-                                    'INBOX', 'verify_signature_success',
-                                    debug)
-                inbox_start_time = time.time()
+        if not verified:
+            continue
 
         dogwhistles_filename = data_dir(base_dir) + '/dogwhistles.txt'
         if not is_a_file(dogwhistles_filename):
@@ -4231,5 +4618,4 @@ def run_inbox_queue(server,
                     'EX: run_inbox_queue 10 unable to delete ' + \
                     str(queue_filename)
                 erase_file(queue_filename, ex_text)
-            if queue:
-                queue.pop(0)
+            inbox_queue_remove(queue, queue_filename)
@@ -16,6 +16,7 @@ from src.flags import is_quote_toot
 from src.status import actor_status_expired
 from src.quote import get_quote_toot_url
 from src.timeFunctions import get_account_timezone
+from src.siteactive import site_is_available
 from src.utils import is_yggdrasil_address
 from src.utils import valid_nickname
 from src.utils import get_mutuals_of_person
@@ -89,10 +90,11 @@ from src.announce import is_self_announce
 from src.speaker import update_speaker
 from src.webapp_post import individual_post_as_html
 from src.webapp_hashtagswarm import store_hash_tags
+from src.data import append_index_entry
+from src.searchindex import add_to_search_index
 from src.data import save_string
 from src.data import save_flag_file
 from src.data import append_string
-from src.data import prepend_string
 from src.data import load_string
 from src.data import erase_file
 from src.data import is_a_file
@@ -107,13 +109,18 @@ from src.collections import allow_lists
 def inbox_update_index(boxname: str, base_dir: str, handle: str,
                        destination_filename: str, debug: bool) -> bool:
     """Updates the index of received posts
-    The new entry is added to the top of the file
+    The new entry is appended to the end of the file
     """
-    index_filename = \
-        acct_handle_dir(base_dir, handle) + '/' + boxname + '.index'
+    box_dir = acct_handle_dir(base_dir, handle) + '/' + boxname
+    index_filename = box_dir + '.index'
     if debug:
         print('DEBUG: Updating index ' + index_filename)
 
+    # if the post is stored within this box then add it to the search index
+    post_filename = box_dir + '/' + destination_filename.split('/')[-1]
+    if is_a_file(post_filename):
+        add_to_search_index(box_dir, post_filename)
+
     if '/' + boxname + '/' in destination_filename:
         destination_filename = \
             destination_filename.split('/' + boxname + '/')[1]
@@ -122,18 +129,8 @@ def inbox_update_index(boxname: str, base_dir: str, handle: str,
     if '/' in destination_filename:
         destination_filename = destination_filename.split('/')[-1]
 
-    written: bool = False
-    if is_a_file(index_filename):
-        if prepend_string(destination_filename, index_filename,
-                          'EX: Failed to prepend entry to index [ex]'):
-            written = True
-    else:
-        if save_string(destination_filename + '\n',
-                       index_filename,
-                       'EX: Failed to write initial entry to index [ex]'):
-            written = True
-
-    return written
+    return append_index_entry(destination_filename, index_filename,
+                              'EX: Failed to append entry to index [ex]')
 
 
 def _notify_moved(base_dir: str, domain_full: str,
@@ -371,6 +368,23 @@ def _receive_update_to_question(recent_posts_cache: {}, message_json: {},
     return True
 
 
+def save_edited_post(message_json: {}, post_filename: str) -> None:
+    """Saves an edited post over the original, and indexes its words
+    so that the edited post can be searched for
+    """
+    save_json(message_json, post_filename)
+    box_dir = os.path.dirname(post_filename)
+    add_to_search_index(box_dir, post_filename)
+    # if the post has been saved both within the outbox and inbox
+    # (eg. edited reminder)
+    if '/outbox/' in post_filename:
+        inbox_post_filename = post_filename.replace('/outbox/', '/inbox/')
+        if is_a_file(inbox_post_filename):
+            save_json(message_json, inbox_post_filename)
+            inbox_dir = os.path.dirname(inbox_post_filename)
+            add_to_search_index(inbox_dir, inbox_post_filename)
+
+
 def receive_edit_to_post(recent_posts_cache: {}, message_json: {},
                          base_dir: str,
                          nickname: str, domain: str,
@@ -481,13 +495,7 @@ def receive_edit_to_post(recent_posts_cache: {}, message_json: {},
         save_json(post_history_json, post_history_filename)
     # Change Update to Create
     message_json['type'] = 'Create'
-    save_json(message_json, post_filename)
-    # if the post has been saved both within the outbox and inbox
-    # (eg. edited reminder)
-    if '/outbox/' in post_filename:
-        inbox_post_filename = post_filename.replace('/outbox/', '/inbox/')
-        if is_a_file(inbox_post_filename):
-            save_json(message_json, inbox_post_filename)
+    save_edited_post(message_json, post_filename)
     # ensure that the cached post is removed if it exists, so
     # that it then will be recreated
     cached_post_filename = \
@@ -568,7 +576,7 @@ def receive_move_activity(session, base_dir: str,
                           onion_domain: str,
                           i2p_domain: str,
                           yggdrasil_domain: str,
-                          sites_unavailable: [],
+                          sites_unavailable: {},
                           blocked_cache: [],
                           block_federated: [],
                           system_language: str,
@@ -1152,7 +1160,7 @@ def receive_feature_request(session,
                             block_federated: [],
                             federation_list: [],
                             send_threads: [], post_log: [],
-                            sites_unavailable: []) -> bool:
+                            sites_unavailable: {}) -> bool:
     """Receives a FeatureRequest activity within the POST section of HTTPServer
     https://codeberg.org/fediverse/fep/src/branch/main/fep/7aa9/fep-7aa9.md
     """
@@ -2100,7 +2108,8 @@ def receive_announce(recent_posts_cache: {},
                      block_military: {},
                      block_government: {},
                      block_bluesky: {},
-                     block_nostr: {}) -> bool:
+                     block_nostr: {},
+                     sites_unavailable: {}) -> bool:
     """Receives an announce activity within the POST section of HTTPServer
     """
     if message_json['type'] != 'Announce':
@@ -2190,6 +2199,11 @@ def receive_announce(recent_posts_cache: {},
         if debug:
             print('DEBUG: announced domain is blocked')
         return False
+    # don't try to download the announced post from an instance
+    # which is known to be down
+    if not site_is_available(sites_unavailable, announce_url):
+        print('Announced post instance is unavailable ' + announce_url)
+        return False
     object_nickname = get_nickname_from_actor(announce_url)
     if object_nickname:
         if not valid_nickname(object_domain, object_nickname):
@@ -2474,7 +2488,7 @@ def receive_question_vote(server, base_dir: str, nickname: str, domain: str,
                           bold_reading: bool, dogwhistles: {},
                           min_images_for_accounts: [],
                           buy_sites: {},
-                          sites_unavailable: [],
+                          sites_unavailable: {},
                           auto_cw_cache: {},
                           mitm_servers: [],
                           instance_software: {}) -> None:
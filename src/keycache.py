@@ -0,0 +1,90 @@
+__filename__ = "keycache.py"
+__author__ = "Bob Mottram"
+__license__ = "AGPL3+"
+__version__ = "1.7.0"
+__maintainer__ = "Bob Mottram"
+__email__ = "bob@libreserver.org"
+__status__ = "Production"
+__module_group__ = "Security"
+
+# Cache of parsed key objects, keyed by a fingerprint of the PEM
+
+import hashlib
+import threading
+from collections import OrderedDict
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+# private keys of local accounts
+MAX_PRIVATE_KEYS = 256
+# public keys of remote actors
+MAX_PUBLIC_KEYS = 4096
+
+_KEY_CACHE_LOCK = threading.Lock()
+_PRIVATE_KEYS = OrderedDict()
+_PUBLIC_KEYS = OrderedDict()
+
+
+def _pem_fingerprint(key_pem: str) -> str:
+    """Returns a fingerprint for a PEM key
+    """
+    return hashlib.sha256(key_pem.encode('utf-8')).hexdigest()
+
+
+def _get_cached_key(keys: OrderedDict, fingerprint: str):
+    """Returns a key object from the cache, or None
+    """
+    with _KEY_CACHE_LOCK:
+        key = keys.get(fingerprint)
+        if key is not None:
+            keys.move_to_end(fingerprint)
+        return key
+
+
+def _store_cached_key(keys: OrderedDict, fingerprint: str, key,
+                      max_keys: int) -> None:
+    """Adds a key object to the cache, removing the least recently
+    used keys if the cache is full
+    """
+    with _KEY_CACHE_LOCK:
+        keys[fingerprint] = key
+        keys.move_to_end(fingerprint)
+        while len(keys) > max_keys:
+            keys.popitem(last=False)
+
+
+def load_private_key(private_key_pem: str):
+    """Returns the private key object for the given PEM
+    """
+    fingerprint = _pem_fingerprint(private_key_pem)
+    key = _get_cached_key(_PRIVATE_KEYS, fingerprint)
+    if key is None:
+        key = load_pem_private_key(private_key_pem.encode('utf-8'),
+                                   None, backend=default_backend())
+        _store_cached_key(_PRIVATE_KEYS, fingerprint, key,
+                          MAX_PRIVATE_KEYS)
+    return key
+
+
+def load_public_key(public_key_pem: str):
+    """Returns the public key object for the given PEM
+    """
+    fingerprint = _pem_fingerprint(public_key_pem)
+    key = _get_cached_key(_PUBLIC_KEYS, fingerprint)
+    if key is None:
+        key = load_pem_public_key(public_key_pem.encode('utf-8'),
+                                  backend=default_backend())
+        _store_cached_key(_PUBLIC_KEYS, fingerprint, key,
+                          MAX_PUBLIC_KEYS)
+    return key
+
+
+def remove_key_from_cache(key_pem: str) -> None:
+    """Removes a key from the cache, such as when an actor
+    has rotated their keys
+    """
+    fingerprint = _pem_fingerprint(key_pem)
+    with _KEY_CACHE_LOCK:
+        _PUBLIC_KEYS.pop(fingerprint, None)
+        _PRIVATE_KEYS.pop(fingerprint, None)
@@ -82,7 +82,7 @@ def _create_like(recent_posts_cache: {},
                  curr_domain: str,
                  onion_domain: str, i2p_domain: str,
                  yggdrasil_domain: str,
-                 sites_unavailable: [],
+                 sites_unavailable: {},
                  system_language: str,
                  mitm_servers: []) -> {}:
     """Creates a like
@@ -174,7 +174,7 @@ def like_post(recent_posts_cache: {},
               signing_priv_key_pem: str,
               curr_domain: str, onion_domain: str, i2p_domain: str,
               yggdrasil_domain: str,
-              sites_unavailable: [],
+              sites_unavailable: {},
               system_language: str,
               mitm_servers: []) -> {}:
     """Likes a given status post. This is only used by unit tests
@@ -12,17 +12,27 @@ __module_group__ = "Security"
 import random
 import base64
 import hashlib
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
-from cryptography.hazmat.primitives.serialization import load_pem_public_key
+import json
+import threading
+from collections import OrderedDict
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import utils as hazutils
 from src.pyjsonld import normalize
 from src.context import has_valid_context
 from src.utils import get_sha_256
+from src.keycache import load_private_key
+from src.keycache import load_public_key
 from src.timeFunctions import date_utcnow
 
+# The same activity often arrives several times, via relays, groups or
+# retries, so verified signatures are remembered to avoid normalizing
+# identical documents again
+MAX_VERIFIED_SIGNATURES = 4096
+
+_VERIFIED_LOCK = threading.Lock()
+_VERIFIED_SIGNATURES = OrderedDict()
+
 
 def _options_hash(doc: {}) -> str:
     """Returns a hash of the signature, with a few fields removed
@@ -66,14 +76,53 @@ def _doc_hash(doc: {}) -> str:
     return hsh.hexdigest()
 
 
+def _verified_signature_key(doc: {}, public_key_pem: str) -> str:
+    """Returns the key used to remember a verified signature.
+    This combines the signature value, a hash of the canonical json
+    of the whole document and the key, so that any change to the
+    document gives a different key
+    """
+    signature = doc['signature']
+    doc_str = json.dumps(doc, sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False)
+    doc_hash = hashlib.sha256(doc_str.encode('utf-8')).hexdigest()
+    key_str = \
+        str(signature.get('signatureValue')) + '\n' + doc_hash + '\n' + \
+        str(signature.get('creator')) + '\n' + public_key_pem
+    return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+
+
+def _signature_was_verified(memo_key: str) -> bool:
+    """Returns True if a signature with the given key was verified
+    """
+    with _VERIFIED_LOCK:
+        if memo_key not in _VERIFIED_SIGNATURES:
+            return False
+        _VERIFIED_SIGNATURES.move_to_end(memo_key)
+        return True
+
+
+def _remember_verified_signature(memo_key: str) -> None:
+    """Remembers a verified signature, forgetting the least
+    recently used ones if there are too many
+    """
+    with _VERIFIED_LOCK:
+        _VERIFIED_SIGNATURES[memo_key] = True
+        _VERIFIED_SIGNATURES.move_to_end(memo_key)
+        while len(_VERIFIED_SIGNATURES) > MAX_VERIFIED_SIGNATURES:
+            _VERIFIED_SIGNATURES.popitem(last=False)
+
+
 def verify_json_signature(doc: {}, public_key_pem: str) -> bool:
     """Returns True if the given ActivityPub post was sent
     by an actor having the given public key
     """
     if not has_valid_context(doc):
         return False
-    pubkey = load_pem_public_key(public_key_pem.encode('utf-8'),
-                                 backend=default_backend())
+    memo_key = _verified_signature_key(doc, public_key_pem)
+    if _signature_was_verified(memo_key):
+        return True
+    pubkey = load_public_key(public_key_pem)
     to_be_signed = _options_hash(doc) + _doc_hash(doc)
     signature = doc["signature"]["signatureValue"]
 
@@ -86,6 +135,7 @@ def verify_json_signature(doc: {}, public_key_pem: str) -> bool:
             digest,
             padding.PKCS1v15(),
             hazutils.Prehashed(hashes.SHA256()))
+        _remember_verified_signature(memo_key)
         return True
     except BaseException as ex:
         print('EX: verify_json_signature unable to verify ' + str(ex))
@@ -113,8 +163,7 @@ def generate_json_signature(doc: {}, private_key_pem: str,
     doc["signature"] = options
     to_be_signed = _options_hash(doc) + _doc_hash(doc)
 
-    key = load_pem_private_key(private_key_pem.encode('utf-8'),
-                               None, backend=default_backend())
+    key = load_private_key(private_key_pem)
     if debug:
         print('DEBUG: generate_json_signature get_sha_256')
     digest = get_sha_256(to_be_signed.encode("utf-8"))
@@ -47,7 +47,7 @@ def manual_deny_follow_request2(session, session_onion, session_i2p,
                                 project_version: str,
                                 signing_priv_key_pem: str,
                                 followers_sync_cache: {},
-                                sites_unavailable: [],
+                                sites_unavailable: {},
                                 system_language: str,
                                 mitm_servers: []) -> None:
     """Manually deny a follow request
@@ -110,7 +110,7 @@ def manual_deny_follow_request_thread(session, session_onion, session_i2p,
                                       project_version: str,
                                       signing_priv_key_pem: str,
                                       followers_sync_cache: {},
-                                      sites_unavailable: [],
+                                      sites_unavailable: {},
                                       system_language: str,
                                       mitm_servers: []) -> None:
     """Manually deny a follow request, within a thread so that the
@@ -172,7 +172,7 @@ def manual_approve_follow_request(session, session_onion, session_i2p,
                                   signing_priv_key_pem: str,
                                   proxy_type: str,
                                   followers_sync_cache: {},
-                                  sites_unavailable: [],
+                                  sites_unavailable: {},
                                   system_language: str,
                                   mitm_servers: []) -> None:
     """Manually approve a follow request
@@ -402,7 +402,7 @@ def manual_approve_follow_request_thread(session, session_onion, session_i2p,
                                          signing_priv_key_pem: str,
                                          proxy_type: str,
                                          followers_sync_cache: {},
-                                         sites_unavailable: [],
+                                         sites_unavailable: {},
                                          system_language: str,
                                          mitm_servers: []) -> None:
     """Manually approve a follow request, in a thread so as not to cause
@@ -22,8 +22,11 @@ from src.follow import unfollow_account
 from src.person import get_actor_json
 from src.data import load_list
 from src.data import save_string
+from src.data import save_flag_file
 from src.data import append_string
 from src.data import is_a_file
+from src.data import is_a_dir
+from src.data import makedir
 
 
 def _move_following_handles_for_account(base_dir: str,
@@ -255,3 +258,97 @@ def migrate_accounts(base_dir: str, session,
                                                     mitm_servers)
         break
     return ctr
+
+
+def _migrate_account_indexes(account_dir: str) -> int:
+    """Converts the timeline indexes for an account from the older
+    format, with the newest entry first, to the append-only format
+    with the newest entry last.
+    Returns the number of indexes converted
+    """
+    flag_filename = account_dir + '/.indexAppendOnly'
+    if is_a_file(flag_filename):
+        return 0
+    ctr: int = 0
+    for _, _, files in os.walk(account_dir):
+        for fname in files:
+            if not fname.endswith('.index'):
+                continue
+            # scheduled posts are not a timeline
+            if fname == 'schedule.index':
+                continue
+            index_filename = os.path.join(account_dir, fname)
+            index_list: list[str] = \
+                load_list(index_filename,
+                          'EX: _migrate_account_indexes unable to read ' +
+                          index_filename + ' [ex]')
+            if not index_list:
+                continue
+            index_list.reverse()
+            index_str: str = ''.join(index_list)
+            if save_string(index_str, index_filename,
+                           'EX: _migrate_account_indexes unable to write ' +
+                           index_filename):
+                ctr += 1
+        break
+    save_flag_file(flag_filename,
+                   'EX: _migrate_account_indexes unable to write ' +
+                   flag_filename)
+    return ctr
+
+
+def migrate_timeline_indexes(base_dir: str) -> int:
+    """One-shot conversion of timeline indexes for all accounts
+    to the append-only format.
+    Returns the number of indexes converted
+    """
+    ctr: int = 0
+    dir_str = data_dir(base_dir)
+    for _, dirs, _ in os.walk(dir_str):
+        for handle in dirs:
+            if '@' not in handle:
+                continue
+            ctr += _migrate_account_indexes(os.path.join(dir_str, handle))
+        break
+    if ctr > 0:
+        print('Converted ' + str(ctr) + ' timeline indexes to append-only')
+    return ctr
+
+
+def migrate_hashtag_indexes(base_dir: str) -> int:
+    """One-shot conversion of hashtag indexes (tags/*.txt) from the
+    older format, with the newest entry first, to the append-only format
+    with the newest entry last.
+    Returns the number of indexes converted
+    """
+    tags_dir = base_dir + '/tags'
+    if not is_a_dir(tags_dir):
+        makedir(tags_dir)
+    flag_filename = tags_dir + '/.indexAppendOnly'
+    if is_a_file(flag_filename):
+        return 0
+    ctr: int = 0
+    for _, _, files in os.walk(tags_dir):
+        for fname in files:
+            if not fname.endswith('.txt'):
+                continue
+            tags_filename = os.path.join(tags_dir, fname)
+            tags_list: list[str] = \
+                load_list(tags_filename,
+                          'EX: migrate_hashtag_indexes unable to read ' +
+                          tags_filename + ' [ex]')
+            if not tags_list:
+                continue
+            tags_list.reverse()
+            tags_str: str = ''.join(tags_list)
+            if save_string(tags_str, tags_filename,
+                           'EX: migrate_hashtag_indexes unable to write ' +
+                           tags_filename):
+                ctr += 1
+        break
+    save_flag_file(flag_filename,
+                   'EX: migrate_hashtag_indexes unable to write ' +
+                   flag_filename)
+    if ctr > 0:
+        print('Converted ' + str(ctr) + ' hashtag indexes to append-only')
+    return ctr
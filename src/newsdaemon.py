@@ -42,11 +42,11 @@ from src.threads import begin_thread
 from src.threads import thread_with_trace
 from src.webapp_hashtagswarm import store_hash_tags
 from src.cache import clear_from_post_caches
+from src.data import append_index_entry
 from src.data import load_list
 from src.data import load_string
 from src.data import save_string
 from src.data import append_string
-from src.data import prepend_string
 from src.data import erase_file
 from src.data import is_a_file
 from src.data import is_a_dir
@@ -62,10 +62,11 @@ def _update_feeds_outbox_index(base_dir: str, domain: str,
 
     if is_a_file(index_filename):
         if not text_in_file(post_id, index_filename):
-            if prepend_string(post_id, index_filename,
-                              'EX: ' +
-                              'Failed to prepend entry to feeds posts index ' +
-                              index_filename + ' [ex]'):
+            if append_index_entry(post_id, index_filename,
+                                  'EX: ' +
+                                  'Failed to append entry to ' +
+                                  'feeds posts index ' +
+                                  index_filename + ' [ex]'):
                 print('DEBUG: feeds post added to index')
         return
 
@@ -54,6 +54,7 @@ from src.blocking import is_blocked_hashtag
 from src.filters import is_filtered
 from src.session import download_image_any_mime_type
 from src.content import remove_script
+from src.data import index_entries_newest_first
 from src.data import load_list
 from src.data import load_string
 from src.data import save_binary
@@ -1683,78 +1684,70 @@ def _add_account_blogs_to_newswire(base_dir: str, nickname: str, domain: str,
     if is_a_file(moderated_filename):
         moderated = True
 
-    try:
-        with open(index_filename, 'r', encoding='utf-8') as fp_index:
-            post_filename: str = 'start'
-            ctr: int = 0
-            while post_filename:
-                post_filename = fp_index.readline()
-                if not post_filename:
-                    ctr += 1
-                    if ctr >= max_blogs_per_account:
-                        break
-                    continue
-
-                # if this is a full path then remove the directories
-                if '/' in post_filename:
-                    post_filename = post_filename.split('/')[-1]
-
-                # filename of the post without any extension or path
-                # This should also correspond to any index entry in
-                # the posts cache
-                post_url: str = remove_eol(post_filename)
-                post_url = post_url.replace('.json', '').strip()
-
-                # read the post from file
-                full_post_filename: str = \
-                    locate_post(base_dir, nickname,
-                                domain, post_url, False)
-                if not full_post_filename:
-                    print('Unable to locate post for newswire ' + post_url)
-                    ctr += 1
-                    if ctr >= max_blogs_per_account:
-                        break
-                    continue
+    index_entries = \
+        index_entries_newest_first(index_filename,
+                                   'EX: _add_account_blogs_to_newswire ' +
+                                   'unable to read ' + index_filename +
+                                   ' [ex]')
+    ctr: int = 0
+    for post_filename in index_entries:
+        # if this is a full path then remove the directories
+        if '/' in post_filename:
+            post_filename = post_filename.split('/')[-1]
+
+        # filename of the post without any extension or path
+        # This should also correspond to any index entry in
+        # the posts cache
+        post_url: str = remove_eol(post_filename)
+        post_url = post_url.replace('.json', '').strip()
+
+        # read the post from file
+        full_post_filename: str = \
+            locate_post(base_dir, nickname,
+                        domain, post_url, False)
+        if not full_post_filename:
+            print('Unable to locate post for newswire ' + post_url)
+            ctr += 1
+            if ctr >= max_blogs_per_account:
+                break
+            continue
 
-                post_json_object = None
-                if full_post_filename:
-                    post_json_object = load_json(full_post_filename)
-                if _is_newswire_blog_post(post_json_object):
-                    published: str = post_json_object['object']['published']
-                    published = published.replace('T', ' ')
-                    published = published.replace('Z', '+00:00')
-                    votes: list[str] = []
-                    if is_a_file(full_post_filename + '.votes'):
-                        votes = load_json(full_post_filename + '.votes')
-                    content: str = \
-                        get_base_content_from_post(post_json_object,
-                                                   system_language)
-                    description: str = first_paragraph_from_string(content)
-                    description = remove_html(description)
-                    tags_from_post: list[str] = \
-                        _get_hashtags_from_post(post_json_object)
-                    summary: str = post_json_object['object']['summary']
-                    url2: str = post_json_object['object']['url']
-                    url_str: str = get_url_from_post(url2)
-                    url3: str = remove_html(url_str)
-                    fediverse_handle: str = ''
-                    extra_links: list[str] = []
-                    _add_newswire_dict_entry(base_dir,
-                                             newswire, published,
-                                             summary, url3,
-                                             votes, full_post_filename,
-                                             description, moderated, False,
-                                             tags_from_post,
-                                             max_tags, session, debug,
-                                             None, system_language,
-                                             fediverse_handle, extra_links)
+        post_json_object = None
+        if full_post_filename:
+            post_json_object = load_json(full_post_filename)
+        if _is_newswire_blog_post(post_json_object):
+            published: str = post_json_object['object']['published']
+            published = published.replace('T', ' ')
+            published = published.replace('Z', '+00:00')
+            votes: list[str] = []
+            if is_a_file(full_post_filename + '.votes'):
+                votes = load_json(full_post_filename + '.votes')
+            content: str = \
+                get_base_content_from_post(post_json_object,
+                                           system_language)
+            description: str = first_paragraph_from_string(content)
+            description = remove_html(description)
+            tags_from_post: list[str] = \
+                _get_hashtags_from_post(post_json_object)
+            summary: str = post_json_object['object']['summary']
+            url2: str = post_json_object['object']['url']
+            url_str: str = get_url_from_post(url2)
+            url3: str = remove_html(url_str)
+            fediverse_handle: str = ''
+            extra_links: list[str] = []
+            _add_newswire_dict_entry(base_dir,
+                                     newswire, published,
+                                     summary, url3,
+                                     votes, full_post_filename,
+                                     description, moderated, False,
+                                     tags_from_post,
+                                     max_tags, session, debug,
+                                     None, system_language,
+                                     fediverse_handle, extra_links)
 
-                ctr += 1
-                if ctr >= max_blogs_per_account:
-                    break
-    except OSError as exc:
-        print('EX: _add_account_blogs_to_newswire unable to read ' +
-              index_filename + ' ' + str(exc))
+        ctr += 1
+        if ctr >= max_blogs_per_account:
+            break
 
 
 def _add_blogs_to_newswire(base_dir: str, domain: str, newswire: {},
@@ -309,7 +309,7 @@ def post_message_to_outbox(session, translate: {},
                            dogwhistles: {},
                            min_images_for_accounts: [],
                            buy_sites: {},
-                           sites_unavailable: [],
+                           sites_unavailable: {},
                            max_recent_books: int,
                            books_cache: {},
                            max_cached_readers: int,
@@ -637,6 +637,11 @@ def _create_person_base(base_dir: str, nickname: str, domain: str, port: int,
             makedir(people_subdir)
         if not is_a_dir(people_subdir + '/' + handle):
             makedir(people_subdir + '/' + handle)
+            # new accounts begin with append-only timeline indexes
+            save_flag_file(people_subdir + '/' + handle +
+                           '/.indexAppendOnly',
+                           'EX: _create_person_base unable to write ' +
+                           'index flag for ' + handle)
         if not is_a_dir(people_subdir + '/' + handle + '/inbox'):
             makedir(people_subdir + '/' + handle + '/inbox')
         if not is_a_dir(people_subdir + '/' + handle + '/outbox'):
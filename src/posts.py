@@ -15,22 +15,28 @@ import shutil
 import sys
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 from time import gmtime, strftime
 from collections import OrderedDict
 from src.threads import thread_with_trace
+from src.delivery import enqueue_delivery
+from src.httpsig import message_content_digest
 from src.threads import begin_thread
 from src.cache import get_actor_public_key_from_id
 from src.cache import store_person_in_cache
 from src.cache import get_person_from_cache
 from src.cache import expire_person_cache
+from src.cache import get_recent_post
 from pprint import pprint
 from src.session import create_session
 from src.session import get_json
-from src.session import post_json_string
 from src.session import get_json_valid
 from src.webfinger import webfinger_handle
-from src.httpsig import create_signed_header
 from src.siteactive import site_is_active
+from src.siteactive import get_domain_capability
+from src.siteactive import set_domain_capability
 from src.languages import understood_post_language
 from src.flags import is_quote_toot
 from src.flags import is_moderator
@@ -81,6 +87,8 @@ from src.utils import file_last_modified
 from src.utils import has_users_path
 from src.utils import get_full_domain
 from src.utils import get_followers_list
+from src.utils import get_followers_set
+from src.utils import get_followers_by_domain
 from src.utils import create_person_dir
 from src.utils import get_nickname_from_actor
 from src.utils import get_domain_from_actor
@@ -144,6 +152,10 @@ from src.pyjsonld import JsonLdError
 from src.conversation import conversation_tag_to_convthread_id
 from src.conversation import post_id_to_convthread_id
 from src.quote import quote_toots_allowed
+from src.data import index_entries_newest_first
+from src.data import append_index_entry
+from src.data import index_entry_offset
+from src.data import index_page_offset
 from src.data import load_list
 from src.data import load_string
 from src.data import save_string
@@ -153,6 +165,9 @@ from src.data import prepend_string
 from src.data import erase_file
 from src.data import move_file
 from src.data import is_a_file
+from src.searchindex import add_to_search_index
+from src.searchindex import remove_from_search_index
+from src.hashtagstats import hashtag_used
 from src.data import is_a_dir
 from src.data import makedir
 from src.content_labels import set_post_content_labels
@@ -1046,6 +1061,7 @@ def save_post_to_box(base_dir: str, http_prefix: str, post_id: str,
     filename = box_dir + '/' + post_id.replace('/', '#') + '.json'
 
     save_json(post_json_object, filename)
+    add_to_search_index(box_dir, filename)
     # if this is an outbox post with a duplicate in the inbox then save to both
     # This happens for edited posts
     if '/outbox/' in filename:
@@ -1054,6 +1070,8 @@ def save_post_to_box(base_dir: str, http_prefix: str, post_id: str,
         inbox_filename = filename.replace('/outbox/', '/inbox/')
         if is_a_file(inbox_filename):
             save_json(post_json_object, inbox_filename)
+            inbox_dir = box_dir.replace('/outbox', '/inbox')
+            add_to_search_index(inbox_dir, inbox_filename)
             base_filename = \
                 filename.replace('/outbox/',
                                  '/postcache/').replace('.json', '')
@@ -1096,23 +1114,25 @@ def _update_hashtags_index(base_dir: str, tag: {}, new_post_id: str,
             str(days_since_epoch) + '  ' + nickname + '  ' + \
             new_post_id + '\n'
         # create a new tags index file
-        save_string(tag_line, tags_filename,
-                    'EX: _update_hashtags_index unable to write tags file ' +
-                    tags_filename)
+        if save_string(tag_line, tags_filename,
+                       'EX: _update_hashtags_index unable to write ' +
+                       'tags file ' + tags_filename):
+            hashtag_used(base_dir, tag_name[1:])
         return
 
     if text_in_file(new_post_id, tags_filename):
         return
 
-    # prepend to tags index file
+    # append to tags index file, which has the newest entry at the end
     days_diff = date_utcnow() - date_epoch()
     days_since_epoch = days_diff.days
     tag_line = \
         str(days_since_epoch) + '  ' + nickname + '  ' + \
         new_post_id
-    prepend_string(tag_line, tags_filename,
-                   'EX: Failed to prepend entry to tags file ' +
-                   tags_filename + ' [ex]')
+    if append_index_entry(tag_line, tags_filename,
+                          'EX: Failed to append entry to tags file ' +
+                          tags_filename + ' [ex]'):
+        hashtag_used(base_dir, tag_name[1:])
 
 
 def _add_schedule_post(base_dir: str, nickname: str, domain: str,
@@ -2294,7 +2314,8 @@ def regenerate_index_for_box(base_dir: str,
             index_lines.append(fname)
         break
 
-    index_lines.sort(reverse=True)
+    # the index is append-only, with the newest entry last
+    index_lines.sort()
 
     result = ''
     for line in index_lines:
@@ -3054,157 +3075,6 @@ def create_report_post(base_dir: str,
     return post_json_object
 
 
-def _add_send_block(base_dir: str, nickname: str, domain: str,
-                    inbox_url: str) -> None:
-    """Adds an inbox which is blocking this instance
-    """
-    send_block_filename = \
-        acct_dir(base_dir, nickname, domain) + '/send_blocks.txt'
-
-    inbox_url = inbox_url + '\n'
-    if inbox_url.endswith('/inbox\n'):
-        inbox_url = inbox_url.replace('/inbox\n', '\n')
-
-    if not is_a_file(send_block_filename):
-        save_string(inbox_url, send_block_filename,
-                    'EX: _add_send_block unable to create ' +
-                    send_block_filename)
-        return
-
-    if not text_in_file(inbox_url, send_block_filename, False):
-        append_string(inbox_url, send_block_filename,
-                      'EX: _add_send_block unable to write ' +
-                      send_block_filename)
-
-
-def _remove_send_block(base_dir: str, nickname: str, domain: str,
-                       inbox_url: str) -> None:
-    """Removes an inbox which is blocking this instance
-    """
-    send_block_filename = \
-        acct_dir(base_dir, nickname, domain) + '/send_blocks.txt'
-
-    inbox_url = inbox_url + '\n'
-    if inbox_url.endswith('/inbox\n'):
-        inbox_url = inbox_url.replace('/inbox\n', '\n')
-
-    if not is_a_file(send_block_filename):
-        return
-
-    if not text_in_file(inbox_url, send_block_filename, False):
-        return
-
-    send_blocks_str = \
-        load_string(send_block_filename,
-                    'EX: _remove_send_block unable to read ' +
-                    send_block_filename)
-    if send_blocks_str is None:
-        send_blocks_str = ''
-    send_blocks_str = send_blocks_str.replace(inbox_url, '')
-    save_string(send_blocks_str, send_block_filename,
-                'EX: _remove_send_block unable to write ' +
-                send_block_filename)
-
-
-def thread_send_post(session, post_json_str: str, federation_list: [],
-                     inbox_url: str, base_dir: str,
-                     signature_header_json: {},
-                     signature_header_json_ld: {},
-                     post_log: [], debug: bool,
-                     http_prefix: str, domain_full: str,
-                     nickname: str, domain: str) -> None:
-    """Sends a with retries
-    """
-    tries: int = 0
-    send_interval_sec = 30
-    for _ in range(20):
-        post_result = None
-        unauthorized: bool = False
-        if debug:
-            print('Getting post_json_string for ' + inbox_url)
-        try:
-            post_result, unauthorized, return_code = \
-                post_json_string(session, post_json_str, federation_list,
-                                 inbox_url, signature_header_json,
-                                 debug, http_prefix, domain_full)
-            if return_code in range(500, 600):
-                # if an instance is returning a code which indicates that
-                # it might have a runtime error, like 503, then don't
-                # continue to post to it
-                break
-            if debug:
-                print('Obtained post_json_string for ' + inbox_url +
-                      ' unauthorized: ' + str(unauthorized))
-        except BaseException as ex:
-            print('ERROR: post_json_string failed ' + str(ex))
-
-        if unauthorized:
-            # try again with application/ld+json header
-            post_result = None
-            unauthorized: bool = False
-            if debug:
-                print('Getting ld post_json_string for ' + inbox_url)
-            try:
-                post_result, unauthorized, return_code = \
-                    post_json_string(session, post_json_str, federation_list,
-                                     inbox_url, signature_header_json_ld,
-                                     debug, http_prefix, domain_full)
-                if return_code in range(500, 600):
-                    # if an instance is returning a code which indicates that
-                    # it might have a runtime error, like 503, then don't
-                    # continue to post to it
-                    break
-                if debug:
-                    print('Obtained ld post_json_string for ' + inbox_url +
-                          ' unauthorized: ' + str(unauthorized))
-            except BaseException as ex:
-                print('ERROR: ld post_json_string failed ' + str(ex))
-
-        if unauthorized:
-            _add_send_block(base_dir, nickname, domain, inbox_url)
-            if debug:
-                print('WARN: thread_send_post: Post is unauthorized ' +
-                      inbox_url + ' ' + post_json_str)
-            else:
-                print('WARN: thread_send_post: Post is unauthorized ' +
-                      inbox_url)
-            break
-        if post_result:
-            log_str = 'Success on try ' + str(tries) + ': ' + post_json_str
-        else:
-            log_str = 'Retry ' + str(tries) + ': ' + post_json_str
-        post_log.append(log_str)
-        # keep the length of the log finite
-        # Don't accumulate massive files on systems with limited resources
-        while len(post_log) > 16:
-            post_log.pop(0)
-        if debug:
-            # save the log file
-            post_log_filename = base_dir + '/post.log'
-            if is_a_file(post_log_filename):
-                append_string(log_str + '\n', post_log_filename,
-                              'EX: thread_send_post unable to append ' +
-                              post_log_filename)
-            else:
-                save_string(log_str + '\n', post_log_filename,
-                            'EX: thread_send_post unable to write ' +
-                            post_log_filename)
-
-        if post_result:
-            _remove_send_block(base_dir, nickname, domain, inbox_url)
-            if debug:
-                print('DEBUG: successful json post to ' + inbox_url)
-            # our work here is done
-            break
-        if debug:
-            print(post_json_str)
-            print('DEBUG: json post to ' + inbox_url +
-                  ' failed. Waiting for ' +
-                  str(send_interval_sec) + ' seconds.')
-        time.sleep(send_interval_sec)
-        tries += 1
-
-
 def _get_destination_inbox_domain(inbox_url: str, to_domain: str) -> str:
     """ the inbox domain being sent to isn't always the same
     as the destination instance domain. eg public-api.wordpress.com
@@ -3381,29 +3251,15 @@ def send_post(signing_priv_key_pem: str, project_version: str,
     # subsequent conversions after creating message body digest
     post_json_str = json.dumps(post_json_object)
 
-    # construct the http header, including the message body digest
-    signature_header_json = \
-        create_signed_header(None, private_key_pem, nickname, domain, port,
-                             to_domain, to_port,
-                             post_path, http_prefix, with_digest,
-                             post_json_str, 'application/activity+json')
-    signature_header_json_ld = \
-        create_signed_header(None, private_key_pem, nickname, domain, port,
-                             to_domain, to_port,
-                             post_path, http_prefix, with_digest,
-                             post_json_str, 'application/ld+json')
-
     # if the "to" domain is within the shared items
     # federation list then send the token for this domain
     # so that it can request a catalog
+    extra_headers: dict = {}
     domain_full = get_full_domain(domain, port)
     if to_domain in shared_items_federated_domains:
         if shared_item_federation_tokens.get(domain_full):
-            signature_header_json['Origin'] = domain_full
-            signature_header_json_ld['Origin'] = domain_full
-            signature_header_json['SharesCatalog'] = \
-                shared_item_federation_tokens[domain_full]
-            signature_header_json_ld['SharesCatalog'] = \
+            extra_headers['Origin'] = domain_full
+            extra_headers['SharesCatalog'] = \
                 shared_item_federation_tokens[domain_full]
             if debug:
                 print('SharesCatalog added to header')
@@ -3413,29 +3269,15 @@ def send_post(signing_priv_key_pem: str, project_version: str,
         print(to_domain + ' not in shared_items_federated_domains ' +
               str(shared_items_federated_domains))
 
-    if debug:
-        print('signature_header_json: ' + str(signature_header_json))
-
-    # Keep the number of threads being used small
-    while len(send_threads) > 1000:
-        print('WARN: Maximum threads reached - killing send thread')
-        send_threads[0].kill()
-        send_threads.pop(0)
-        print('WARN: thread killed')
-    print('THREAD: thread_send_post')
-    thr = \
-        thread_with_trace(target=thread_send_post,
-                          args=(session,
-                                post_json_str,
-                                federation_list,
-                                inbox_url, base_dir,
-                                signature_header_json.copy(),
-                                signature_header_json_ld.copy(),
-                                post_log, debug, http_prefix,
-                                domain_full,
-                                nickname, domain), daemon=True)
-    send_threads.append(thr)
-    begin_thread(thr, 'send_post')
+    # add to the outgoing queue. The http signature, including the
+    # message body digest, is created when the post is delivered
+    extra_headers_ld = extra_headers.copy()
+    if not enqueue_delivery(base_dir, inbox_url, post_json_str,
+                            nickname, domain, domain, port,
+                            to_domain, to_port, post_path,
+                            http_prefix, with_digest,
+                            extra_headers, extra_headers_ld, None):
+        return 8
     return 0
 
 
@@ -3444,25 +3286,7 @@ def group_followers_by_domain(base_dir: str, nickname: str, domain: str) -> {}:
     """
     handle = nickname + '@' + domain
     followers_filename = acct_handle_dir(base_dir, handle) + '/followers.txt'
-    if not is_a_file(followers_filename):
-        return None
-    grouped = {}
-    followers_list: list[str] = \
-        load_list(followers_filename,
-                  'EX: group_followers_by_domain unable to read ' +
-                  followers_filename)
-    if followers_list is not None:
-        for follower_handle in followers_list:
-            if '@' not in follower_handle:
-                continue
-            fhandle1 = follower_handle.strip()
-            fhandle = remove_eol(fhandle1)
-            follower_domain = fhandle.split('@')[1]
-            if not grouped.get(follower_domain):
-                grouped[follower_domain] = [fhandle]
-            else:
-                grouped[follower_domain].append(fhandle)
-    return grouped
+    return get_followers_by_domain(followers_filename)
 
 
 def _add_followers_to_public_post(post_json_object: {}) -> None:
@@ -3504,6 +3328,101 @@ def _add_followers_to_public_post(post_json_object: {}) -> None:
             [actor_url + '/followers']
 
 
+def _new_prepared_activity() -> {}:
+    """Returns an empty prepared activity. When an activity is sent to
+    many inboxes this holds its linked data signature, serialized body
+    and body digest, so that they are only calculated once
+    """
+    return {
+        "lock": threading.Lock(),
+        "signed": None,
+        "bodies": {}
+    }
+
+
+def _prepare_activity_body(post_json_object: {}, private_key_pem: str,
+                           domain: str, curr_domain: str,
+                           prepared_activity: {}, debug: bool) -> (str, str):
+    """Returns the serialized body of an activity, and its digest.
+    If a prepared activity is given then these are reused between sends
+    """
+    if prepared_activity is None:
+        return _activity_body(post_json_object, private_key_pem,
+                              domain, curr_domain, None, debug)
+    with prepared_activity['lock']:
+        if not prepared_activity['bodies'].get(domain):
+            prepared_activity['bodies'][domain] = \
+                _activity_body(post_json_object, private_key_pem,
+                               domain, curr_domain, prepared_activity,
+                               debug)
+        post_json_str, body_digest = prepared_activity['bodies'][domain]
+    return post_json_str, body_digest
+
+
+def _activity_body(post_json_object: {}, private_key_pem: str,
+                   domain: str, curr_domain: str,
+                   prepared_activity: {}, debug: bool) -> (str, str):
+    """Adds a linked data signature to an activity and returns its
+    serialized body together with the body digest
+    """
+    if prepared_activity:
+        if prepared_activity['signed']:
+            post_json_object = prepared_activity['signed']
+
+    _add_followers_to_public_post(post_json_object)
+
+    if not post_json_object.get('signature'):
+        try:
+            signed_post_json_object = post_json_object.copy()
+            generate_json_signature(signed_post_json_object,
+                                    private_key_pem, debug)
+            post_json_object = signed_post_json_object
+        except BaseException as ex:
+            print('WARN: send_signed_json failed to JSON-LD sign post, ' +
+                  str(ex))
+            pprint(signed_post_json_object)
+    if prepared_activity:
+        prepared_activity['signed'] = post_json_object
+
+    # convert json to string so that there are no
+    # subsequent conversions after creating message body digest
+    post_json_str = json.dumps(post_json_object)
+
+    # if the sender domain has changed from clearnet to onion or i2p
+    # then change the content of the post accordingly
+    if debug:
+        print('send_signed_json checking for changed origin domain: ' +
+              domain + ' ' + curr_domain)
+    if domain != curr_domain:
+        if not curr_domain.endswith('.onion') and \
+           not curr_domain.endswith('.i2p'):
+            if debug:
+                print('send_signed_json ' +
+                      'changing post content sender domain from ' +
+                      curr_domain + ' to ' + domain)
+            post_json_str = \
+                post_json_str.replace(curr_domain, domain)
+    body_digest = message_content_digest(post_json_str, 'rsa-sha256')
+    return post_json_str, body_digest
+
+
+def _domain_is_active(domain_capabilities: {}, domain_full: str,
+                      domain_url: str, sites_unavailable: {}) -> bool:
+    """Returns true if the given instance is active.
+    Instances which were seen within the last hour are not checked again
+    """
+    if domain_capabilities is not None:
+        if get_domain_capability(domain_capabilities, domain_full,
+                                 'alive', 60 * 60):
+            return True
+    if not site_is_active(domain_url, 10, sites_unavailable):
+        return False
+    if domain_capabilities is not None:
+        set_domain_capability(domain_capabilities, domain_full,
+                              'alive', True)
+    return True
+
+
 def send_signed_json(post_json_object: {}, session, base_dir: str,
                      nickname: str, domain: str, port: int,
                      to_nickname: str, to_domain: str,
@@ -3516,10 +3435,16 @@ def send_signed_json(post_json_object: {}, session, base_dir: str,
                      source_id: int, curr_domain: str,
                      onion_domain: str, i2p_domain: str,
                      yggdrasil_domain: str,
-                     extra_headers: {}, sites_unavailable: [],
+                     extra_headers: {}, sites_unavailable: {},
                      system_language: str,
-                     mitm_servers: []) -> int:
-    """Sends a signed json object to an inbox/outbox
+                     mitm_servers: [],
+                     prepared_activity: {} = None,
+                     domain_capabilities: {} = None) -> int:
+    """Sends a signed json object to an inbox/outbox.
+    prepared_activity is used when sending the same activity to many
+    inboxes, so that its body is only signed and serialized once.
+    domain_capabilities is used to avoid checking whether instances
+    which were seen recently are active
     """
     if debug:
         print('DEBUG: send_signed_json start')
@@ -3538,7 +3463,8 @@ def send_signed_json(post_json_object: {}, session, base_dir: str,
     to_domain = get_full_domain(to_domain, to_port)
 
     to_domain_url = http_prefix + '://' + to_domain
-    if not site_is_active(to_domain_url, 10, sites_unavailable):
+    if not _domain_is_active(domain_capabilities, to_domain,
+                             to_domain_url, sites_unavailable):
         print('send_signed_json domain is inactive: ' + to_domain_url)
         return 9
     print('Domain is active: ' + to_domain_url)
@@ -3660,89 +3586,35 @@ def send_signed_json(post_json_object: {}, session, base_dir: str,
     # remove the domain to leave the path on its own
     post_path = inbox_url.split(to_domain, 1)[1]
 
-    _add_followers_to_public_post(post_json_object)
+    post_json_str, body_digest = \
+        _prepare_activity_body(post_json_object, private_key_pem,
+                               domain, curr_domain, prepared_activity,
+                               debug)
 
-    if not post_json_object.get('signature'):
-        try:
-            signed_post_json_object = post_json_object.copy()
-            generate_json_signature(signed_post_json_object,
-                                    private_key_pem, debug)
-            post_json_object = signed_post_json_object
-        except BaseException as ex:
-            print('WARN: send_signed_json failed to JSON-LD sign post, ' +
-                  str(ex))
-            pprint(signed_post_json_object)
-
-    # convert json to string so that there are no
-    # subsequent conversions after creating message body digest
-    post_json_str = json.dumps(post_json_object)
-
-    # if the sender domain has changed from clearnet to onion or i2p
-    # then change the content of the post accordingly
-    if debug:
-        print('send_signed_json checking for changed origin domain: ' +
-              domain + ' ' + curr_domain)
-    if domain != curr_domain:
-        if not curr_domain.endswith('.onion') and \
-           not curr_domain.endswith('.i2p'):
-            if debug:
-                print('send_signed_json ' +
-                      'changing post content sender domain from ' +
-                      curr_domain + ' to ' + domain)
-            post_json_str = \
-                post_json_str.replace(curr_domain, domain)
-
-    # construct the http header, including the message body digest
-    signature_header_json = \
-        create_signed_header(None, private_key_pem, nickname, domain, port,
-                             to_domain, to_port,
-                             post_path, http_prefix, with_digest,
-                             post_json_str,
-                             'application/activity+json')
-    signature_header_json_ld = \
-        create_signed_header(None, private_key_pem, nickname, domain, port,
-                             to_domain, to_port,
-                             post_path, http_prefix, with_digest,
-                             post_json_str,
-                             'application/ld+json')
     # optionally add a token so that the receiving instance may access
     # your shared items catalog
+    extra_headers_json: dict = {}
     if shared_items_token:
-        signature_header_json['Origin'] = get_full_domain(domain, port)
-        signature_header_json['SharesCatalog'] = shared_items_token
+        extra_headers_json['Origin'] = get_full_domain(domain, port)
+        extra_headers_json['SharesCatalog'] = shared_items_token
     elif debug:
         print('send_signed_json not sending shared items federation token')
 
     # add any extra headers
     for header_title, header_text in extra_headers.items():
-        signature_header_json[header_title] = header_text
-
-    # Keep the number of threads being used small
-    while len(send_threads) > 1000:
-        print('WARN: send_signed_json maximum threads reached - ' +
-              'killing send thread')
-        send_threads[0].kill()
-        send_threads.pop(0)
-        print('WARN: send_signed_json thread killed')
+        extra_headers_json[header_title] = header_text
 
     if debug:
-        print('DEBUG: send_signed_json starting thread to send post')
+        print('DEBUG: send_signed_json adding post to the outgoing queue')
         pprint(post_json_object)
-    domain_full = get_full_domain(domain, port)
-    print('THREAD: send_signed_json thread_send_post 2')
-    thr = \
-        thread_with_trace(target=thread_send_post,
-                          args=(session,
-                                post_json_str,
-                                federation_list,
-                                inbox_url, base_dir,
-                                signature_header_json.copy(),
-                                signature_header_json_ld.copy(),
-                                post_log, debug,
-                                http_prefix, domain_full,
-                                nickname, domain), daemon=True)
-    send_threads.append(thr)
-    # begin_thread(thr, 'send_signed_json')
+    # the http signature, including the message body digest,
+    # is created when the post is delivered
+    if not enqueue_delivery(base_dir, inbox_url, post_json_str,
+                            nickname, account_domain, domain, port,
+                            to_domain, to_port, post_path,
+                            http_prefix, with_digest,
+                            extra_headers_json, {}, body_digest):
+        return 8
     return 0
 
 
@@ -3848,7 +3720,7 @@ def _send_to_named_addresses(server, session, session_onion, session_i2p,
                              signing_priv_key_pem: str,
                              proxy_type: str,
                              followers_sync_cache: {},
-                             sites_unavailable: [],
+                             sites_unavailable: {},
                              system_language: str,
                              mitm_servers: []) -> None:
     """sends a post to the specific named addresses in to/cc
@@ -3940,6 +3812,13 @@ def _send_to_named_addresses(server, session, session_onion, session_i2p,
     random.shuffle(recipients)
     # this is after the message has arrived at the server
     client_to_server: bool = False
+    # the same activity is sent to each recipient, so it only
+    # needs to be signed and serialized once
+    prepared_activity = _new_prepared_activity()
+    # instances which were seen recently are not checked again
+    domain_capabilities: dict = {}
+    if server:
+        domain_capabilities = server.domain_capabilities
     for address in recipients:
         to_nickname = get_nickname_from_actor(address)
         if not to_nickname:
@@ -4061,7 +3940,8 @@ def _send_to_named_addresses(server, session, session_onion, session_i2p,
                          domain, onion_domain, i2p_domain,
                          yggdrasil_domain,
                          extra_headers, sites_unavailable,
-                         system_language, mitm_servers)
+                         system_language, mitm_servers,
+                         prepared_activity, domain_capabilities)
 
 
 def send_to_named_addresses_thread(server, session, session_onion, session_i2p,
@@ -4080,7 +3960,7 @@ def send_to_named_addresses_thread(server, session, session_onion, session_i2p,
                                    signing_priv_key_pem: str,
                                    proxy_type: str,
                                    followers_sync_cache: {},
-                                   sites_unavailable: [],
+                                   sites_unavailable: {},
                                    system_language: str,
                                    mitm_servers: []):
     """Returns a thread used to send a post to named addresses
@@ -4147,6 +4027,232 @@ def _sending_profile_update(post_json_object: {}) -> bool:
     return False
 
 
+def _send_to_follower_domain(server, session, session_onion, session_i2p,
+                             session_yggdrasil,
+                             base_dir: str, nickname: str, domain: str,
+                             onion_domain: str, i2p_domain: str,
+                             yggdrasil_domain: str, port: int,
+                             http_prefix: str, federation_list: [],
+                             send_threads: [], post_log: [],
+                             cached_webfingers: {}, person_cache: {},
+                             post_json_object: {}, debug: bool,
+                             project_version: str,
+                             shared_items_federated_domains: [],
+                             shared_item_federation_tokens: {},
+                             signing_priv_key_pem: str,
+                             sites_unavailable: {},
+                             system_language: str,
+                             mitm_servers: [],
+                             follower_domain: str, follower_handles: [],
+                             curr_proxy_type: str,
+                             domain_capabilities: {},
+                             prepared_activity: {}) -> str:
+    """Sends a post to the followers of the given nickname on one
+    instance. This runs within a worker of send_to_followers.
+    Returns the follower domain
+    """
+    extra_headers = {}
+    client_to_server: bool = False
+
+    if debug:
+        pprint(follower_handles)
+
+    # if the followers domain is within the shared items
+    # federation list then send the token for this domain
+    # so that it can request a catalog
+    shared_items_token = None
+    if follower_domain in shared_items_federated_domains:
+        domain_full = get_full_domain(domain, port)
+        if shared_item_federation_tokens.get(domain_full):
+            shared_items_token = shared_item_federation_tokens[domain_full]
+
+    # check that the follower's domain is active, unless it
+    # was seen recently
+    follower_domain_url = http_prefix + '://' + follower_domain
+    if not _domain_is_active(domain_capabilities, follower_domain,
+                             follower_domain_url, sites_unavailable):
+        print('Sending post to followers domain is inactive: ' +
+              follower_domain_url)
+        return follower_domain
+    print('Sending post to followers domain is active: ' +
+          follower_domain_url)
+
+    # select the appropriate session
+    curr_session = session
+    curr_http_prefix = http_prefix
+    if onion_domain:
+        if follower_domain.endswith('.onion'):
+            curr_session = session_onion
+            curr_http_prefix = 'http'
+    if i2p_domain:
+        if follower_domain.endswith('.i2p'):
+            curr_session = session_i2p
+            curr_http_prefix = 'http'
+    if yggdrasil_domain:
+        if is_yggdrasil_address(follower_domain):
+            curr_session = session_yggdrasil
+            curr_http_prefix = 'http'
+
+    # get the domain showin by the user agent
+    ua_domain = domain
+    if follower_domain.endswith('.onion'):
+        ua_domain = onion_domain
+    elif follower_domain.endswith('.i2p'):
+        ua_domain = i2p_domain
+    elif is_yggdrasil_address(follower_domain):
+        ua_domain = yggdrasil_domain
+
+    # does the instance have a shared inbox?
+    # If it was found not to have one then check again sooner, since
+    # this may have been due to a temporary failure
+    with_shared_inbox = \
+        get_domain_capability(domain_capabilities, follower_domain,
+                              'sharedInbox', 7 * 24 * 60 * 60)
+    if with_shared_inbox is False:
+        with_shared_inbox = \
+            get_domain_capability(domain_capabilities, follower_domain,
+                                  'sharedInbox', 24 * 60 * 60)
+    if with_shared_inbox is None:
+        with_shared_inbox = \
+            _has_shared_inbox(curr_session, curr_http_prefix,
+                              follower_domain, debug,
+                              signing_priv_key_pem, ua_domain,
+                              mitm_servers)
+        set_domain_capability(domain_capabilities, follower_domain,
+                              'sharedInbox', with_shared_inbox)
+    if debug:
+        if with_shared_inbox:
+            print(follower_domain + ' has shared inbox')
+    if not with_shared_inbox:
+        print('Sending post to followers, ' + follower_domain +
+              ' does not have a shared inbox')
+
+    to_port = port
+    index: int = 0
+    to_domain = follower_handles[index].split('@')[1]
+    if ':' in to_domain:
+        to_port = get_port_from_domain(to_domain)
+        to_domain = remove_domain_port(to_domain)
+
+    # if we are sending to an onion domain and we
+    # have an alt onion domain then use the alt
+    from_domain = domain
+    from_http_prefix = http_prefix
+    session_type = 'default'
+    if onion_domain:
+        if to_domain.endswith('.onion'):
+            from_domain = onion_domain
+            from_http_prefix = 'http'
+            port = 80
+            to_port = 80
+            curr_proxy_type = 'tor'
+            session_type = 'tor'
+    if i2p_domain:
+        if to_domain.endswith('.i2p'):
+            from_domain = i2p_domain
+            from_http_prefix = 'http'
+            port = 80
+            to_port = 80
+            curr_proxy_type = 'i2p'
+            session_type = 'i2p'
+    if yggdrasil_domain:
+        if is_yggdrasil_address(to_domain):
+            from_domain = yggdrasil_domain
+            from_http_prefix = 'http'
+            port = 80
+            to_port = 80
+            curr_proxy_type = 'yggdrasil'
+            session_type = 'yggdrasil'
+
+    if not curr_session:
+        curr_session = create_session(curr_proxy_type)
+        if server:
+            if session_type == 'tor':
+                server.session_onion = curr_session
+            elif session_type == 'i2p':
+                server.session_i2p = curr_session
+            elif session_type == 'yggdrasil':
+                server.session_yggdrasil = curr_session
+            else:
+                server.session = curr_session
+
+    if with_shared_inbox:
+        to_nickname = follower_handles[index].split('@')[0]
+
+        group_account: bool = False
+        if to_nickname.startswith('!'):
+            group_account = True
+            to_nickname = to_nickname[1:]
+
+        # if there are more than one followers on the domain
+        # then send the post to the shared inbox
+        if len(follower_handles) > 1:
+            to_nickname = 'inbox'
+
+        if to_nickname != 'inbox' and post_json_object.get('type'):
+            if _sending_profile_update(post_json_object):
+                print('Sending post to followers ' +
+                      'shared inbox of ' + to_domain)
+                to_nickname = 'inbox'
+
+        print('Sending post to followers from ' +
+              nickname + '@' + domain +
+              ' to ' + to_nickname + '@' + to_domain)
+
+        send_signed_json(post_json_object, curr_session, base_dir,
+                         nickname, from_domain, port,
+                         to_nickname, to_domain, to_port,
+                         from_http_prefix,
+                         client_to_server, federation_list,
+                         send_threads, post_log, cached_webfingers,
+                         person_cache, debug, project_version,
+                         shared_items_token, group_account,
+                         signing_priv_key_pem, 639342,
+                         domain, onion_domain, i2p_domain,
+                         yggdrasil_domain,
+                         extra_headers, sites_unavailable,
+                         system_language, mitm_servers,
+                         prepared_activity, domain_capabilities)
+    else:
+        # randomize the order of handles, so that we are not
+        # favoring any particular account in terms of its delivery time
+        random.shuffle(follower_handles)
+        # send to individual followers without using a shared inbox
+        for handle in follower_handles:
+            print('Sending post to followers ' + handle)
+            to_nickname = handle.split('@')[0]
+
+            group_account: bool = False
+            if to_nickname.startswith('!'):
+                group_account = True
+                to_nickname = to_nickname[1:]
+
+            if post_json_object['type'] != 'Update':
+                print('Sending post to followers from ' +
+                      nickname + '@' + domain + ' to ' +
+                      to_nickname + '@' + to_domain)
+            else:
+                print('Sending post to followers profile update from ' +
+                      nickname + '@' + domain + ' to ' +
+                      to_nickname + '@' + to_domain)
+
+            send_signed_json(post_json_object, curr_session, base_dir,
+                             nickname, from_domain, port,
+                             to_nickname, to_domain, to_port,
+                             from_http_prefix,
+                             client_to_server, federation_list,
+                             send_threads, post_log, cached_webfingers,
+                             person_cache, debug, project_version,
+                             shared_items_token, group_account,
+                             signing_priv_key_pem, 634219,
+                             domain, onion_domain, i2p_domain,
+                             yggdrasil_domain,
+                             extra_headers, sites_unavailable,
+                             system_language, mitm_servers,
+                             prepared_activity, domain_capabilities)
+    return follower_domain
+
+
 def send_to_followers(server, session, session_onion, session_i2p,
                       session_yggdrasil,
                       base_dir: str, nickname: str, domain: str,
@@ -4160,7 +4266,7 @@ def send_to_followers(server, session, session_onion, session_i2p,
                       shared_items_federated_domains: [],
                       shared_item_federation_tokens: {},
                       signing_priv_key_pem: str,
-                      sites_unavailable: [],
+                      sites_unavailable: {},
                       system_language: str,
                       mitm_servers: []) -> None:
     """sends a post to the followers of the given nickname
@@ -4174,7 +4280,6 @@ def send_to_followers(server, session, session_onion, session_i2p,
         return
     print('Post is addressed to followers')
 
-    extra_headers = {}
     grouped = group_followers_by_domain(base_dir, nickname, domain)
     if not grouped:
         if debug:
@@ -4183,9 +4288,6 @@ def send_to_followers(server, session, session_onion, session_i2p,
     print('Post to followers resolved domains')
     # print(str(grouped))
 
-    # this is after the message has arrived at the server
-    client_to_server: bool = False
-
     curr_proxy_type = None
     if domain.endswith('.onion'):
         curr_proxy_type = 'tor'
@@ -4207,203 +4309,64 @@ def send_to_followers(server, session, session_onion, session_i2p,
         randomized_instances.append([follower_domain, follower_handles])
     random.shuffle(randomized_instances)
 
-    # send out to each instance
-    for group_send in randomized_instances:
-        follower_domain = group_send[0]
-        follower_handles = group_send[1]
-        print('Sending post to followers progress ' +
-              str(int(sending_ctr * 100 / len(grouped.items()))) + '% ' +
-              follower_domain)
-        sending_ctr += 1
-
-        if debug:
-            pprint(follower_handles)
-
-        # if the followers domain is within the shared items
-        # federation list then send the token for this domain
-        # so that it can request a catalog
-        shared_items_token = None
-        if follower_domain in shared_items_federated_domains:
-            domain_full = get_full_domain(domain, port)
-            if shared_item_federation_tokens.get(domain_full):
-                shared_items_token = shared_item_federation_tokens[domain_full]
-
-        # check that the follower's domain is active
-        follower_domain_url = http_prefix + '://' + follower_domain
-        if not site_is_active(follower_domain_url, 10, sites_unavailable):
-            print('Sending post to followers domain is inactive: ' +
-                  follower_domain_url)
-            continue
-        print('Sending post to followers domain is active: ' +
-              follower_domain_url)
-
-        # select the appropriate session
-        curr_session = session
-        curr_http_prefix = http_prefix
-        if onion_domain:
-            if follower_domain.endswith('.onion'):
-                curr_session = session_onion
-                curr_http_prefix = 'http'
-        if i2p_domain:
-            if follower_domain.endswith('.i2p'):
-                curr_session = session_i2p
-                curr_http_prefix = 'http'
-        if yggdrasil_domain:
-            if is_yggdrasil_address(follower_domain):
-                curr_session = session_yggdrasil
-                curr_http_prefix = 'http'
-
-        # get the domain showin by the user agent
-        ua_domain = domain
-        if follower_domain.endswith('.onion'):
-            ua_domain = onion_domain
-        elif follower_domain.endswith('.i2p'):
-            ua_domain = i2p_domain
-        elif is_yggdrasil_address(follower_domain):
-            ua_domain = yggdrasil_domain
-
-        with_shared_inbox = \
-            _has_shared_inbox(curr_session, curr_http_prefix, follower_domain,
-                              debug, signing_priv_key_pem, ua_domain,
-                              mitm_servers)
-        if debug:
-            if with_shared_inbox:
-                print(follower_domain + ' has shared inbox')
-        if not with_shared_inbox:
-            print('Sending post to followers, ' + follower_domain +
-                  ' does not have a shared inbox')
-
-        to_port = port
-        index: int = 0
-        to_domain = follower_handles[index].split('@')[1]
-        if ':' in to_domain:
-            to_port = get_port_from_domain(to_domain)
-            to_domain = remove_domain_port(to_domain)
-
-        # if we are sending to an onion domain and we
-        # have an alt onion domain then use the alt
-        from_domain = domain
-        from_http_prefix = http_prefix
-        session_type = 'default'
-        if onion_domain:
-            if to_domain.endswith('.onion'):
-                from_domain = onion_domain
-                from_http_prefix = 'http'
-                port = 80
-                to_port = 80
-                curr_proxy_type = 'tor'
-                session_type = 'tor'
-        if i2p_domain:
-            if to_domain.endswith('.i2p'):
-                from_domain = i2p_domain
-                from_http_prefix = 'http'
-                port = 80
-                to_port = 80
-                curr_proxy_type = 'i2p'
-                session_type = 'i2p'
-        if yggdrasil_domain:
-            if is_yggdrasil_address(to_domain):
-                from_domain = yggdrasil_domain
-                from_http_prefix = 'http'
-                port = 80
-                to_port = 80
-                curr_proxy_type = 'yggdrasil'
-                session_type = 'yggdrasil'
-
-        if not curr_session:
-            curr_session = create_session(curr_proxy_type)
-            if server:
-                if session_type == 'tor':
-                    server.session_onion = curr_session
-                elif session_type == 'i2p':
-                    server.session_i2p = curr_session
-                elif session_type == 'yggdrasil':
-                    server.session_yggdrasil = curr_session
-                else:
-                    server.session = curr_session
-
-        if with_shared_inbox:
-            to_nickname = follower_handles[index].split('@')[0]
+    # the number of instances which are sent to at the same time
+    max_workers: int = 8
+    # known capabilities of instances, such as having a shared inbox
+    domain_capabilities: dict = {}
+    if server:
+        if server.send_to_followers_workers > 0:
+            max_workers = server.send_to_followers_workers
+        domain_capabilities = server.domain_capabilities
 
-            group_account: bool = False
-            if to_nickname.startswith('!'):
-                group_account = True
-                to_nickname = to_nickname[1:]
-
-            # if there are more than one followers on the domain
-            # then send the post to the shared inbox
-            if len(follower_handles) > 1:
-                to_nickname = 'inbox'
-
-            if to_nickname != 'inbox' and post_json_object.get('type'):
-                if _sending_profile_update(post_json_object):
-                    print('Sending post to followers ' +
-                          'shared inbox of ' + to_domain)
-                    to_nickname = 'inbox'
-
-            print('Sending post to followers from ' +
-                  nickname + '@' + domain +
-                  ' to ' + to_nickname + '@' + to_domain)
+    # the same activity is sent to each instance, so it only
+    # needs to be signed and serialized once
+    prepared_activity = _new_prepared_activity()
 
-            send_signed_json(post_json_object, curr_session, base_dir,
-                             nickname, from_domain, port,
-                             to_nickname, to_domain, to_port,
-                             from_http_prefix,
-                             client_to_server, federation_list,
-                             send_threads, post_log, cached_webfingers,
-                             person_cache, debug, project_version,
-                             shared_items_token, group_account,
-                             signing_priv_key_pem, 639342,
-                             domain, onion_domain, i2p_domain,
-                             yggdrasil_domain,
-                             extra_headers, sites_unavailable,
-                             system_language, mitm_servers)
-        else:
-            # randomize the order of handles, so that we are not
-            # favoring any particular account in terms of its delivery time
-            random.shuffle(follower_handles)
-            # send to individual followers without using a shared inbox
-            for handle in follower_handles:
-                print('Sending post to followers ' + handle)
-                to_nickname = handle.split('@')[0]
-
-                group_account: bool = False
-                if to_nickname.startswith('!'):
-                    group_account = True
-                    to_nickname = to_nickname[1:]
-
-                if post_json_object['type'] != 'Update':
-                    print('Sending post to followers from ' +
-                          nickname + '@' + domain + ' to ' +
-                          to_nickname + '@' + to_domain)
-                else:
-                    print('Sending post to followers profile update from ' +
-                          nickname + '@' + domain + ' to ' +
-                          to_nickname + '@' + to_domain)
-
-                send_signed_json(post_json_object, curr_session, base_dir,
-                                 nickname, from_domain, port,
-                                 to_nickname, to_domain, to_port,
-                                 from_http_prefix,
-                                 client_to_server, federation_list,
-                                 send_threads, post_log, cached_webfingers,
-                                 person_cache, debug, project_version,
-                                 shared_items_token, group_account,
-                                 signing_priv_key_pem, 634219,
-                                 domain, onion_domain, i2p_domain,
-                                 yggdrasil_domain,
-                                 extra_headers, sites_unavailable,
-                                 system_language, mitm_servers)
-
-        time.sleep(4)
+    # send out to each instance
+    sending_futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as send_pool:
+        for group_send in randomized_instances:
+            sending_futures.append(
+                send_pool.submit(_send_to_follower_domain,
+                                 server, session, session_onion,
+                                 session_i2p, session_yggdrasil,
+                                 base_dir, nickname, domain,
+                                 onion_domain, i2p_domain,
+                                 yggdrasil_domain, port,
+                                 http_prefix, federation_list,
+                                 send_threads, post_log,
+                                 cached_webfingers, person_cache,
+                                 post_json_object, debug,
+                                 project_version,
+                                 shared_items_federated_domains,
+                                 shared_item_federation_tokens,
+                                 signing_priv_key_pem,
+                                 sites_unavailable,
+                                 system_language, mitm_servers,
+                                 group_send[0], group_send[1],
+                                 curr_proxy_type, domain_capabilities,
+                                 prepared_activity))
+        for sending_future in as_completed(sending_futures):
+            sending_ctr += 1
+            try:
+                follower_domain = sending_future.result()
+            except Exception as exc:
+                print('EX: send_to_followers unable to send ' + str(exc))
+                follower_domain = ''
+            print('Sending post to followers progress ' +
+                  str(int(sending_ctr * 100 / len(sending_futures))) +
+                  '% ' + follower_domain)
 
     if debug:
         print('DEBUG: End of send_to_followers')
 
     sending_end_time = date_utcnow()
-    sending_mins = \
-        int((sending_end_time - sending_start_time).total_seconds() / 60)
-    print('Sending post to followers ends ' + str(sending_mins) + ' mins')
+    sending_secs = \
+        int((sending_end_time - sending_start_time).total_seconds())
+    print('Sending post to followers ends ' +
+          str(int(sending_secs / 60)) + ' mins ' +
+          str(sending_secs % 60) + ' secs, ' +
+          str(len(sending_futures)) + ' instances')
 
 
 def send_to_followers_thread(server, session, session_onion, session_i2p,
@@ -4419,7 +4382,7 @@ def send_to_followers_thread(server, session, session_onion, session_i2p,
                              shared_items_federated_domains: [],
                              shared_item_federation_tokens: {},
                              signing_priv_key_pem: str,
-                             sites_unavailable: [],
+                             sites_unavailable: {},
                              system_language: str,
                              mitm_servers: []):
     """Returns a thread used to send a post to followers
@@ -4839,128 +4802,133 @@ def _create_box_items(base_dir: str,
         }
         first_post_id = replace_strings(first_post_id, replacements)
 
-    prev_post_filename: str = None
-    try:
-        with open(index_filename, 'r', encoding='utf-8') as fp_index:
-            posts_added_to_timeline: int = 0
-            while posts_added_to_timeline < items_per_page:
-                post_filename: str = fp_index.readline()
-
-                if post_filename == prev_post_filename:
-                    break
-                prev_post_filename = post_filename
-                if not post_filename:
-                    break
+    # the index is append-only, so it is read backwards from the end
+    # to obtain the newest posts first
+    end_offset: int = -1
+    if first_post_id:
+        # seek to the first post
+        end_offset = index_entry_offset(index_filename, first_post_id)
+        if end_offset < 0:
+            return total_posts_count, posts_added_to_timeline
+    elif newswire_votes_threshold <= 0 or timeline_nickname != 'news':
+        # no posts are held back by newswire voting, so seek to the
+        # start of the page rather than reading through previous pages
+        end_offset, remaining_skip = \
+            index_page_offset(index_filename,
+                              int((page_number - 1) * items_per_page))
+        total_posts_count = \
+            int((page_number - 1) * items_per_page) - remaining_skip
+    index_entries = \
+        index_entries_newest_first(index_filename,
+                                   'EX: _create_box_items unable to read ' +
+                                   index_filename + ' [ex]', end_offset)
+    for post_filename in index_entries:
+        if posts_added_to_timeline >= items_per_page:
+            break
+        # if a first post is specified then wait until it is found
+        # before starting to generate the timeline
+        if first_post_id and total_posts_count == 0:
+            if first_post_id not in post_filename:
+                continue
+            total_posts_count = \
+                int((page_number - 1) * items_per_page)
+
+        # Has this post passed through the newswire voting stage?
+        if not _passed_newswire_voting(newswire_votes_threshold,
+                                       base_dir, domain,
+                                       post_filename,
+                                       positive_voting,
+                                       voting_time_mins):
+            continue
 
-                # if a first post is specified then wait until it is found
-                # before starting to generate the timeline
-                if first_post_id and total_posts_count == 0:
-                    if first_post_id not in post_filename:
-                        continue
-                    total_posts_count = \
-                        int((page_number - 1) * items_per_page)
-
-                # Has this post passed through the newswire voting stage?
-                if not _passed_newswire_voting(newswire_votes_threshold,
-                                               base_dir, domain,
-                                               post_filename,
-                                               positive_voting,
-                                               voting_time_mins):
-                    continue
+        # Skip through any posts previous to the current page
+        if not first_post_id:
+            if total_posts_count < \
+               int((page_number - 1) * items_per_page):
+                total_posts_count += 1
+                continue
 
-                # Skip through any posts previous to the current page
-                if not first_post_id:
-                    if total_posts_count < \
-                       int((page_number - 1) * items_per_page):
-                        total_posts_count += 1
-                        continue
+        # if this is a full path then remove the directories
+        if '/' in post_filename:
+            post_filename = post_filename.split('/')[-1]
 
-                # if this is a full path then remove the directories
-                if '/' in post_filename:
-                    post_filename = post_filename.split('/')[-1]
+        # filename of the post without any extension or path
+        # This should also correspond to any index entry in
+        # the posts cache
+        post_url: str = remove_eol(post_filename)
+        post_url = post_url.replace('.json', '').strip()
 
-                # filename of the post without any extension or path
-                # This should also correspond to any index entry in
-                # the posts cache
-                post_url: str = remove_eol(post_filename)
-                post_url = post_url.replace('.json', '').strip()
+        # is this a duplicate?
+        if post_url in post_urls_in_box:
+            print('REJECT: Duplicate in timeline ' +
+                  boxname + ' ' + post_url)
+            continue
 
-                # is this a duplicate?
-                if post_url in post_urls_in_box:
-                    print('REJECT: Duplicate in timeline ' +
-                          boxname + ' ' + post_url)
-                    continue
+        # is the post cached in memory?
+        url = get_recent_post(recent_posts_cache, post_url, 'json')
+        if url:
+            if _add_post_string_to_timeline(url,
+                                            boxname,
+                                            posts_in_box,
+                                            box_actor):
+                total_posts_count += 1
+                posts_added_to_timeline += 1
+                post_urls_in_box.append(post_url)
+                continue
+            print('REJECT: Post not added to timeline ' +
+                  post_url)
+
+        # read the post from file
+        full_post_filename: str = \
+            locate_post(base_dir, nickname,
+                        original_domain, post_url, False)
+        if full_post_filename:
+            # has the post been rejected?
+            if is_a_file(full_post_filename + '.reject'):
+                post_url2: str = post_url.replace('/', '#') + '.json'
+                remove_post_from_index(post_url2, False,
+                                       index_filename)
+                print('REJECT: rejected post in timeline ' +
+                      boxname + ' ' + post_url2 + ' ' +
+                      full_post_filename)
+                continue
 
-                # is the post cached in memory?
-                if recent_posts_cache.get('index'):
-                    if post_url in recent_posts_cache['index']:
-                        if recent_posts_cache['json'].get(post_url):
-                            url = recent_posts_cache['json'][post_url]
-                            if _add_post_string_to_timeline(url,
-                                                            boxname,
-                                                            posts_in_box,
-                                                            box_actor):
-                                total_posts_count += 1
-                                posts_added_to_timeline += 1
-                                post_urls_in_box.append(post_url)
-                                continue
-                            print('REJECT: Post not added to timeline ' +
-                                  post_url)
-
-                # read the post from file
-                full_post_filename: str = \
-                    locate_post(base_dir, nickname,
+            if _add_post_to_timeline(full_post_filename, boxname,
+                                     posts_in_box, box_actor):
+                posts_added_to_timeline += 1
+                total_posts_count += 1
+                post_urls_in_box.append(post_url)
+            else:
+                print('REJECT: Unable to add post ' + post_url +
+                      ' nickname ' + nickname +
+                      ' timeline ' + boxname)
+        else:
+            if timeline_nickname != nickname:
+                # if this is the features timeline
+                full_post_filename = \
+                    locate_post(base_dir, timeline_nickname,
                                 original_domain, post_url, False)
                 if full_post_filename:
-                    # has the post been rejected?
-                    if is_a_file(full_post_filename + '.reject'):
-                        post_url2: str = post_url.replace('/', '#') + '.json'
-                        remove_post_from_index(post_url2, False,
-                                               index_filename)
-                        print('REJECT: rejected post in timeline ' +
-                              boxname + ' ' + post_url2 + ' ' +
-                              full_post_filename)
-                        continue
-
-                    if _add_post_to_timeline(full_post_filename, boxname,
+                    if _add_post_to_timeline(full_post_filename,
+                                             boxname,
                                              posts_in_box, box_actor):
                         posts_added_to_timeline += 1
                         total_posts_count += 1
                         post_urls_in_box.append(post_url)
                     else:
-                        print('REJECT: Unable to add post ' + post_url +
-                              ' nickname ' + nickname +
+                        print('REJECT: Unable to add features post ' +
+                              post_url + ' nickname ' + nickname +
                               ' timeline ' + boxname)
                 else:
-                    if timeline_nickname != nickname:
-                        # if this is the features timeline
-                        full_post_filename = \
-                            locate_post(base_dir, timeline_nickname,
-                                        original_domain, post_url, False)
-                        if full_post_filename:
-                            if _add_post_to_timeline(full_post_filename,
-                                                     boxname,
-                                                     posts_in_box, box_actor):
-                                posts_added_to_timeline += 1
-                                total_posts_count += 1
-                                post_urls_in_box.append(post_url)
-                            else:
-                                print('REJECT: Unable to add features post ' +
-                                      post_url + ' nickname ' + nickname +
-                                      ' timeline ' + boxname)
-                        else:
-                            print('REJECT: features timeline. ' +
-                                  'Unable to locate post ' + post_url)
-                    else:
-                        if timeline_nickname == 'news':
-                            print('REJECT: Unable to locate news post ' +
-                                  post_url + ' nickname ' + nickname)
-                        else:
-                            print('REJECT: Unable to locate post ' + post_url +
-                                  ' nickname ' + nickname)
-    except OSError as exc:
-        print('EX: _create_box_items unable to read ' + index_filename +
-              ' ' + str(exc))
+                    print('REJECT: features timeline. ' +
+                          'Unable to locate post ' + post_url)
+            else:
+                if timeline_nickname == 'news':
+                    print('REJECT: Unable to locate news post ' +
+                          post_url + ' nickname ' + nickname)
+                else:
+                    print('REJECT: Unable to locate post ' + post_url +
+                          ' nickname ' + nickname)
     return total_posts_count, posts_added_to_timeline
 
 
@@ -5153,6 +5121,7 @@ def _create_box_indexed(recent_posts_cache: {},
 
 
 def expire_cache(base_dir: str, person_cache: {},
+                 person_cache_stats: {},
                  http_prefix: str, archive_dir: str,
                  recent_posts_cache: {},
                  max_posts_in_box: int,
@@ -5162,9 +5131,14 @@ def expire_cache(base_dir: str, person_cache: {},
     while True:
         # once per day
         time.sleep(60 * 60 * 24)
-        expire_person_cache(person_cache)
+        expire_person_cache(person_cache, person_cache_stats)
         archive_posts(base_dir, http_prefix, archive_dir, recent_posts_cache,
                       max_posts_in_box, max_cache_age_days)
+        if recent_posts_cache.get('index'):
+            print('Recent posts cache: ' +
+                  str(len(recent_posts_cache['index'])) + ' posts, ' +
+                  str(recent_posts_cache['hits']) + ' hits, ' +
+                  str(recent_posts_cache['misses']) + ' misses')
 
 
 def _expire_announce_cache_for_person(base_dir: str,
@@ -5656,7 +5630,6 @@ def archive_posts_for_person(http_prefix: str, nickname: str, domain: str,
     index_filename: str = \
         acct_handle_dir(base_dir, handle) + '/' + boxname + '.index'
     if is_a_file(index_filename):
-        index_ctr: int = 0
         # get the existing index entries as a string
         new_index: str = ''
         index_list: list[str] = \
@@ -5664,11 +5637,12 @@ def archive_posts_for_person(http_prefix: str, nickname: str, domain: str,
                       'EX: archive_posts_for_person unable to read ' +
                       index_filename + ' [ex]')
         if index_list is not None:
-            for post_id in index_list:
+            # keep the newest entries, which are at the end of the index
+            start_index: int = len(index_list) - max_posts_in_box
+            if start_index < 0:
+                start_index = 0
+            for post_id in index_list[start_index:]:
                 new_index += post_id
-                index_ctr += 1
-                if index_ctr >= max_posts_in_box:
-                    break
         # save the new index file
         if new_index:
             save_string(new_index, index_filename,
@@ -5800,9 +5774,10 @@ def archive_posts_for_person(http_prefix: str, nickname: str, domain: str,
             continue
         if archive_dir:
             archive_path: str = os.path.join(archive_dir, post_filename)
-            move_file(file_path, archive_path,
-                      'EX: archive_posts_for_person unable to archive ' +
-                      file_path + ' -> ' + archive_path)
+            if move_file(file_path, archive_path,
+                         'EX: archive_posts_for_person unable to archive ' +
+                         file_path + ' -> ' + archive_path):
+                remove_from_search_index(file_path)
 
             extensions: list[str] = (
                 'votes', 'arrived', 'muted', 'tts', 'reject', 'mitm',
@@ -6138,8 +6113,8 @@ def _get_non_mutuals_of_person(base_dir: str,
     """
     followers: list[str] = \
         get_followers_list(base_dir, nickname, domain, 'followers.txt')
-    following: list[str] = \
-        get_followers_list(base_dir, nickname, domain, 'following.txt')
+    following: frozenset = \
+        get_followers_set(base_dir, nickname, domain, 'following.txt')
     non_mutuals: list[str] = []
     for handle in followers:
         if handle not in following:
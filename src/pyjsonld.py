@@ -22,7 +22,7 @@ __module_group__ = "Security"
 __all__ = [
     'compact', 'expand', 'flatten', 'frame', 'link', 'from_rdf', 'to_rdf',
     'normalize', 'set_document_loader', 'get_document_loader',
-    'parse_link_header', 'load_document',
+    'parse_link_header', 'load_document', 'clear_context_cache',
     'register_rdf_parser', 'unregister_rdf_parser',
     'JsonLdProcessor', 'JsonLdError', 'ActiveContextCache']
 
@@ -36,6 +36,7 @@ import socket
 import ssl
 import string
 import sys
+import threading
 import traceback
 from collections import deque, namedtuple
 from numbers import Integral, Real
@@ -370,6 +371,57 @@ def load_document(url: str) -> {}:
     """
     Retrieves JSON-LD at the given URL.
 
+    Recognised contexts are built once and then shared, so the
+    returned document must not be modified.
+
+    :param url: the URL to retrieve.
+
+    :return: the RemoteDocument.
+    """
+    doc = _PRECOMPILED_DOCUMENTS.get(url)
+    if doc is not None:
+        return doc
+    doc = _load_builtin_document(url)
+    if doc:
+        _precompile_document(url, doc)
+    return doc
+
+
+def clear_context_cache() -> None:
+    """
+    Clears the recognised contexts and processed active contexts, so
+    that they are rebuilt when next used.
+    """
+    _PRECOMPILED_DOCUMENTS.clear()
+    _PRECOMPILED_CONTEXTS.clear()
+    _RESOLVED_CONTEXTS.clear()
+    _cache['activeCtx'] = ActiveContextCache()
+
+
+def _precompile_document(url: str, doc: {}) -> None:
+    """
+    Stores a recognised context document so that it is not rebuilt,
+    and registers its contexts so that processed active contexts can
+    be cached by URL rather than by serializing the whole context.
+
+    :param url: the URL of the document.
+    :param doc: the RemoteDocument.
+    """
+    ctx = doc['document'].get('@context')
+    ctxs = JsonLdProcessor.arrayify(ctx)
+    index = 0
+    for item in ctxs:
+        if _is_object(item):
+            _PRECOMPILED_CONTEXTS[id(item)] = \
+                (item, 'url:' + url + '#' + str(index))
+        index += 1
+    _PRECOMPILED_DOCUMENTS[url] = doc
+
+
+def _load_builtin_document(url: str) -> {}:
+    """
+    Returns one of the recognised JSON-LD contexts for the given URL.
+
     :param url: the URL to retrieve.
 
     :return: the RemoteDocument.
@@ -4207,6 +4259,12 @@ class JsonLdProcessor(object):
             if url in cycles:
                 print('EX: Cyclical @context URLs detected. ' + str(url))
                 return
+            # recognised contexts only need to be resolved once
+            if load_document2 is load_document and \
+               url in _RESOLVED_CONTEXTS:
+                urls[url] = _RESOLVED_CONTEXTS[url]
+                continue
+
             cycles_ = copy.deepcopy(cycles)
             cycles_[url] = True
 
@@ -4236,8 +4294,12 @@ class JsonLdProcessor(object):
                 return
 
             # use empty context if no @context key is present
+            # copy any array so that the loaded document is not modified
+            # when its URLs are replaced
             if '@context' not in ctx:
                 ctx = {'@context': {}}
+            elif _is_array(ctx['@context']):
+                ctx = {'@context': list(ctx['@context'])}
             else:
                 ctx = {'@context': ctx['@context']}
 
@@ -4249,6 +4311,9 @@ class JsonLdProcessor(object):
             # recurse
             self._retrieve_context_urls(ctx, cycles_, load_document2, url)
             urls[url] = ctx['@context']
+            if load_document2 is load_document and \
+               remote_doc is _PRECOMPILED_DOCUMENTS.get(url):
+                _RESOLVED_CONTEXTS[url] = ctx['@context']
 
         # replace all URLs in the input
         self._find_context_urls(input_, urls, replace=True, base=base)
@@ -4723,30 +4788,70 @@ class ActiveContextCache(object):
     """
     An ActiveContextCache caches active contexts so they can be reused without
     the overhead of recomputing them.
+
+    Cached active contexts are shared and must not be modified. They are
+    keyed by identity, as are precompiled local contexts, so only other
+    contexts need to be serialized to obtain a key.
     """
 
     def __init__(self, size: int = 100):
         self.order = deque()
         self.cache = {}
+        self.keys = {}
         self.size = size
+        self.lock = threading.Lock()
 
     def get(self, active_ctx: {}, local_ctx: {}):
         """ get
         """
-        key1 = json.dumps(active_ctx)
-        key2 = json.dumps(local_ctx)
-        return self.cache.get(key1, {}).get(key2)
+        with self.lock:
+            key1 = _context_cache_key(active_ctx, self.keys)
+            key2 = _context_cache_key(local_ctx, self.keys)
+            return self.cache.get(key1, {}).get(key2)
 
     def set(self, active_ctx: {}, local_ctx: {}, result):
         """ set
         """
-        if len(self.order) == self.size:
-            entry = self.order.popleft()
-            del self.cache[entry['activeCtx']][entry['localCtx']]
-        key1 = json.dumps(active_ctx)
-        key2 = json.dumps(local_ctx)
-        self.order.append({'activeCtx': key1, 'localCtx': key2})
-        self.cache.setdefault(key1, {})[key2] = json.loads(json.dumps(result))
+        with self.lock:
+            key1 = _context_cache_key(active_ctx, self.keys)
+            key2 = _context_cache_key(local_ctx, self.keys)
+            if key2 in self.cache.get(key1, {}):
+                return
+            if len(self.order) == self.size:
+                entry = self.order.popleft()
+                local_ctxs = self.cache[entry['activeCtx']]
+                del local_ctxs[entry['localCtx']]
+                if not local_ctxs:
+                    del self.cache[entry['activeCtx']]
+                self.keys.pop(entry['result'], None)
+            self.order.append({
+                'activeCtx': key1,
+                'localCtx': key2,
+                'result': id(result)
+            })
+            self.cache.setdefault(key1, {})[key2] = result
+            result_key = key1 + '\n' + key2
+            result_key = \
+                hashlib.sha256(result_key.encode('utf-8')).hexdigest()
+            self.keys[id(result)] = (result, result_key)
+
+
+def _context_cache_key(ctx: {}, keys: {}) -> str:
+    """
+    Returns the key used to cache a context. Contexts which are already
+    known are looked up by identity rather than being serialized.
+
+    :param ctx: the active or local context.
+    :param keys: identities of cached active contexts.
+
+    :return: the cache key.
+    """
+    entry = keys.get(id(ctx))
+    if entry is None:
+        entry = _PRECOMPILED_CONTEXTS.get(id(ctx))
+    if entry is not None and entry[0] is ctx:
+        return entry[1]
+    return json.dumps(ctx)
 
 
 class VerifiedHTTPSConnection(HTTPSConnection):
@@ -4801,3 +4906,10 @@ for path2 in _possible_trust_root_certificates:
 _cache = {
     'activeCtx': ActiveContextCache()
 }
+
+# recognised context documents, by URL
+_PRECOMPILED_DOCUMENTS = {}
+# identities of the contexts within recognised documents
+_PRECOMPILED_CONTEXTS = {}
+# recognised contexts with their context URLs replaced, by URL
+_RESOLVED_CONTEXTS = {}
@@ -79,7 +79,7 @@ def _reactionpost(recent_posts_cache: {},
                   curr_domain: str,
                   onion_domain: str, i2p_domain: str,
                   yggdrasil_domain: str,
-                  sites_unavailable: [],
+                  sites_unavailable: {},
                   system_language: str,
                   mitm_servers: []) -> {}:
     """Creates an emoji reaction
@@ -179,7 +179,7 @@ def reaction_post(recent_posts_cache: {},
                   signing_priv_key_pem: str,
                   curr_domain: str, onion_domain: str, i2p_domain: str,
                   yggdrasil_domain: str,
-                  sites_unavailable: [], system_language: str,
+                  sites_unavailable: {}, system_language: str,
                   mitm_servers: []) -> {}:
     """Adds a reaction to a given status post. This is only used by unit tests
     """
@@ -321,7 +321,7 @@ def update_moved_actors(base_dir: str, debug: bool) -> None:
 
 def _get_inactive_accounts(base_dir: str, nickname: str, domain: str,
                            dormant_months: int,
-                           sites_unavailable: []) -> []:
+                           sites_unavailable: {}) -> []:
     """returns a list of inactive accounts
     """
     # get the list of followers
@@ -384,7 +384,7 @@ def _get_inactive_accounts(base_dir: str, nickname: str, domain: str,
 def get_inactive_feed(base_dir: str, domain: str, port: int, path: str,
                       http_prefix: str, authorized: bool,
                       dormant_months: int,
-                      follows_per_page: int, sites_unavailable: []) -> {}:
+                      follows_per_page: int, sites_unavailable: {}) -> {}:
     """Returns the inactive accounts feed from GET requests.
     """
     # Don't show inactive accounts to non-authorized viewers
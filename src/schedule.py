@@ -24,6 +24,7 @@ from src.outbox import post_message_to_outbox
 from src.session import create_session
 from src.threads import begin_thread
 from src.siteactive import save_unavailable_sites
+from src.siteactive import save_domain_capabilities
 from src.data import save_string
 from src.data import load_list
 from src.data import erase_file
@@ -238,6 +239,7 @@ def run_post_schedule_watchdog(project_version: str, httpd) -> None:
         httpd.thrPostSchedule.clone(run_post_schedule)
     begin_thread(httpd.thrPostSchedule, 'run_post_schedule_watchdog')
     curr_sites_unavailable = httpd.sites_unavailable.copy()
+    curr_domain_capabilities = httpd.domain_capabilities.copy()
     while True:
         time.sleep(20)
 
@@ -246,6 +248,12 @@ def run_post_schedule_watchdog(project_version: str, httpd) -> None:
             save_unavailable_sites(httpd.base_dir, httpd.sites_unavailable)
             curr_sites_unavailable = httpd.sites_unavailable.copy()
 
+        # save the known capabilities of instances
+        domain_capabilities = httpd.domain_capabilities.copy()
+        if curr_domain_capabilities != domain_capabilities:
+            save_domain_capabilities(httpd.base_dir, domain_capabilities)
+            curr_domain_capabilities = domain_capabilities
+
         if httpd.thrPostSchedule.is_alive():
             continue
         httpd.thrPostSchedule.kill()
@@ -18,8 +18,10 @@ from src.utils import is_account_dir
 from src.utils import get_nickname_from_actor
 from src.utils import get_domain_from_actor
 from src.utils import get_full_domain
-from src.utils import get_followers_list
+from src.utils import get_followers_set
 from src.utils import get_mutuals_of_person
+from src.data import index_entries_newest_first
+from src.searchindex import search_index_candidates
 from src.data import load_string
 from src.data import save_string
 from src.data import is_a_file
@@ -86,6 +88,46 @@ def _actor_in_searchable_by(searchable_by: str, following_list: []) -> bool:
     return True
 
 
+def _post_matches_search(data: str, search_words: []) -> bool:
+    """Does the text of a post contain all of the search words?
+    """
+    data_lower = data.lower()
+    for keyword in search_words:
+        if keyword not in data_lower:
+            return False
+    return True
+
+
+def _post_is_searchable(data: str, following_list: frozenset,
+                        mutuals_list: frozenset) -> bool:
+    """Is the post marked as being searchable by this account?
+    https://codeberg.org/fediverse/fep/
+    src/branch/main/fep/268d/fep-268d.md
+    """
+    if '"searchableBy":' not in data:
+        return False
+    searchable_by = \
+        data.split('"searchableBy":')[1].strip()
+    if searchable_by.startswith('['):
+        searchable_by = searchable_by.split(']')[0]
+    if '"' in searchable_by:
+        searchable_by = searchable_by.split('"')[1]
+    elif "'" in searchable_by:
+        searchable_by = searchable_by.split("'")[1]
+    else:
+        return False
+    if '#Public' not in searchable_by:
+        if '/followers' in searchable_by and following_list:
+            if not _actor_in_searchable_by(searchable_by, following_list):
+                return False
+        elif '/mutuals' in searchable_by and mutuals_list:
+            if not _actor_in_searchable_by(searchable_by, mutuals_list):
+                return False
+        else:
+            return False
+    return True
+
+
 def _search_virtual_box_posts(base_dir: str, nickname: str, domain: str,
                               search_str: str, max_results: int,
                               box_name: str) -> []:
@@ -109,38 +151,38 @@ def _search_virtual_box_posts(base_dir: str, nickname: str, domain: str,
     else:
         search_words = [search_str]
 
+    # posts which may match, from the search index for the box
+    candidates = search_index_candidates(path, search_words)
+    if candidates is not None:
+        if not candidates:
+            return []
+        candidates = frozenset(candidates)
+
     res: list[str] = []
-    try:
-        with open(index_filename, 'r', encoding='utf-8') as fp_index:
-            post_filename = 'start'
-            while post_filename:
-                post_filename = fp_index.readline()
-                if not post_filename:
-                    break
-                if '.json' not in post_filename:
-                    break
-                post_filename = path + '/' + post_filename.strip()
-                if not is_a_file(post_filename):
-                    continue
-                data = load_string(post_filename,
+    index_entries = \
+        index_entries_newest_first(index_filename,
                                    'EX: _search_virtual_box_posts ' +
-                                   'unable to read ' + post_filename)
-                if data is not None:
-                    data = data.lower()
-                    not_found: bool = False
-                    for keyword in search_words:
-                        if keyword not in data:
-                            not_found = True
-                            break
-                    if not_found:
-                        continue
-
-                    res.append(post_filename)
-                    if len(res) >= max_results:
-                        return res
-    except OSError as exc:
-        print('EX: _search_virtual_box_posts unable to read ' +
-              index_filename + ' ' + str(exc))
+                                   'unable to read ' + index_filename +
+                                   ' [ex]')
+    for post_filename in index_entries:
+        if '.json' not in post_filename:
+            break
+        post_filename = path + '/' + post_filename
+        if candidates is not None:
+            if post_filename not in candidates:
+                continue
+        if not is_a_file(post_filename):
+            continue
+        data = load_string(post_filename,
+                           'EX: _search_virtual_box_posts ' +
+                           'unable to read ' + post_filename)
+        if data is not None:
+            if not _post_matches_search(data, search_words):
+                continue
+
+            res.append(post_filename)
+            if len(res) >= max_results:
+                break
     return res
 
 
@@ -167,70 +209,47 @@ def search_box_posts(base_dir: str, nickname: str, domain: str,
     else:
         search_words = [search_str]
 
-    following_list: list[str] = []
-    mutuals_list: list[str] = []
+    following_list: frozenset = frozenset()
+    mutuals_list: frozenset = frozenset()
     check_searchable_by: bool = False
     if box_name == 'inbox':
         check_searchable_by = True
         # https://codeberg.org/fediverse/fep/
         # src/branch/main/fep/268d/fep-268d.md
         # create a list containing all of the handles followed
-        following_list = get_followers_list(base_dir, nickname, domain,
-                                            'following.txt')
+        following_list = get_followers_set(base_dir, nickname, domain,
+                                           'following.txt')
         # create a list containing all of the mutuals
-        mutuals_list: list[str] = \
-            get_mutuals_of_person(base_dir, nickname, domain)
+        mutuals = get_mutuals_of_person(base_dir, nickname, domain)
+        mutuals_list = frozenset(mutuals)
 
     res: list[str] = []
-    for root, _, fnames in os.walk(path):
-        for fname in fnames:
-            file_path = os.path.join(root, fname)
-            data = load_string(file_path,
-                               'EX: search_box_posts unable to read ' +
-                               file_path + ' [ex]')
-            if data is not None:
-                data_lower = data.lower()
-
-                not_found: bool = False
-                for keyword in search_words:
-                    if keyword not in data_lower:
-                        not_found = True
-                        break
-                if not_found:
-                    continue
-
-                # if this is not an outbox/bookmarks search then is the
-                # post marked as being searchable?
-                # https://codeberg.org/fediverse/fep/
-                # src/branch/main/fep/268d/fep-268d.md
-                if check_searchable_by:
-                    if '"searchableBy":' not in data:
-                        continue
-                    searchable_by = \
-                        data.split('"searchableBy":')[1].strip()
-                    if searchable_by.startswith('['):
-                        searchable_by = searchable_by.split(']')[0]
-                    if '"' in searchable_by:
-                        searchable_by = searchable_by.split('"')[1]
-                    elif "'" in searchable_by:
-                        searchable_by = searchable_by.split("'")[1]
-                    else:
-                        continue
-                    if '#Public' not in searchable_by:
-                        if '/followers' in searchable_by and \
-                           following_list:
-                            if not _actor_in_searchable_by(searchable_by,
-                                                           following_list):
-                                continue
-                        elif '/mutuals' in searchable_by and mutuals_list:
-                            if not _actor_in_searchable_by(searchable_by,
-                                                           mutuals_list):
-                                continue
-                        else:
-                            continue
-
-                res.append(file_path)
-                if len(res) >= max_results:
-                    return res
-        break
+    candidates = search_index_candidates(path, search_words)
+    if candidates is None:
+        # the index can't be used, so search all posts within the box
+        candidates = []
+        for root, _, fnames in os.walk(path):
+            for fname in fnames:
+                candidates.append(os.path.join(root, fname))
+            break
+    for file_path in candidates:
+        data = load_string(file_path,
+                           'EX: search_box_posts unable to read ' +
+                           file_path + ' [ex]')
+        if data is None:
+            continue
+        if not _post_matches_search(data, search_words):
+            continue
+
+        # if this is not an outbox/bookmarks search then is the
+        # post marked as being searchable?
+        # https://codeberg.org/fediverse/fep/
+        # src/branch/main/fep/268d/fep-268d.md
+        if check_searchable_by:
+            if not _post_is_searchable(data, following_list, mutuals_list):
+                continue
+
+        res.append(file_path)
+        if len(res) >= max_results:
+            break
     return res
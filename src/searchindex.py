@@ -0,0 +1,328 @@
+__filename__ = "searchindex.py"
+__author__ = "Bob Mottram"
+__license__ = "AGPL3+"
+__version__ = "1.7.0"
+__maintainer__ = "Bob Mottram"
+__email__ = "bob@libreserver.org"
+__status__ = "Production"
+__module_group__ = "Core"
+
+# Inverted index of the words within the posts of each box
+
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from src.data import load_string
+from src.data import append_string
+from src.data import save_string
+from src.data import erase_file
+from src.data import is_a_file
+from src.data import is_a_dir
+
+# maximum number of search indexes kept in memory
+MAX_SEARCH_INDEXES = 32
+
+# minimum number of obsolete lines before an index file is compacted
+SEARCH_INDEX_COMPACT_LINES = 1024
+
+_SEARCH_INDEX_LOCK = threading.RLock()
+_SEARCH_INDEXES = OrderedDict()
+# the most recently added line for each index file
+_LAST_INDEX_LINES = {}
+
+
+def _post_search_words(text: str) -> []:
+    """Returns the unique words within the text of a post
+    """
+    return sorted(set(re.findall(r'\w+', text.lower())))
+
+
+def _search_index_line(post_filename: str, text: str) -> str:
+    """Returns the index line for a post, which is the post filename
+    followed by a tab and its words. Deleted posts have a line beginning
+    with - followed by the post filename
+    """
+    return '+' + post_filename + '\t' + \
+        ' '.join(_post_search_words(text)) + '\n'
+
+
+def _post_search_text(post_filename: str) -> str:
+    """Returns the text of a post which is to be indexed
+    """
+    return load_string(post_filename,
+                       'EX: unable to read post to be indexed ' +
+                       post_filename)
+
+
+def add_to_search_index(box_dir: str, post_filename: str) -> None:
+    """Adds a saved post to the search index for a box.
+    If the index has not been created yet then nothing is done,
+    because the index is created when the box is first searched
+    """
+    index_filename = box_dir + '.search'
+    if not is_a_file(index_filename):
+        return
+    if not is_a_file(post_filename):
+        return
+    text = _post_search_text(post_filename)
+    if text is None:
+        return
+    post_basename = os.path.basename(post_filename)
+    index_line = _search_index_line(post_basename, text)
+    with _SEARCH_INDEX_LOCK:
+        # the same post may be indexed more than once when it is saved,
+        # such as by save_post_to_box and then by inbox_update_index
+        if _LAST_INDEX_LINES.get(index_filename) == index_line:
+            return
+        if append_string(index_line, index_filename,
+                         'EX: unable to add to search index ' +
+                         index_filename):
+            _LAST_INDEX_LINES[index_filename] = index_line
+
+
+def remove_from_search_index(post_filename: str) -> None:
+    """Marks a deleted post within the search index for its box
+    """
+    box_dir = os.path.dirname(post_filename)
+    index_filename = box_dir + '.search'
+    if not is_a_file(index_filename):
+        return
+    post_basename = os.path.basename(post_filename)
+    with _SEARCH_INDEX_LOCK:
+        _LAST_INDEX_LINES.pop(index_filename, None)
+        append_string('-' + post_basename + '\n', index_filename,
+                      'EX: unable to remove from search index ' +
+                      index_filename)
+
+
+def _create_search_index(box_dir: str, index_filename: str) -> None:
+    """Creates the search index for a box by reading all of its posts,
+    oldest first
+    """
+    post_files: list[tuple] = []
+    for _, _, fnames in os.walk(box_dir):
+        for fname in fnames:
+            if not fname.endswith('.json'):
+                continue
+            try:
+                modified = os.path.getmtime(os.path.join(box_dir, fname))
+            except OSError:
+                continue
+            post_files.append((modified, fname))
+        break
+    post_files.sort()
+
+    indexed: set[str] = set()
+    index_lines: list[str] = []
+    for _, fname in post_files:
+        post_filename = os.path.join(box_dir, fname)
+        text = _post_search_text(post_filename)
+        if text is None:
+            continue
+        index_line = _search_index_line(fname, text)
+        index_lines.append(index_line)
+        indexed.add(fname)
+
+    index_text = ''.join(index_lines)
+    new_index_filename = index_filename + '.new'
+    if not save_string(index_text, new_index_filename,
+                       'EX: unable to create search index ' +
+                       new_index_filename):
+        return
+    try:
+        os.replace(new_index_filename, index_filename)
+    except OSError as exc:
+        print('EX: unable to replace search index ' +
+              index_filename + ' ' + str(exc))
+        erase_file(new_index_filename,
+                   'EX: unable to remove search index ' + new_index_filename)
+        return
+
+    # add any posts which were saved while the index was being created
+    for _, _, fnames in os.walk(box_dir):
+        for fname in fnames:
+            if fname.endswith('.json') and fname not in indexed:
+                post_filename = os.path.join(box_dir, fname)
+                add_to_search_index(box_dir, post_filename)
+        break
+
+
+def _new_search_index(inode: int) -> {}:
+    """Returns an empty in-memory search index
+    """
+    return {
+        "inode": inode,
+        "offset": 0,
+        "lines": 0,
+        "postIds": {},
+        "posts": [],
+        "deleted": set(),
+        "words": {}
+    }
+
+
+def _search_index_add_post(index: {}, post_basename: str,
+                           words: []) -> None:
+    """Adds a post and its words to an in-memory search index
+    """
+    post_id = index['postIds'].get(post_basename)
+    if post_id is None:
+        post_id = len(index['posts'])
+        index['postIds'][post_basename] = post_id
+        index['posts'].append(post_basename)
+    index['deleted'].discard(post_id)
+    index_words = index['words']
+    for word in words:
+        postings = index_words.get(word)
+        if postings is None:
+            index_words[word] = array('I', (post_id,))
+        elif postings[-1] != post_id:
+            postings.append(post_id)
+
+
+def _search_index_parse(index: {}, text: str) -> None:
+    """Adds lines from a search index file to an in-memory index
+    """
+    for line in text.split('\n'):
+        if not line:
+            continue
+        index['lines'] += 1
+        if line.startswith('-'):
+            post_id = index['postIds'].get(line[1:])
+            if post_id is not None:
+                index['deleted'].add(post_id)
+            continue
+        if not line.startswith('+') or '\t' not in line:
+            continue
+        post_basename, words_str = line[1:].split('\t', 1)
+        _search_index_add_post(index, post_basename, words_str.split())
+
+
+def _compact_search_index(index_filename: str, text: str) -> bool:
+    """Rewrites a search index file so that it only contains the most
+    recent line for each post which has not been deleted
+    """
+    live_lines = {}
+    for line in text.split('\n'):
+        if line.startswith('-'):
+            live_lines.pop(line[1:], None)
+        elif line.startswith('+') and '\t' in line:
+            post_basename = line[1:].split('\t', 1)[0]
+            # keep the most recent line last, in order of saving
+            live_lines.pop(post_basename, None)
+            live_lines[post_basename] = line
+    compacted = ''.join(line + '\n' for line in live_lines.values())
+    new_index_filename = index_filename + '.new'
+    if not save_string(compacted, new_index_filename,
+                       'EX: unable to compact search index ' +
+                       new_index_filename):
+        return False
+    try:
+        os.replace(new_index_filename, index_filename)
+    except OSError as exc:
+        print('EX: unable to replace compacted search index ' +
+              index_filename + ' ' + str(exc))
+        return False
+    return True
+
+
+def _read_search_index_from(index_filename: str, offset: int) -> str:
+    """Returns the complete lines of a search index file after the
+    given byte offset
+    """
+    try:
+        with open(index_filename, 'rb') as fp:
+            fp.seek(offset)
+            data = fp.read()
+    except OSError as exc:
+        print('EX: unable to read search index ' + index_filename +
+              ' ' + str(exc))
+        return ''
+    # ignore any incomplete line which is still being written
+    end = data.rfind(b'\n') + 1
+    return data[:end].decode('utf-8', errors='ignore')
+
+
+def _load_search_index(index_filename: str) -> {}:
+    """Returns the in-memory search index for the given file, reading
+    only the lines which were added since it was last loaded
+    """
+    try:
+        stat = os.stat(index_filename)
+    except OSError:
+        return None
+    index = _SEARCH_INDEXES.get(index_filename)
+    if index is not None:
+        if index['inode'] != stat.st_ino or stat.st_size < index['offset']:
+            index = None
+    if index is None:
+        text = _read_search_index_from(index_filename, 0)
+        index = _new_search_index(stat.st_ino)
+        _search_index_parse(index, text)
+        index['offset'] = len(text.encode('utf-8'))
+        obsolete = index['lines'] - \
+            (len(index['posts']) - len(index['deleted']))
+        if obsolete > SEARCH_INDEX_COMPACT_LINES and \
+           obsolete > index['lines'] // 2:
+            if _compact_search_index(index_filename, text):
+                return _load_search_index(index_filename)
+    elif stat.st_size > index['offset']:
+        text = _read_search_index_from(index_filename, index['offset'])
+        _search_index_parse(index, text)
+        index['offset'] += len(text.encode('utf-8'))
+    _SEARCH_INDEXES[index_filename] = index
+    _SEARCH_INDEXES.move_to_end(index_filename)
+    while len(_SEARCH_INDEXES) > MAX_SEARCH_INDEXES:
+        _SEARCH_INDEXES.popitem(last=False)
+    return index
+
+
+def _search_index_word_posts(index: {}, search_word: str) -> set:
+    """Returns the ids of posts containing a word which contains
+    the given search word
+    """
+    post_ids: set[int] = set()
+    for word, postings in index['words'].items():
+        if search_word in word:
+            post_ids.update(postings)
+    return post_ids
+
+
+def search_index_candidates(box_dir: str, search_words: []) -> []:
+    """Returns the filenames of posts within a box which may contain
+    all of the given search words, newest first.
+    Returns None if the index can't be used for these search words,
+    in which case all posts within the box need to be searched
+    """
+    if not is_a_dir(box_dir):
+        return None
+    words_list: list[list] = []
+    for keyword in search_words:
+        words = re.findall(r'\w+', keyword)
+        if not words:
+            return None
+        words_list.append(words)
+
+    index_filename = box_dir + '.search'
+    with _SEARCH_INDEX_LOCK:
+        if not is_a_file(index_filename):
+            _create_search_index(box_dir, index_filename)
+        index = _load_search_index(index_filename)
+        if index is None:
+            return None
+        candidates = None
+        for words in words_list:
+            for word in words:
+                post_ids = _search_index_word_posts(index, word)
+                if candidates is None:
+                    candidates = post_ids
+                else:
+                    candidates &= post_ids
+                if not candidates:
+                    return []
+        candidates -= index['deleted']
+        posts = index['posts']
+        return [box_dir + '/' + posts[post_id]
+                for post_id in sorted(candidates, reverse=True)]
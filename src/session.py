@@ -8,6 +8,7 @@ __status__ = "Production"
 __module_group__ = "Session"
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import errno
 from socket import error as SocketError
@@ -32,6 +33,91 @@ from src.data import load_binary
 from src.data import erase_file
 from src.data import is_a_file
 
+# Limits of the connection pools within each session, so that
+# connections to remote instances are kept alive and reused rather
+# than a new TLS or SOCKS handshake being made for each request.
+# hosts is the number of remote hosts for which connections are kept,
+# and perHost is the number of connections kept to each host
+SESSION_POOL_LIMITS = {
+    "hosts": 256,
+    "perHost": 8
+}
+
+
+def set_session_pool_limits(pool_hosts: int, pool_per_host: int) -> None:
+    """Sets the limits of the connection pools of new sessions.
+    Zero values leave the limit unchanged
+    """
+    if pool_hosts > 0:
+        SESSION_POOL_LIMITS['hosts'] = pool_hosts
+    if pool_per_host > 0:
+        SESSION_POOL_LIMITS['perHost'] = pool_per_host
+
+
+def session_pool_statistics(sessions: []) -> {}:
+    """Returns statistics on the reuse of connections within the
+    pools of the given sessions
+    """
+    stats = {
+        "hosts": 0,
+        "requests": 0,
+        "connections": 0,
+        "reused": 0
+    }
+    counted: list = []
+    for session in sessions:
+        # the same session may be used for more than one proxy type
+        if not session or session in counted:
+            continue
+        counted.append(session)
+        for adapter in session.adapters.values():
+            # the same adapter is mounted for http and https
+            if adapter in counted:
+                continue
+            counted.append(adapter)
+            # connections made directly and through proxies
+            managers = \
+                [adapter.poolmanager] + list(adapter.proxy_manager.values())
+            for manager in managers:
+                if not manager:
+                    continue
+                for pool_key in manager.pools.keys():
+                    pool = manager.pools.get(pool_key)
+                    if not pool:
+                        continue
+                    stats['hosts'] += 1
+                    stats['requests'] += pool.num_requests
+                    stats['connections'] += pool.num_connections
+    stats['reused'] = max(0, stats['requests'] - stats['connections'])
+    return stats
+
+
+def get_shared_session(server, proxy_type: str):
+    """Returns the session for the given proxy type which is shared
+    between the inbox queue, delivery workers and newswire daemon,
+    creating it if needed. Sharing sessions means that their
+    connection pools are also shared
+    """
+    if proxy_type == server.proxy_type:
+        if not server.session:
+            server.session = create_session(proxy_type)
+        return server.session
+    if proxy_type == 'tor':
+        if not server.session_onion:
+            server.session_onion = create_session(proxy_type)
+        return server.session_onion
+    if proxy_type == 'i2p':
+        if not server.session_i2p:
+            server.session_i2p = create_session(proxy_type)
+        return server.session_i2p
+    if proxy_type == 'yggdrasil':
+        if not server.session_yggdrasil:
+            server.session_yggdrasil = create_session(proxy_type)
+        return server.session_yggdrasil
+    if not server.session:
+        server.session = create_session(server.proxy_type)
+    return server.session
+
 
 def create_session(proxy_type: str):
     """ Creates a new session
@@ -55,6 +141,13 @@ def create_session(proxy_type: str):
     if not session:
         return None
     session.max_redirects = 3
+    # keep connections alive so that they can be reused.
+    # Connections through proxies are pooled in the same way
+    pool_adapter = \
+        HTTPAdapter(pool_connections=SESSION_POOL_LIMITS['hosts'],
+                    pool_maxsize=SESSION_POOL_LIMITS['perHost'])
+    session.mount('https://', pool_adapter)
+    session.mount('http://', pool_adapter)
     if proxy_type == 'tor':
         session.proxies = {}
         session.proxies['http'] = 'socks5h://localhost:9050'
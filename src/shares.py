@@ -1730,7 +1730,7 @@ def _update_federated_shares_cache(session, shared_items_federated_domains: [],
                                    tokens_json: {}, debug: bool,
                                    system_language: str,
                                    shares_file_type: str,
-                                   sites_unavailable: [],
+                                   sites_unavailable: {},
                                    mitm_servers: []) -> None:
     """Updates the cache of federated shares for the instance.
     This enables shared items to be available even when other instances
@@ -1915,7 +1915,7 @@ def run_federated_shares_daemon(base_dir: str, httpd, http_prefix: str,
     min_days: int = 7
     max_days: int = 14
     _generate_next_shares_token_update(base_dir, min_days, max_days)
-    sites_unavailable: list[str] = []
+    sites_unavailable: dict = {}
     while True:
         shared_items_federated_domains_str = \
             get_config_param(base_dir, 'sharedItemsFederatedDomains')
@@ -11,11 +11,25 @@ __module_group__ = "Core"
 import http.client
 import ssl
 import socket
+import time
 from urllib.parse import urlparse
 from src.utils import data_dir
+from src.utils import load_json
+from src.utils import save_json
 from src.utils import string_starts_with
 from src.data import load_string
-from src.data import save_string
+from src.data import is_a_file
+
+# number of failures after which a host is no longer tried
+SITE_FAILURES_OPEN = 3
+# time after which a host which is down is first tried again
+SITE_PROBE_MIN_SEC = 60
+# longest time between tries of a host which is down
+SITE_PROBE_MAX_SEC = 6 * 60 * 60
+
+# the registry of unavailable sites held by the server object, for
+# functions which are not passed the server
+_SITES_UNAVAILABLE = {}
 
 
 class Result:
@@ -98,8 +112,109 @@ def _site_active_http_request(loc, timeout: int):
     return result
 
 
+def _site_host(url: str) -> str:
+    """Returns the host used as the key within the registry
+    of unavailable sites
+    """
+    if '://' in url:
+        url = url.split('://')[1]
+    return url.split('/')[0]
+
+
+def site_is_available(sites_unavailable: {}, url: str) -> bool:
+    """Returns true if a connection may be made to the host of the
+    given url. This doesn't open any sockets.
+    sites_unavailable is a registry of hosts which recently failed.
+    A host with a few failures is still tried (closed circuit). After
+    more failures it isn't tried until its next probe time (open
+    circuit), when one connection is allowed to test whether it has
+    returned (half-open circuit).
+    """
+    site = sites_unavailable.get(_site_host(url))
+    if not site:
+        return True
+    if site['state'] == 'closed':
+        return True
+    curr_time = time.time()
+    if curr_time < site['nextProbe']:
+        return False
+    # allow one probe, and hold off any others until it has completed
+    sites_unavailable[_site_host(url)] = {
+        "state": 'half-open',
+        "failures": site['failures'],
+        "nextProbe": curr_time + _site_probe_interval(site['failures'])
+    }
+    return True
+
+
+def _site_probe_interval(failures: int) -> int:
+    """Returns the number of seconds after which a host which has
+    failed the given number of times can be tried again
+    """
+    failures -= SITE_FAILURES_OPEN
+    if failures < 0:
+        return 0
+    if failures > 16:
+        return SITE_PROBE_MAX_SEC
+    return min(SITE_PROBE_MIN_SEC * (2 ** failures), SITE_PROBE_MAX_SEC)
+
+
+def site_next_probe(sites_unavailable: {}, url: str) -> float:
+    """Returns the time when the host of the given url may next be
+    connected to, or zero if it is not known to be unavailable
+    """
+    site = sites_unavailable.get(_site_host(url))
+    if not site:
+        return 0
+    return site['nextProbe']
+
+
+def site_failed(sites_unavailable: {}, url: str) -> None:
+    """Records a failure to connect to the host of the given url
+    """
+    host = _site_host(url)
+    failures = 1
+    site = sites_unavailable.get(host)
+    if site:
+        failures = site['failures'] + 1
+    state = 'closed'
+    if failures >= SITE_FAILURES_OPEN:
+        state = 'open'
+    # replaced rather than changed, so that copies of the registry
+    # can be compared to detect changes
+    sites_unavailable[host] = {
+        "state": state,
+        "failures": failures,
+        "nextProbe": time.time() + _site_probe_interval(failures)
+    }
+
+
+def site_succeeded(sites_unavailable: {}, url: str) -> None:
+    """Records a successful connection to the host of the given url
+    """
+    host = _site_host(url)
+    if host in sites_unavailable:
+        sites_unavailable.pop(host, None)
+
+
+def set_sites_unavailable(sites_unavailable: {}) -> None:
+    """Sets the registry of unavailable sites which is returned by
+    get_sites_unavailable
+    """
+    _SITES_UNAVAILABLE['registry'] = sites_unavailable
+
+
+def get_sites_unavailable() -> {}:
+    """Returns the registry of unavailable sites held by the server.
+    If the server has not set one then an empty registry is created
+    """
+    if _SITES_UNAVAILABLE.get('registry') is None:
+        _SITES_UNAVAILABLE['registry'] = {}
+    return _SITES_UNAVAILABLE['registry']
+
+
 def site_is_active(url: str, timeout: int,
-                   sites_unavailable: []) -> bool:
+                   sites_unavailable: {}) -> bool:
     """Returns true if the current url is resolvable.
     This can be used to check that an instance is online before
     trying to send posts to it.
@@ -116,17 +231,17 @@ def site_is_active(url: str, timeout: int,
         # skip this check for onion and i2p
         return True
 
+    # don't connect to hosts which are known to be down
+    if not site_is_available(sites_unavailable, url):
+        return False
+
     loc = _site_active_parse_url(url)
     result = Result(url=url)
-    url2 = url
-    if '://' in url:
-        url2 = url.split('://')[1]
 
     try:
         result = _site_active_http_request(loc, timeout)
 
-        if url2 in sites_unavailable:
-            sites_unavailable.remove(url2)
+        site_succeeded(sites_unavailable, url)
 
         if 400 <= result.status < 500:
             # the site is available but denying access
@@ -137,15 +252,14 @@ def site_is_active(url: str, timeout: int,
     except BaseException as ex:
         print('EX: site_is_active ' + url + ' ' + str(ex))
 
-    if url2 not in sites_unavailable:
-        sites_unavailable.append(url2)
+    site_failed(sites_unavailable, url)
     return False
 
 
 def referer_is_active(http_prefix: str,
                       referer_domain: str, ua_str: str,
                       calling_site_timeout: int,
-                      sites_unavailable: []) -> bool:
+                      sites_unavailable: {}) -> bool:
     """Returns true if the given referer is an active website
     """
     referer_url = http_prefix + '://' + referer_domain
@@ -159,34 +273,121 @@ def referer_is_active(http_prefix: str,
                           sites_unavailable)
 
 
-def save_unavailable_sites(base_dir: str, sites_unavailable: []) -> None:
-    """Save a list of unavailable sites
+def save_unavailable_sites(base_dir: str, sites_unavailable: {}) -> None:
+    """Save the registry of unavailable sites
     """
-    unavailable_sites_filename = data_dir(base_dir) + '/unavailable_sites.txt'
-    sites_unavailable.sort()
-    text = ''
-    for site in sites_unavailable:
-        if site:
-            text += site + '\n'
-    save_string(text, unavailable_sites_filename,
-                'EX: unable to save unavailable sites ' +
-                unavailable_sites_filename)
+    unavailable_sites_filename = \
+        data_dir(base_dir) + '/unavailable_sites.json'
+    sites_json = sites_unavailable.copy()
+    save_json(sites_json, unavailable_sites_filename)
 
 
-def load_unavailable_sites(base_dir: str) -> []:
-    """load a list of unavailable sites
+def load_unavailable_sites(base_dir: str) -> {}:
+    """load the registry of unavailable sites
     """
+    unavailable_sites_filename = \
+        data_dir(base_dir) + '/unavailable_sites.json'
+    sites_unavailable: dict = {}
+    if is_a_file(unavailable_sites_filename):
+        sites_json = load_json(unavailable_sites_filename)
+        if not isinstance(sites_json, dict):
+            return sites_unavailable
+        for host, site in sites_json.items():
+            if not isinstance(site, dict):
+                continue
+            if not site.get('state') or \
+               not isinstance(site.get('failures'), int) or \
+               not isinstance(site.get('nextProbe'), (int, float)):
+                continue
+            sites_unavailable[host] = site
+        return sites_unavailable
+
+    # the previous format was a list of hosts
     unavailable_sites_filename = data_dir(base_dir) + '/unavailable_sites.txt'
-    sites_unavailable: list[str] = []
+    if not is_a_file(unavailable_sites_filename):
+        return sites_unavailable
     sites_unavailable_str = \
         load_string(unavailable_sites_filename,
                     'EX: unable to read unavailable sites ' +
                     unavailable_sites_filename)
-    if sites_unavailable_str:
-        sites_unavailable = sites_unavailable_str.split('\n')
+    if not sites_unavailable_str:
+        return sites_unavailable
+    for host in sites_unavailable_str.split('\n'):
+        if not host:
+            continue
+        # probe again on first use
+        sites_unavailable[_site_host(host)] = {
+            "state": 'open',
+            "failures": SITE_FAILURES_OPEN,
+            "nextProbe": 0
+        }
     return sites_unavailable
 
 
+def get_domain_capability(domain_capabilities: {}, domain: str,
+                          capability: str, ttl_sec: int):
+    """Returns a known capability of an instance, such as whether it
+    has a shared inbox, or None if it is not known or is older than
+    the given time to live
+    """
+    if not domain_capabilities.get(domain):
+        return None
+    capability_json = domain_capabilities[domain].get(capability)
+    if not capability_json:
+        return None
+    if int(time.time()) - capability_json['time'] > ttl_sec:
+        return None
+    return capability_json['value']
+
+
+def set_domain_capability(domain_capabilities: {}, domain: str,
+                          capability: str, value) -> None:
+    """Records a capability of an instance.
+    This may be called from multiple threads, so the capabilities for
+    the instance are replaced rather than changed in place
+    """
+    capabilities: dict = {}
+    if domain_capabilities.get(domain):
+        capabilities = domain_capabilities[domain].copy()
+    capabilities[capability] = {
+        "value": value,
+        "time": int(time.time())
+    }
+    domain_capabilities[domain] = capabilities
+
+
+def save_domain_capabilities(base_dir: str,
+                             domain_capabilities: {}) -> None:
+    """Saves the known capabilities of instances
+    """
+    capabilities_filename = \
+        data_dir(base_dir) + '/domain_capabilities.json'
+    save_json(domain_capabilities, capabilities_filename)
+
+
+def load_domain_capabilities(base_dir: str, max_age_sec: int) -> {}:
+    """Loads the known capabilities of instances, leaving out any
+    which are older than the given maximum age
+    """
+    capabilities_filename = \
+        data_dir(base_dir) + '/domain_capabilities.json'
+    if not is_a_file(capabilities_filename):
+        return {}
+    capabilities_json = load_json(capabilities_filename)
+    if not capabilities_json:
+        return {}
+    curr_time = int(time.time())
+    domain_capabilities: dict = {}
+    for domain, capabilities in capabilities_json.items():
+        for capability, capability_json in capabilities.items():
+            if curr_time - capability_json['time'] > max_age_sec:
+                continue
+            if not domain_capabilities.get(domain):
+                domain_capabilities[domain] = {}
+            domain_capabilities[domain][capability] = capability_json
+    return domain_capabilities
+
+
 def is_online(host: str = "8.8.8.8",
               port: int = 53, timeout: int = 3) -> bool:
     """
@@ -34,6 +34,7 @@ from src.data import erase_file
 from src.data import is_a_file
 from src.data import is_a_dir
 from src.data import makedir
+from src.searchindex import remove_from_search_index
 
 VALID_HASHTAG_CHARS = \
     set('_0123456789' +
@@ -70,6 +71,16 @@ INVALID_ACTOR_URL_CHARACTERS = (
     ';', '='
 )
 
+# how often config.json is checked for changes made by other processes
+CONFIG_CHECK_SEC = 1
+
+# snapshots of config.json for each base directory
+_CONFIG_SNAPSHOTS: dict = {}
+
+# relationships loaded from follow files, such as following.txt
+# and followers.txt, keyed by filename
+_FOLLOW_CACHE: dict = {}
+
 
 def is_account_dir(dir_name: str) -> bool:
     """Is the given directory an account within /accounts ?
@@ -763,6 +774,8 @@ def save_json(json_object: {}, filename: str) -> bool:
                           'EX: save_json ' + str(tries) + ' ' +
                           str(filename) + ' [ex]')
         if success:
+            if filename.endswith('/config.json'):
+                _CONFIG_SNAPSHOTS.pop(filename[:-len('/config.json')], None)
             return True
         if errno == 36:
             # filename too long
@@ -828,17 +841,98 @@ def set_config_param(base_dir: str, variable_name: str,
     save_json(config_json, config_filename)
 
 
-def get_config_param(base_dir: str, variable_name: str) -> str:
-    """Gets a configuration value
+def _get_config_snapshot(base_dir: str) -> {}:
+    """Returns the configuration, which is only loaded again if
+    config.json has been saved or its modification time has changed
     """
+    curr_time = time.time()
+    snapshot = _CONFIG_SNAPSHOTS.get(base_dir)
+    if snapshot:
+        if curr_time - snapshot['checked'] < CONFIG_CHECK_SEC:
+            return snapshot['config']
     _create_config(base_dir)
     config_filename: str = base_dir + '/config.json'
-    config_json: dict = load_json(config_filename)
-    if config_json:
-        variable_name: str = _convert_to_camel_case(variable_name)
-        if variable_name in config_json:
-            return config_json[variable_name]
-    return None
+    modified = None
+    try:
+        modified = os.stat(config_filename).st_mtime_ns
+    except OSError:
+        print('EX: _get_config_snapshot unable to stat ' + config_filename)
+    config_json = None
+    if snapshot and modified is not None:
+        if snapshot['modified'] == modified:
+            config_json = snapshot['config']
+    if config_json is None:
+        config_json = load_json(config_filename)
+        if not config_json:
+            config_json = {}
+    _CONFIG_SNAPSHOTS[base_dir] = {
+        "config": config_json,
+        "modified": modified,
+        "checked": curr_time
+    }
+    return config_json
+
+
+def get_config_param(base_dir: str, variable_name: str) -> str:
+    """Gets a configuration value
+    """
+    config_json: dict = _get_config_snapshot(base_dir)
+    variable_name: str = _convert_to_camel_case(variable_name)
+    value = config_json.get(variable_name)
+    if isinstance(value, (list, dict)):
+        value = value.copy()
+    return value
+
+
+def _get_follow_cache(filename: str) -> {}:
+    """Returns the handles within a follow file as a list, a set and
+    grouped by domain. The file is only loaded again if it changes
+    """
+    try:
+        file_stat = os.stat(filename)
+    except OSError:
+        _FOLLOW_CACHE.pop(filename, None)
+        return None
+    modified = (file_stat.st_mtime_ns, file_stat.st_size)
+    entry = _FOLLOW_CACHE.get(filename)
+    if entry:
+        if entry['modified'] == modified:
+            return entry
+    lines: list[str] = \
+        load_list(filename,
+                  'EX: _get_follow_cache unable to read ' + filename)
+    if lines is None:
+        return None
+    handles: list[str] = []
+    handles_lower: set[str] = set()
+    domains: dict = {}
+    for line in lines:
+        handle = line.strip()
+        handles.append(handle)
+        handles_lower.add(handle.lower())
+        if '@' not in handle:
+            continue
+        handle_domain = handle.split('@')[1]
+        if not domains.get(handle_domain):
+            domains[handle_domain] = [handle]
+        else:
+            domains[handle_domain].append(handle)
+    entry = {
+        "modified": modified,
+        "handles": handles,
+        "set": frozenset(handles),
+        "lower": frozenset(handles_lower),
+        "domains": domains
+    }
+    _FOLLOW_CACHE[filename] = entry
+    return entry
+
+
+def follow_file_changed(filename: str) -> None:
+    """Called when a follow file is written, so that its
+    relationships are loaded again when next used
+    """
+    _FOLLOW_CACHE.pop(filename, None)
 
 
 def get_followers_list(base_dir: str,
@@ -847,19 +941,45 @@ def get_followers_list(base_dir: str,
     """Returns a list of followers for the given account
     """
     filename: str = acct_dir(base_dir, nickname, domain) + '/' + follow_file
-
-    if not is_a_file(filename):
+    entry = _get_follow_cache(filename)
+    if not entry:
         return []
+    return list(entry['handles'])
 
-    lines: list[str] = \
-        load_list(filename,
-                  'EX: get_followers_list unable to read ' + filename)
 
-    if lines:
-        for i, _ in enumerate(lines):
-            lines[i] = lines[i].strip()
-        return lines
-    return []
+def get_followers_set(base_dir: str,
+                      nickname: str, domain: str,
+                      follow_file: str = 'following.txt') -> frozenset:
+    """Returns the handles within a follow file of the given account
+    as a set, for membership checks
+    """
+    filename: str = acct_dir(base_dir, nickname, domain) + '/' + follow_file
+    entry = _get_follow_cache(filename)
+    if not entry:
+        return frozenset()
+    return entry['set']
+
+
+def in_follow_file(filename: str, handle: str) -> bool:
+    """Returns True if the given handle or actor is within a follow file.
+    This is not case sensitive
+    """
+    entry = _get_follow_cache(filename)
+    if not entry:
+        return False
+    return handle.lower() in entry['lower']
+
+
+def get_followers_by_domain(filename: str) -> {}:
+    """Returns the handles within a follow file grouped by domain
+    """
+    entry = _get_follow_cache(filename)
+    if not entry:
+        return None
+    grouped: dict = {}
+    for handle_domain, handles in entry['domains'].items():
+        grouped[handle_domain] = handles.copy()
+    return grouped
 
 
 def get_mutuals_of_person(base_dir: str,
@@ -867,8 +987,8 @@ def get_mutuals_of_person(base_dir: str,
     """Returns the mutuals of a person
     i.e. accounts which they follow and which also follow back
     """
-    followers: list[str] = \
-        get_followers_list(base_dir, nickname, domain, 'followers.txt')
+    followers: frozenset = \
+        get_followers_set(base_dir, nickname, domain, 'followers.txt')
     following: list[str] = \
         get_followers_list(base_dir, nickname, domain, 'following.txt')
     mutuals: list[str] = []
@@ -1061,6 +1181,10 @@ def create_person_dir(nickname: str, domain: str, base_dir: str,
     handle_dir: str = acct_handle_dir(base_dir, handle)
     if not is_a_dir(handle_dir):
         makedir(handle_dir)
+        # new accounts begin with append-only timeline indexes
+        save_flag_file(handle_dir + '/.indexAppendOnly',
+                       'EX: create_person_dir unable to write ' +
+                       'index flag for ' + handle)
     box_dir: str = acct_handle_dir(base_dir, handle) + '/' + dir_name
     if not is_a_dir(box_dir):
         makedir(box_dir)
@@ -1685,6 +1809,7 @@ def follow_person(base_dir: str, nickname: str, domain: str,
                   ', filename is ' + filename)
         save_string(handle_to_follow + '\n', filename,
                     'EX: follow_person unable to write ' + filename)
+    follow_file_changed(filename)
 
     if follow_file.endswith('following.txt'):
         # Default to adding new follows to the calendar.
@@ -1977,6 +2102,22 @@ def _is_bookmarked(base_dir: str, nickname: str, domain: str,
     return False
 
 
+def remove_recent_post(recent_posts_cache: {}, post_id: str) -> None:
+    """Removes a post from the recent posts cache
+    """
+    if recent_posts_cache.get('index'):
+        if post_id in recent_posts_cache['index']:
+            del recent_posts_cache['index'][post_id]
+
+    if recent_posts_cache.get('json'):
+        if recent_posts_cache['json'].get(post_id):
+            del recent_posts_cache['json'][post_id]
+
+    if recent_posts_cache.get('html'):
+        if recent_posts_cache['html'].get(post_id):
+            del recent_posts_cache['html'][post_id]
+
+
 def remove_post_from_cache(post_json_object: {},
                            recent_posts_cache: {}) -> None:
     """ if the post exists in the recent posts cache then remove it
@@ -1994,20 +2135,7 @@ def remove_post_from_cache(post_json_object: {},
     if '#' in post_id:
         post_id = post_id.split('#', 1)[0]
     post_id = remove_id_ending(post_id).replace('/', '#')
-    if post_id not in recent_posts_cache['index']:
-        return
-
-    if recent_posts_cache.get('index'):
-        if post_id in recent_posts_cache['index']:
-            recent_posts_cache['index'].remove(post_id)
-
-    if recent_posts_cache.get('json'):
-        if recent_posts_cache['json'].get(post_id):
-            del recent_posts_cache['json'][post_id]
-
-    if recent_posts_cache.get('html'):
-        if recent_posts_cache['html'].get(post_id):
-            del recent_posts_cache['html'][post_id]
+    remove_recent_post(recent_posts_cache, post_id)
 
 
 def delete_cached_html(base_dir: str, nickname: str, domain: str,
@@ -2441,6 +2569,7 @@ def delete_post(base_dir: str, http_prefix: str,
                                     http_prefix, post_filename,
                                     recent_posts_cache, debug, manual)
         # finally, remove the post itself
+        remove_from_search_index(post_filename)
         ex_text = 'EX: delete_post unable to delete post ' + \
             str(post_filename)
         if erase_file(post_filename, ex_text):
@@ -2556,6 +2685,7 @@ def delete_post(base_dir: str, http_prefix: str,
                                 http_prefix, post_filename,
                                 recent_posts_cache, debug, manual)
     # finally, remove the post itself
+    remove_from_search_index(post_filename)
     ex_text = 'EX: delete_post unable to delete post ' + \
         str(post_filename)
     if erase_file(post_filename, ex_text):
@@ -2846,6 +2976,14 @@ def get_cached_post_filename(base_dir: str, nickname: str, domain: str,
     return cached_post_filename + '.html'
 
 
+def get_hashtag_offsets_filename(base_dir: str, hashtag: str) -> str:
+    """Returns the filename for the offsets of a hashtag index.
+    These are kept outside of the tags directory, so that writing them
+    doesn't look like a change to the hashtags
+    """
+    return base_dir + '/cache/hashtags/' + hashtag + '.txt.offsets'
+
+
 def file_last_modified(filename: str) -> str:
     """Returns the date when a file was last modified
     """
@@ -8,7 +8,6 @@ __status__ = "Production"
 __module_group__ = "Web Interface"
 
 import os
-from datetime import datetime, timezone
 from src.flags import is_public_post
 from src.timeFunctions import date_utcnow
 from src.timeFunctions import date_from_string_format
@@ -20,11 +19,11 @@ from src.utils import has_object_dict
 from src.utils import local_actor_url
 from src.utils import file_last_modified
 from src.utils import acct_dir
-from src.utils import data_dir
 from src.utils import get_nickname_from_actor
 from src.utils import get_config_param
 from src.utils import escape_text
 from src.utils import string_contains
+from src.utils import text_in_file
 from src.delete import remove_old_hashtags
 from src.maps import get_category_from_post
 from src.maps import add_tag_map_links
@@ -34,15 +33,17 @@ from src.maps import get_location_from_post
 from src.categories import set_hashtag_category
 from src.categories import guess_hashtag_category
 from src.categories import get_hashtag_categories
-from src.categories import get_hashtag_category
+from src.blocking import is_blocked_hashtag
+from src.hashtagstats import get_hashtag_stats
+from src.hashtagstats import get_hashtag_stats_category
+from src.hashtagstats import hashtag_used
 from src.webapp_utils import set_custom_background
 from src.webapp_utils import get_search_banner_file
 from src.webapp_utils import get_content_warning_button
 from src.webapp_utils import html_header_with_external_style
 from src.webapp_utils import html_footer
-from src.data import load_string
+from src.data import append_index_entry
 from src.data import save_string
-from src.data import load_line
 from src.data import is_a_file
 from src.data import is_a_dir
 from src.data import makedir
@@ -94,124 +95,37 @@ def html_hash_tag_swarm(base_dir: str, actor: str, translate: {}) -> str:
     """Returns a tag swarm of today's hashtags
     """
     max_tag_length = 42
-    curr_time = date_utcnow()
-    prev_time_epoch = date_epoch()
-    days_since_epoch = (curr_time - prev_time_epoch).days
-    days_since_epoch_str = str(days_since_epoch) + ' '
-    days_since_epoch_str2 = str(days_since_epoch - 1) + ' '
-    recently = days_since_epoch - 1
     tag_swarm: list[str] = []
     category_swarm: list[str] = []
     swarm_map: list[str] = []
-    domain_histogram = {}
-
-    # Load the blocked hashtags into memory.
-    # This avoids needing to repeatedly load the blocked file for each hashtag
-    blocked_str: str = ''
-    global_blocking_filename = data_dir(base_dir) + '/blocking.txt'
-    if is_a_file(global_blocking_filename):
-        blocked_str = \
-            load_string(global_blocking_filename,
-                        'EX: html_hash_tag_swarm unable to read ' +
-                        global_blocking_filename)
-        if blocked_str is None:
-            blocked_str: str = ''
-
-    for _, _, files in os.walk(base_dir + '/tags'):
-        for fname in files:
-            if not fname.endswith('.txt'):
-                continue
-            tags_filename = os.path.join(base_dir + '/tags', fname)
-            if not is_a_file(tags_filename):
-                continue
 
-            # get last modified datetime
-            mod_time_since_epoc = os.path.getmtime(tags_filename)
-            last_modified_date = \
-                datetime.fromtimestamp(mod_time_since_epoc,
-                                       timezone.utc)
-            file_days_since_epoch = \
-                (last_modified_date - prev_time_epoch).days
-
-            # check if the file was last modified within the previous
-            # two days
-            if file_days_since_epoch < recently:
-                continue
-
-            hash_tag_name = fname.split('.')[0]
-            if len(hash_tag_name) > max_tag_length:
-                # NoIncrediblyLongAndBoringHashtagsShownHere
-                continue
-            if string_contains(hash_tag_name, ['#', '&', '"', "'"]):
-                continue
-            if '#' + hash_tag_name + '\n' in blocked_str:
-                continue
+    # hashtags used today or yesterday
+    recent_hashtags = get_hashtag_stats(base_dir, 2)
+    for hash_tag_name, tag_stats in recent_hashtags.items():
+        if tag_stats['uses'] <= 0:
+            continue
+        if len(hash_tag_name) > max_tag_length:
+            # NoIncrediblyLongAndBoringHashtagsShownHere
+            continue
+        if string_contains(hash_tag_name, ['#', '&', '"', "'", '.']):
+            continue
+        if is_blocked_hashtag(base_dir, hash_tag_name):
+            continue
+        tag_swarm.append(hash_tag_name)
 
-            last_tag = \
-                load_line(tags_filename,
-                          'EX: html_hash_tag_swarm unable to read 2 ' +
-                          tags_filename)
-            if last_tag is None:
-                continue
-            if not last_tag.startswith(days_since_epoch_str):
-                if not last_tag.startswith(days_since_epoch_str2):
-                    continue
-
-            try:
-                with open(tags_filename, 'r', encoding='utf-8') as fp_tags:
-                    while True:
-                        line = fp_tags.readline()
-                        if not line:
-                            break
-                        if '  ' not in line:
-                            break
-                        sections: list[str] = line.split('  ')
-                        if len(sections) != 3:
-                            break
-                        post_days_since_epoch_str = sections[0]
-                        if not post_days_since_epoch_str.isdigit():
-                            break
-                        post_days_since_epoch = int(post_days_since_epoch_str)
-                        if post_days_since_epoch < recently:
-                            break
-                        post_url = sections[2]
-                        if '##' not in post_url:
-                            break
-                        post_domain = post_url.split('##')[1]
-                        if '#' in post_domain:
-                            post_domain = post_domain.split('#')[0]
-
-                        if domain_histogram.get(post_domain):
-                            domain_histogram[post_domain] = \
-                                domain_histogram[post_domain] + 1
-                        else:
-                            domain_histogram[post_domain] = 1
-                        tag_swarm.append(hash_tag_name)
-                        category_filename = \
-                            tags_filename.replace('.txt', '.category')
-                        if is_a_file(category_filename):
-                            category_str = \
-                                get_hashtag_category(base_dir, hash_tag_name)
-                            if category_str and \
-                               len(category_str) < max_tag_length:
-                                if '#' not in category_str and \
-                                   '&' not in category_str and \
-                                   '"' not in category_str and \
-                                   "'" not in category_str:
-                                    if category_str not in category_swarm:
-                                        category_swarm.append(category_str)
-                                    # check if the tag has an associated map
-                                    tag_map_filename = \
-                                        os.path.join(base_dir + '/tagmaps',
-                                                     hash_tag_name + '.txt')
-                                    if is_a_file(tag_map_filename):
-                                        if category_str not in swarm_map:
-                                            swarm_map.append(category_str)
-                        break
-            except OSError as exc:
-                print('EX: html_hash_tag_swarm unable to read ' +
-                      tags_filename + ' ' + str(exc))
-        break
+        category_str = tag_stats['category']
+        if not category_str or len(category_str) >= max_tag_length:
+            continue
+        if string_contains(category_str, ['#', '&', '"', "'"]):
+            continue
+        if category_str not in category_swarm:
+            category_swarm.append(category_str)
+        # check if the tag has an associated map
+        tag_map_filename = \
+            os.path.join(base_dir + '/tagmaps', hash_tag_name + '.txt')
+        if is_a_file(tag_map_filename):
+            if category_str not in swarm_map:
+                swarm_map.append(category_str)
 
     if not tag_swarm:
         return ''
@@ -380,25 +294,20 @@ def _store_tag_name(base_dir: str, nickname: str,
         if save_string(tag_line, tags_filename,
                        'EX: store_hash_tags unable to write ' + tags_filename):
             hashtag_added = True
-    else:
-        content = load_string(tags_filename,
-                              'EX: store_hash_tags failed to read ' +
-                              tags_filename)
-        if content is None:
-            content: str = ''
-        if post_url not in content:
-            content = tag_line + content
-            if save_string(content, tags_filename,
-                           'EX: Failed to write entry to tags file ' +
-                           tags_filename + ' [ex]'):
-                hashtag_added = True
+    elif not text_in_file(post_url, tags_filename):
+        # the newest entry is at the end of the tags file
+        tag_entry = tag_line.strip()
+        if append_index_entry(tag_entry, tags_filename,
+                              'EX: Failed to write entry to tags file ' +
+                              tags_filename + ' [ex]'):
+            hashtag_added = True
 
     if not hashtag_added:
         return False
+    hashtag_used(base_dir, tag_name)
 
     # automatically assign a category to the tag if possible
-    category_filename = tags_dir + '/' + tag_name + '.category'
-    if not is_a_file(category_filename):
+    if get_hashtag_stats_category(base_dir, tag_name) is None:
         hashtag_categories = \
             get_hashtag_categories(base_dir, False, None)
         category_str = \
@@ -169,7 +169,7 @@ def html_person_options(default_timeline: str,
                         theme: str,
                         blocked_cache: [],
                         repo_url: str,
-                        sites_unavailable: [],
+                        sites_unavailable: {},
                         youtube: str,
                         peertube: str,
                         loops: str,
@@ -1236,7 +1236,7 @@ def html_profile(signing_priv_key_pem: str,
                  buy_sites: {},
                  actor_proxied: str,
                  max_shares_on_profile: int,
-                 sites_unavailable: [],
+                 sites_unavailable: {},
                  no_of_books: int,
                  auto_cw_cache: {},
                  known_epicyon_instances: [],
@@ -2191,7 +2191,7 @@ def _html_profile_following(translate: {}, base_dir: str, http_prefix: str,
                             max_items_per_page: int,
                             dormant_months: int, debug: bool,
                             signing_priv_key_pem: str,
-                            sites_unavailable: [],
+                            sites_unavailable: {},
                             system_language: str,
                             mitm_servers: []) -> str:
     """Shows following on the profile screen
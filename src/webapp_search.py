@@ -17,6 +17,7 @@ from src.timeFunctions import date_from_string_format
 from src.utils import get_mutuals_of_person
 from src.utils import get_person_icon
 from src.utils import data_dir
+from src.utils import get_hashtag_offsets_filename
 from src.utils import get_post_attachments
 from src.utils import get_url_from_post
 from src.utils import get_attributed_to
@@ -57,10 +58,10 @@ from src.webapp_hashtagswarm import html_hash_tag_swarm
 from src.maps import html_hashtag_maps
 from src.session import get_json_valid
 from src.session import get_json
-from src.data import load_list
 from src.data import load_string
 from src.data import save_string
 from src.data import is_a_file
+from src.data import index_page_entries
 from src.data import is_a_dir
 
 
@@ -748,13 +749,21 @@ def html_history_search(translate: {}, base_dir: str,
 
     historysearch = historysearch.lower().strip('\n').strip('\r')
 
+    # ensure that the page number is in bounds
+    if not page_number:
+        page_number = 1
+    elif page_number < 1:
+        page_number = 1
+
+    # enough results to reach the end of the requested page
+    max_results: int = posts_per_page * page_number
     box_filenames: str = \
         search_box_posts(base_dir, nickname, domain,
-                         historysearch, posts_per_page, box_name)
+                         historysearch, max_results, box_name)
     if box_name == 'outbox':
         box_filenames += \
             search_box_posts(base_dir, nickname, domain,
-                             historysearch, posts_per_page, 'inbox')
+                             historysearch, max_results, 'inbox')
 
     css_filename: str = base_dir + '/epicyon-profile.css'
     if is_a_file(base_dir + '/epicyon.css'):
@@ -802,12 +811,6 @@ def html_history_search(translate: {}, base_dir: str,
 
     separator_str: str = html_post_separator(base_dir, None)
 
-    # ensure that the page number is in bounds
-    if not page_number:
-        page_number = 1
-    elif page_number < 1:
-        page_number = 1
-
     # get the start end end within the index file
     start_index: int = int((page_number - 1) * posts_per_page)
     end_index: int = start_index + posts_per_page
@@ -919,6 +922,7 @@ def html_hashtag_search(nickname: str, domain: str, port: int,
     if not is_a_file(hashtag_index_file):
         print('WARN: hashtag file not found ' + hashtag_index_file)
         return None
+    offsets_filename: str = get_hashtag_offsets_filename(base_dir, hashtag)
 
     separator_str: str = html_post_separator(base_dir, None)
 
@@ -928,31 +932,24 @@ def html_hashtag_search(nickname: str, domain: str, port: int,
         if not is_a_dir(account_dir):
             nickname = None
 
-    # read the index
-    lines: list[str] = \
-        load_list(hashtag_index_file,
-                  'EX: html_hashtag_search unable to read ' +
-                  hashtag_index_file)
-    if lines is None:
-        return None
-
-    # read the css
-    css_filename: str = base_dir + '/epicyon-profile.css'
-    if is_a_file(base_dir + '/epicyon.css'):
-        css_filename = base_dir + '/epicyon.css'
-
     # ensure that the page number is in bounds
     if not page_number:
         page_number = 1
     elif page_number < 1:
         page_number = 1
 
-    # get the start end end within the index file
+    # read only the requested page from the index
+    lines, no_of_lines = \
+        index_page_entries(hashtag_index_file, page_number, posts_per_page,
+                           'EX: html_hashtag_search unable to read ' +
+                           hashtag_index_file + ' [ex]',
+                           offsets_filename)
     start_index: int = int((page_number - 1) * posts_per_page)
-    end_index: int = start_index + posts_per_page
-    no_of_lines: int = len(lines)
-    if end_index >= no_of_lines and no_of_lines > 0:
-        end_index = no_of_lines - 1
+
+    # read the css
+    css_filename: str = base_dir + '/epicyon-profile.css'
+    if is_a_file(base_dir + '/epicyon.css'):
+        css_filename = base_dir + '/epicyon.css'
 
     instance_title: str = get_config_param(base_dir, 'instanceTitle')
     preload_images: list[str] = []
@@ -1034,32 +1031,25 @@ def html_hashtag_search(nickname: str, domain: str, port: int,
             translate['Page up'] + \
             '" alt="' + translate['Page up'] + \
             '"></a>\n  </center>\n'
-    index: int = start_index
     text_mode_separator: str = '<div class="transparent"><hr></div>'
-    while index <= end_index:
-        post_id: str = lines[index].strip('\n').strip('\r')
+    for post_id in lines:
         if '  ' not in post_id:
             nickname = get_nickname_from_actor(post_id)
             if not nickname:
-                index += 1
                 continue
         else:
             post_fields = post_id.split('  ')
             if len(post_fields) != 3:
-                index += 1
                 continue
             nickname = post_fields[1]
             post_id = post_fields[2]
         post_filename: str = locate_post(base_dir, nickname, domain, post_id)
         if not post_filename:
-            index += 1
             continue
         post_json_object: dict = load_json(post_filename)
         if not post_json_object:
-            index += 1
             continue
         if not is_public_post(post_json_object):
-            index += 1
             continue
         show_individual_post_icons: bool = False
         if nickname:
@@ -1118,11 +1108,10 @@ def html_hashtag_search(nickname: str, domain: str, port: int,
         if post_str:
             hashtag_search_form += \
                 text_mode_separator + separator_str + post_str
-        index += 1
 
     hashtag_search_form += text_mode_separator
 
-    if end_index < no_of_lines - 1:
+    if start_index + posts_per_page < no_of_lines:
         # next page link
         hashtag_search_form += \
             '  <center>\n' + \
@@ -1380,6 +1369,7 @@ def hashtag_search_rss(nickname: str, domain: str, port: int,
     if not is_a_file(hashtag_index_file):
         print('WARN: hashtag file not found ' + hashtag_index_file)
         return None
+    offsets_filename: str = get_hashtag_offsets_filename(base_dir, hashtag)
 
     # check that the directory for the nickname exists
     if nickname:
@@ -1387,48 +1377,36 @@ def hashtag_search_rss(nickname: str, domain: str, port: int,
         if not is_a_dir(account_dir):
             nickname = None
 
-    # read the index
-    lines: list[str] = \
-        load_list(hashtag_index_file,
-                  'EX: hashtag_search_rss unable to read ' +
-                  hashtag_index_file)
+    # read the newest entries from the index
+    max_feed_length: int = 10
+    lines, _ = \
+        index_page_entries(hashtag_index_file, 1, max_feed_length,
+                           'EX: hashtag_search_rss unable to read ' +
+                           hashtag_index_file + ' [ex]',
+                           offsets_filename)
     if not lines:
         return None
 
     domain_full: str = get_full_domain(domain, port)
 
-    max_feed_length: int = 10
     hashtag_feed: str = rss2tag_header(hashtag, http_prefix, domain_full)
-    for index, item in enumerate(lines):
-        post_id: str = item.strip('\n').strip('\r')
+    for post_id in lines:
         if '  ' not in post_id:
             nickname: str = get_nickname_from_actor(post_id)
             if not nickname:
-                index += 1
-                if index >= max_feed_length:
-                    break
                 continue
         else:
             post_fields: list[str] = post_id.split('  ')
             if len(post_fields) != 3:
-                index += 1
-                if index >= max_feed_length:
-                    break
                 continue
             nickname: str = post_fields[1]
             post_id: str = post_fields[2]
         post_filename: str = locate_post(base_dir, nickname, domain, post_id)
         if not post_filename:
-            index += 1
-            if index >= max_feed_length:
-                break
             continue
         post_json_object: dict = load_json(post_filename)
         if post_json_object:
             if not is_public_post(post_json_object):
-                index += 1
-                if index >= max_feed_length:
-                    break
                 continue
             # add to feed
             if 'content' in post_json_object['object'] and \
@@ -1470,9 +1448,6 @@ def hashtag_search_rss(nickname: str, domain: str, port: int,
                         hashtag_feed += \
                             '         <link>' + attach_url + '</link>'
                 hashtag_feed += '     </item>'
-        index += 1
-        if index >= max_feed_length:
-            break
 
     return hashtag_feed + rss2tag_footer()
 
@@ -1494,6 +1469,7 @@ def hashtag_search_json(nickname: str, domain: str, port: int,
     if not is_a_file(hashtag_index_file):
         print('WARN: hashtag file not found ' + hashtag_index_file)
         return None
+    offsets_filename: str = get_hashtag_offsets_filename(base_dir, hashtag)
 
     # check that the directory for the nickname exists
     if nickname:
@@ -1501,12 +1477,16 @@ def hashtag_search_json(nickname: str, domain: str, port: int,
         if not is_a_dir(account_dir):
             nickname = None
 
-    # read the index
-    lines: list[str] = \
-        load_list(hashtag_index_file,
-                  'EX: hashtag_search_json unable to read ' +
-                  hashtag_index_file)
-    if not lines:
+    if page_number < 1:
+        page_number = 1
+
+    # read only the requested page from the index
+    lines, no_of_lines = \
+        index_page_entries(hashtag_index_file, page_number, posts_per_page,
+                           'EX: hashtag_search_json unable to read ' +
+                           hashtag_index_file + ' [ex]',
+                           offsets_filename)
+    if no_of_lines == 0:
         return None
 
     domain_full: str = get_full_domain(domain, port)
@@ -1530,9 +1510,7 @@ def hashtag_search_json(nickname: str, domain: str, port: int,
         hashtag_json['prev'] = \
             http_prefix + '://' + domain_full + '/tags/' + \
             hashtag + '?page=' + str(page_number - 1)
-    page_items: int = 0
-    for index, _ in enumerate(lines):
-        post_id: str = lines[index].strip('\n').strip('\r')
+    for post_id in lines:
         if '  ' not in post_id:
             nickname: str = get_nickname_from_actor(post_id)
             if not nickname:
@@ -1556,16 +1534,12 @@ def hashtag_search_json(nickname: str, domain: str, port: int,
         if not post_json_object['object'].get('id'):
             continue
         # add to feed
-        page_items += 1
-        if page_items < posts_per_page * (page_number - 1):
-            continue
         id_str: str = remove_id_ending(post_json_object['object']['id'])
         hashtag_json['orderedItems'].append(id_str)
         hashtag_json['totalItems'] += 1
-        if hashtag_json['totalItems'] >= posts_per_page:
-            hashtag_json['next'] = \
-                http_prefix + '://' + domain_full + '/tags/' + \
-                hashtag + '?page=' + str(page_number + 1)
-            break
 
+    if page_number * posts_per_page < no_of_lines:
+        hashtag_json['next'] = \
+            http_prefix + '://' + domain_full + '/tags/' + \
+            hashtag + '?page=' + str(page_number + 1)
     return hashtag_json
@@ -9,6 +9,7 @@ __module_group__ = "Timeline"
 
 import time
 from shutil import copyfile
+from src.cache import get_recent_post
 from src.flags import is_editor
 from src.flags import is_artist
 from src.flags import is_float
@@ -1048,11 +1049,12 @@ def html_timeline(default_timeline: str,
                 curr_tl_str = None
                 if box_name != 'tlmedia' and recent_posts_cache.get('html'):
                     post_id = remove_id_ending(item['id']).replace('/', '#')
-                    if recent_posts_cache['html'].get(post_id):
+                    curr_tl_str = \
+                        get_recent_post(recent_posts_cache, post_id, 'html')
+                    if curr_tl_str:
                         if not first_post_id:
                             first_post_id = post_id
                         last_post_id = post_id
-                        curr_tl_str = recent_posts_cache['html'][post_id]
                         curr_tl_str = \
                             prepare_post_from_html_cache(nickname,
                                                          curr_tl_str,
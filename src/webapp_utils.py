@@ -12,6 +12,10 @@ from shutil import copyfile
 from collections import OrderedDict
 from src.session import get_json
 from src.session import get_json_valid
+from src.siteactive import get_sites_unavailable
+from src.siteactive import site_is_available
+from src.siteactive import site_failed
+from src.siteactive import site_succeeded
 from src.flags import is_float
 from src.flags import is_moderator
 from src.formats import media_file_mime_type
@@ -422,6 +426,15 @@ def update_avatar_image_cache(signing_priv_key_pem: str,
        allow_downloads:
         if '://' not in avatar_url and avatar_url.startswith('/'):
             avatar_url = http_prefix + '://' + domain + avatar_url
+        # don't connect to an instance which is known to be down
+        sites_unavailable = get_sites_unavailable()
+        if not site_is_available(sites_unavailable, avatar_url):
+            if debug:
+                print('Avatar image not downloaded, instance unavailable ' +
+                      avatar_url)
+            if is_a_file(avatar_image_filename):
+                return avatar_image_filename.replace(base_dir + '/cache', '')
+            return None
         try:
             if debug:
                 print('avatar image url: ' + avatar_url)
@@ -429,6 +442,10 @@ def update_avatar_image_cache(signing_priv_key_pem: str,
                                  headers=session_headers,
                                  params=None,
                                  allow_redirects=True)
+            if result.status_code in range(500, 600):
+                site_failed(sites_unavailable, avatar_url)
+            else:
+                site_succeeded(sites_unavailable, avatar_url)
             if result.status_code < 200 or \
                result.status_code > 202:
                 if debug:
@@ -457,6 +474,9 @@ def update_avatar_image_cache(signing_priv_key_pem: str,
         except BaseException as ex:
             print('EX: Failed to download avatar image: ' +
                   str(avatar_url) + ' ' + str(ex))
+            site_failed(sites_unavailable, avatar_url)
+        if not site_is_available(sites_unavailable, actor):
+            return None
         prof: str = 'https://www.w3.org/ns/activitystreams'
         if '/channel/' not in actor or '/accounts/' not in actor:
             session_headers = {